@@ -0,0 +1,538 @@
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sys
+import time
+from collections import namedtuple
+from datetime import datetime
+from pathlib import Path
+from types import SimpleNamespace
+
+import convert_all
+import convert_model_animations
+import convert_model_hierarchy
+import convert_model_mesh
+import convert_multiresolution_mesh
+import convert_textures
+import convert_worlds
+import helpers
+import manifest
+
+
+# synthetic objects have same attributes as zenkit objects, so parse functions work without game files
+WORLD_POLYGON_COUNT = 500000
+WORLD_VOB_COUNT = 20000
+WORLD_WAYPOINT_COUNT = 2000
+WORLD_MATERIAL_COUNT = 200
+MRM_FILE_COUNT = 50
+MRM_TRIANGLE_COUNT = 2000
+MDM_FILE_COUNT = 10
+MDM_WEIGHT_COUNT = 5000
+MAN_FILE_COUNT = 20
+MAN_BONE_COUNT = 80
+MAN_FRAME_COUNT = 200
+TEXTURE_COUNT = 8
+TEXTURE_SIZE = 1024
+CHECKSUM = 12345
+
+Vector2 = namedtuple('Vector2', ['x', 'y'])
+Vector3 = namedtuple('Vector3', ['x', 'y', 'z'])
+Vector4 = namedtuple('Vector4', ['x', 'y', 'z', 'w'])
+Color = namedtuple('Color', ['r', 'g', 'b', 'a'])
+Box = namedtuple('Box', ['min', 'max'])
+Enum = namedtuple('Enum', ['name'])
+Feature = namedtuple('Feature', ['texture', 'light', 'normal'])
+Polygon = namedtuple('Polygon', ['material_index', 'position_indices', 'feature_indices'])
+Triangle = namedtuple('Triangle', ['wedges'])
+Wedge = namedtuple('Wedge', ['normal', 'texture', 'index'])
+SoftSkinWeight = namedtuple('SoftSkinWeight', ['weight', 'position', 'index'])
+Sample = namedtuple('Sample', ['position', 'rotation'])
+Edge = namedtuple('Edge', ['a', 'b'])
+# class name is used by pasrse_vob
+VirtualObject = namedtuple('VirtualObject', ['type', 'preset_name', 'name', 'rotation', 'position', 'bbox', 'visual',
+                                             'show_visual', 'sprite_camera_facing_mode', 'anim_mode', 'anim_strength',
+                                             'far_clip_scale', 'cd_static', 'cd_dynamic', 'vob_static', 'dynamic_shadows',
+                                             'bias', 'ambient', 'children'])
+
+
+def rf(f):
+    return round(f, 2)
+
+
+def scaled(count, scale):
+    return max(1, int(count * scale))
+
+
+def random_vector3(random_generator, size=1.0):
+    return Vector3(random_generator.uniform(-size, size), random_generator.uniform(-size, size),
+                   random_generator.uniform(-size, size))
+
+
+def random_normal(random_generator):
+    x, y, z = random_vector3(random_generator)
+    length = max((x * x + y * y + z * z) ** 0.5, 0.0001)
+    return Vector3(x / length, y / length, z / length)
+
+
+def generate_material_list(material_count, texture_count):
+    material_list = []
+    for index in range(material_count):
+        material = SimpleNamespace(name=f'BENCHMARK_{index:04d}', group=Enum('STONE'), color=Color(255, 255, 255, 255),
+                                   smooth_angle=60.0, texture=f'BENCHMARK_{index % texture_count:02d}.TGA',
+                                   texture_scale=(1.0, 1.0), texture_animation_fps=0.0,
+                                   texture_animation_mapping=Enum('NONE'), texture_animation_mapping_direction=(0.0, 0.0),
+                                   disable_collision=False, disable_lightmap=False, dont_collapse=False, detail_object='',
+                                   default_mapping=Vector2(2.34375, 2.34375), detail_object_scale=1.0,
+                                   force_occluder=False, environment_mapping=False, environment_mapping_strength=1.0,
+                                   wave_mode=Enum('NONE'), wave_speed=Enum('NONE'), wave_amplitude=30.0,
+                                   wave_grid_size=100.0, ignore_sun=False, alpha_function=Enum('NONE'))
+        material_list.append(material)
+
+    return material_list
+
+
+def generate_world_mesh(random_generator, polygon_count, material_list):
+    # triangles, every corner have own feature like in real worlds
+    position_count = max(polygon_count // 2, 3)
+    size = 100000.0
+    position_list = [random_vector3(random_generator, size) for _ in range(position_count)]
+    feature_list = []
+    polygon_list = []
+    for index in range(polygon_count):
+        feature_offset = len(feature_list)
+        for _ in range(3):
+            feature_list.append(Feature(Vector2(random_generator.random(), random_generator.random()), 0,
+                                        random_normal(random_generator)))
+        position_indices = [random_generator.randrange(position_count) for _ in range(3)]
+        polygon_list.append(Polygon(index % len(material_list), position_indices,
+                                    [feature_offset, feature_offset + 1, feature_offset + 2]))
+
+    return SimpleNamespace(name='BENCHMARK', bounding_box=Box(Vector3(-size, -size, -size), Vector3(size, size, size)),
+                           positions=position_list, features=feature_list, polygons=polygon_list, materials=material_list)
+
+
+def generate_vob_list(random_generator, vob_count, max_depth=4):
+    # nested like real worlds: levels with houses, houses with items
+    rotation = SimpleNamespace(columns=[[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.0, 0.0, 1.0]])
+    vob_type = Enum('zCVob')
+    no_mode = Enum('NONE')
+
+    root_vob_list = []
+    parent_list = []
+    for index in range(vob_count):
+        position = random_vector3(random_generator, 100000.0)
+        bbox = Box(Vector3(position.x - 100.0, position.y - 100.0, position.z - 100.0),
+                   Vector3(position.x + 100.0, position.y + 100.0, position.z + 100.0))
+        visual = SimpleNamespace(name=f'BENCHMARK_VOB_{index % 500:03d}.3DS', type=Enum('MESH'))
+        vob = VirtualObject(vob_type, '', f'BENCHMARK_VOB_{index}', rotation, position, bbox, visual, True, no_mode,
+                            no_mode, 0.0, 1.0, True, False, False, no_mode, 1, False, [])
+
+        if parent_list and random_generator.random() < 0.7:
+            parent_vob, parent_depth = random_generator.choice(parent_list)
+            parent_vob.children.append(vob)
+            depth = parent_depth + 1
+        else:
+            root_vob_list.append(vob)
+            depth = 0
+        if depth < max_depth:
+            parent_list.append((vob, depth))
+
+    return root_vob_list
+
+
+def generate_way_net(random_generator, waypoint_count):
+    point_list = []
+    edge_list = []
+    for index in range(waypoint_count):
+        point_list.append(SimpleNamespace(name=f'BENCHMARK_WP_{index}', water_depth=0, under_water=False,
+                                          position=random_vector3(random_generator, 100000.0),
+                                          direction=random_normal(random_generator), free_point=False))
+        if index > 0:
+            edge_list.append(Edge(index - 1, index))
+
+    return SimpleNamespace(points=point_list, edges=edge_list)
+
+
+def generate_world(random_generator, scale, texture_count):
+    material_list = generate_material_list(WORLD_MATERIAL_COUNT, texture_count)
+    mesh = generate_world_mesh(random_generator, scaled(WORLD_POLYGON_COUNT, scale), material_list)
+    return SimpleNamespace(mesh=mesh, bsp_tree=None, way_net=generate_way_net(random_generator, scaled(WORLD_WAYPOINT_COUNT, scale)),
+                           root_objects=generate_vob_list(random_generator, scaled(WORLD_VOB_COUNT, scale)))
+
+
+def generate_multiresolution_mesh(random_generator, triangle_count, material_list, submesh_count=4):
+    position_count = max(triangle_count // 2, 3)
+    position_list = [random_vector3(random_generator, 100.0) for _ in range(position_count)]
+
+    submesh_list = []
+    for submesh_index in range(submesh_count):
+        submesh_triangle_count = max(triangle_count // submesh_count, 1)
+        wedge_list = [Wedge(random_normal(random_generator), Vector2(random_generator.random(), random_generator.random()),
+                            random_generator.randrange(position_count)) for _ in range(submesh_triangle_count * 3 // 2 + 3)]
+        triangle_list = [Triangle([random_generator.randrange(len(wedge_list)) for _ in range(3)])
+                         for _ in range(submesh_triangle_count)]
+        submesh_list.append(SimpleNamespace(triangles=triangle_list, wedges=wedge_list))
+
+    return SimpleNamespace(material=material_list[:submesh_count], positions=position_list, submeshes=submesh_list)
+
+
+def generate_model_hierarchy(bone_count):
+    node_list = []
+    for index in range(bone_count):
+        # identity rotation, bone move along parent
+        columns = [Vector4(1.0, 0.0, 0.0, 0.0), Vector4(0.0, 1.0, 0.0, 0.0), Vector4(0.0, 0.0, 1.0, 0.0),
+                   Vector4(0.0, 10.0 if index else 0.0, 0.0, 1.0)]
+        node_list.append(SimpleNamespace(name=f'BIP01 BENCHMARK {index:02d}', parent=index - 1,
+                                         transform=SimpleNamespace(columns=columns)))
+
+    box = Box(Vector3(-100.0, -100.0, -100.0), Vector3(100.0, 100.0, 100.0))
+    return SimpleNamespace(source_path='BENCHMARK.ASC', root_translation=Vector3(0.0, 0.0, 0.0), bbox=box,
+                           collision_bbox=box, source_date=None, checksum=CHECKSUM, nodes=node_list)
+
+
+def generate_model_mesh(random_generator, weight_count, bone_count, material_list):
+    # two weights for every position
+    position_count = max(weight_count // 2, 3)
+    mesh = generate_multiresolution_mesh(random_generator, position_count * 2, material_list)
+    mesh.positions = mesh.positions[:position_count] + [random_vector3(random_generator, 100.0)
+                                                        for _ in range(position_count - len(mesh.positions))]
+    weight_list = []
+    for _ in range(position_count):
+        weight = random_generator.random()
+        weight_list.append([SoftSkinWeight(weight, random_vector3(random_generator, 10.0), random_generator.randrange(bone_count)),
+                            SoftSkinWeight(1.0 - weight, random_vector3(random_generator, 10.0), random_generator.randrange(bone_count))])
+
+    soft_skin_mesh = SimpleNamespace(mesh=mesh, weights=weight_list, nodes=list(range(bone_count)))
+    return SimpleNamespace(checksum=CHECKSUM, attachments={}, meshes=[soft_skin_mesh])
+
+
+def generate_model_animation(random_generator, bone_count, frame_count):
+    sample_list = []
+    for _ in range(frame_count):
+        for _ in range(bone_count):
+            sample_list.append(Sample(random_vector3(random_generator, 10.0), Vector4(0.0, 0.0, 0.0, 1.0)))
+
+    return SimpleNamespace(source_path='BENCHMARK_RUN.ASC', checksum=CHECKSUM, frame_count=frame_count, fps=25.0,
+                           fps_source=25.0, layer=1, samples=sample_list, node_indices=list(range(bone_count)))
+
+
+def generate_texture(random_generator, size, has_alpha):
+    pixel = bytes([random_generator.randrange(256) for _ in range(3)] + [128 if has_alpha else 255])
+    rgba_data = pixel * (size * size)
+    return SimpleNamespace(width=size, height=size, mipmap_rgba=lambda level: rgba_data)
+
+
+def write_tex_file(random_generator, size, tex_file_path):
+    # DXT1 texture with all mipmaps, zenkit decode it like texture from game
+    import struct
+
+    # zengin TEX: header, then mipmaps from smallest to biggest, DXT1 - 8 bytes per 4x4 block
+    block_list = [bytes(random_generator.randrange(256) for _ in range(8)) for _ in range(16)]
+    mipmap_count = size.bit_length()
+    mipmap_data_list = []
+    for level in reversed(range(mipmap_count)):
+        mipmap_size = max(size >> level, 1)
+        block_count = max(mipmap_size // 4, 1) ** 2
+        mipmap_data_list.append(b''.join(block_list[index % len(block_list)] for index in range(block_count)))
+
+    tex_file_path.parent.mkdir(exist_ok=True, parents=True)
+    header = b'ZTEX' + struct.pack('<8I', 0, 0xA, size, size, mipmap_count, size, size, 0)
+    tex_file_path.write_bytes(header + b''.join(mipmap_data_list))
+
+
+def get_file_size(path_list):
+    return sum(Path(path).stat().st_size for path in path_list)
+
+
+def add_result(result_list, name, seconds, files=0, polygons=0, byte_count=0, samples=0):
+    # samples - animation samples (frames * bones), MAN has no polygons
+    result = {'name': name, 'seconds': round(seconds, 4), 'files': files, 'polygons': polygons, 'bytes': byte_count}
+    if samples:
+        result['samples'] = samples
+    throughput_list = []
+    if seconds > 0:
+        if files:
+            result['files_per_second'] = rf(files / seconds)
+            throughput_list.append(f'{result["files_per_second"]} files/s')
+        if polygons:
+            result['polygons_per_second'] = rf(polygons / seconds)
+            throughput_list.append(f'{result["polygons_per_second"]} polys/s')
+        if samples:
+            result['samples_per_second'] = rf(samples / seconds)
+            throughput_list.append(f'{result["samples_per_second"]} samples/s')
+        if byte_count:
+            result['megabytes_per_second'] = rf(byte_count / seconds / 1024 / 1024)
+            throughput_list.append(f'{result["megabytes_per_second"]} MB/s')
+    result_list.append(result)
+
+    print(f'[BENCHMARK] {name}: {seconds:.3f} s, {", ".join(throughput_list)}')
+
+
+def measure(function, *arguments):
+    start_time = time.perf_counter()
+    value = function(*arguments)
+    return value, time.perf_counter() - start_time
+
+
+def get_polygon_count(multiresolution_mesh):
+    return sum(len(submesh.triangles) for submesh in multiresolution_mesh.submeshes)
+
+
+def benchmark_world(result_list, random_generator, intermediate_path, scale):
+    print('[BENCHMARK] Generate world')
+    world = generate_world(random_generator, scale, TEXTURE_COUNT)
+    polygon_count = len(world.mesh.polygons)
+
+    _, seconds = measure(convert_worlds.parse_mesh, world.mesh, world.bsp_tree)
+    add_result(result_list, 'ZEN parse_mesh', seconds, polygons=polygon_count)
+    _, seconds = measure(convert_worlds.parse_mesh_arrays, world.mesh)
+    add_result(result_list, 'ZEN parse_mesh_arrays', seconds, polygons=polygon_count)
+    _, seconds = measure(helpers.parse_materials, world.mesh.materials)
+    add_result(result_list, 'ZEN parse_materials', seconds)
+    _, seconds = measure(convert_worlds.parse_waypoints, world.way_net)
+    add_result(result_list, 'ZEN parse_waypoints', seconds)
+    convert_worlds.vob_index = 0
+    _, seconds = measure(convert_worlds.pasrse_vob, world.root_objects)
+    add_result(result_list, 'ZEN pasrse_vob', seconds)
+
+    output_path_list, seconds = measure(convert_worlds.save_world, world, intermediate_path / 'Gothic II' / '_WORK' / 'DATA' / 'WORLDS',
+                                        'BENCHMARK')
+    add_result(result_list, 'ZEN save_world', seconds, files=1, polygons=polygon_count,
+               byte_count=get_file_size(output_path_list))
+
+    return {'*.ZEN.json': polygon_count}
+
+
+def benchmark_multiresolution_mesh(result_list, random_generator, intermediate_path, scale):
+    print('[BENCHMARK] Generate multiresolution meshes')
+    material_list = generate_material_list(8, TEXTURE_COUNT)
+    mesh_list = [generate_multiresolution_mesh(random_generator, MRM_TRIANGLE_COUNT, material_list)
+                 for _ in range(scaled(MRM_FILE_COUNT, scale))]
+    polygon_count = sum(get_polygon_count(mesh) for mesh in mesh_list)
+
+    start_time = time.perf_counter()
+    for mesh in mesh_list:
+        convert_multiresolution_mesh.parse_multiresolution_mesh(mesh)
+    add_result(result_list, 'MRM parse_multiresolution_mesh', time.perf_counter() - start_time, files=len(mesh_list),
+               polygons=polygon_count)
+
+    start_time = time.perf_counter()
+    for mesh in mesh_list:
+        convert_multiresolution_mesh.parse_multiresolution_mesh_arrays(mesh)
+    add_result(result_list, 'MRM parse_multiresolution_mesh_arrays', time.perf_counter() - start_time, files=len(mesh_list),
+               polygons=polygon_count)
+
+    output_path_list = []
+    start_time = time.perf_counter()
+    for index, mesh in enumerate(mesh_list):
+        output_path_list += convert_multiresolution_mesh.save_multiresolution_mesh(
+            mesh, intermediate_path / 'Gothic II' / '_WORK' / 'DATA' / 'MESHES', f'BENCHMARK_{index:03d}')
+    add_result(result_list, 'MRM save_multiresolution_mesh', time.perf_counter() - start_time, files=len(mesh_list),
+               polygons=polygon_count, byte_count=get_file_size(output_path_list))
+
+    return {'*.MRM.json': polygon_count}
+
+
+def benchmark_model(result_list, random_generator, intermediate_path, scale):
+    print('[BENCHMARK] Generate models and animations')
+    save_path = intermediate_path / 'Gothic II' / '_WORK' / 'DATA' / 'ANIMS'
+    save_path.mkdir(exist_ok=True, parents=True)
+
+    model_hierarchy = generate_model_hierarchy(MAN_BONE_COUNT)
+    mdh_dict, seconds = measure(convert_model_hierarchy.parse_mdh, model_hierarchy)
+    add_result(result_list, 'MDH parse_mdh', seconds, files=1)
+
+    material_list = generate_material_list(8, TEXTURE_COUNT)
+    model_mesh_list = [generate_model_mesh(random_generator, MDM_WEIGHT_COUNT, MAN_BONE_COUNT, material_list)
+                       for _ in range(scaled(MDM_FILE_COUNT, scale))]
+    polygon_count = sum(get_polygon_count(model_mesh.meshes[0].mesh) for model_mesh in model_mesh_list)
+
+    start_time = time.perf_counter()
+    model_mesh_dict_list = [convert_model_mesh.parse_model_mesh(model_mesh) for model_mesh in model_mesh_list]
+    add_result(result_list, 'MDM parse_model_mesh', time.perf_counter() - start_time, files=len(model_mesh_list),
+               polygons=polygon_count)
+
+    output_path_list = []
+    start_time = time.perf_counter()
+    for index, model_mesh_dict in enumerate(model_mesh_dict_list):
+        output_path = save_path / f'BENCHMARK_{index:03d}.MDM.json'
+        output_path.write_text(json.dumps({'hierarchy': mdh_dict, 'mesh': model_mesh_dict}, indent=4, ensure_ascii=False),
+                               encoding='utf-8')
+        output_path_list.append(output_path)
+    add_result(result_list, 'MDM write json', time.perf_counter() - start_time, files=len(output_path_list),
+               byte_count=get_file_size(output_path_list))
+
+    model_animation_list = [generate_model_animation(random_generator, MAN_BONE_COUNT, MAN_FRAME_COUNT)
+                            for _ in range(scaled(MAN_FILE_COUNT, scale))]
+
+    sample_count = sum(len(model_animation.samples) for model_animation in model_animation_list)
+
+    start_time = time.perf_counter()
+    animation_dict_list = [convert_model_animations.parse_man(model_animation, mdh_dict) for model_animation in model_animation_list]
+    add_result(result_list, 'MAN parse_man', time.perf_counter() - start_time, files=len(model_animation_list),
+               samples=sample_count)
+
+    output_path_list = []
+    start_time = time.perf_counter()
+    for index, animation_dict in enumerate(animation_dict_list):
+        output_path = save_path / f'BENCHMARK_{index:03d}.MAN.json'
+        output_path.write_text(json.dumps({'hierarchy': mdh_dict, 'animation': animation_dict}, indent=4, ensure_ascii=False,
+                                          sort_keys=False, default=str), encoding='utf-8')
+        output_path_list.append(output_path)
+    add_result(result_list, 'MAN write json', time.perf_counter() - start_time, files=len(output_path_list),
+               byte_count=get_file_size(output_path_list), samples=sample_count)
+
+    return {'*.MDM.json': polygon_count, '*.MAN.json': 0}
+
+
+def benchmark_textures(result_list, random_generator, extract_path, convert_path, scale):
+    print('[BENCHMARK] Generate textures')
+    texture_count = scaled(TEXTURE_COUNT, scale)
+    texture_list = [generate_texture(random_generator, TEXTURE_SIZE, index % 2 == 1) for index in range(texture_count)]
+
+    output_path_list = []
+    start_time = time.perf_counter()
+    for index, texture in enumerate(texture_list):
+        output_path = convert_path / 'VDF_Textures' / f'BENCHMARK_{index:02d}.TGA'
+        convert_textures.save_texture(texture, output_path)
+        output_path_list.append(output_path)
+    add_result(result_list, 'TEX save_texture', time.perf_counter() - start_time, files=texture_count,
+               byte_count=texture_count * TEXTURE_SIZE * TEXTURE_SIZE * 4)
+
+    # load and decode of TEX files by zenkit, to tga and to dds without decode
+    tex_file_path_list = [extract_path / 'Gothic II' / 'VDF_Textures' / f'BENCHMARK_TEX_{index:02d}-C.TEX'
+                          for index in range(texture_count)]
+    for tex_file_path in tex_file_path_list:
+        write_tex_file(random_generator, TEXTURE_SIZE, tex_file_path)
+    manifest.manifest_cache.clear()
+
+    for texture_format in ['TGA', 'DDS']:
+        start_time = time.perf_counter()
+        for tex_file_path in tex_file_path_list:
+            convert_textures.convert_file(tex_file_path, extract_path, convert_path, texture_format)
+        add_result(result_list, f'TEX convert_file {texture_format}', time.perf_counter() - start_time,
+                   files=texture_count, byte_count=get_file_size(tex_file_path_list))
+
+
+def benchmark_blender(result_list, benchmark_path, intermediate_path, polygon_count_dict, blender_executable_file_path,
+                      blender_instances):
+    # loaders run in warm blender, timings come from job server
+    config_file_path = benchmark_path / 'config.json'
+    script_dict = {'*.ZEN.json': 'import_zen.py', '*.MRM.json': 'import_mrm.py',
+                   '*.MDM.json': 'import_mdm.py', '*.MAN.json': 'import_man.py'}
+
+    blender_pool = helpers.create_blender_pool(blender_instances, blender_executable_file_path,
+                                               Path.cwd() / 'import_zengin_json' / 'job_server.py')
+    try:
+        for file_pattern, script_name in script_dict.items():
+            json_file_path_list = sorted(intermediate_path.rglob(file_pattern))
+            source_path_list = json_file_path_list + [path.with_suffix('.bin') for path in json_file_path_list
+                                                      if path.with_suffix('.bin').exists()]
+
+            start_time = time.perf_counter()
+            future_list = [blender_pool['executor'].submit(helpers.run_blender_server_job, blender_pool['server_queue'],
+                                                           Path.cwd() / 'import_zengin_json' / script_name, shard,
+                                                           config_file_path)
+                           for shard in helpers.split_shards(json_file_path_list, blender_instances)]
+            blender_result_list = [result for future in future_list for result in future.result()]
+            wall_seconds = time.perf_counter() - start_time
+
+            helpers.print_blender_errors('BENCHMARK', blender_result_list)
+            convert_seconds = sum(result.get('timings', {}).get('convert', 0.0) for result in blender_result_list)
+            add_result(result_list, f'BLENDER {script_name}', wall_seconds, files=len(json_file_path_list),
+                       polygons=polygon_count_dict.get(file_pattern, 0), byte_count=get_file_size(source_path_list))
+            result_list[-1]['convert_seconds'] = round(convert_seconds, 4)
+    finally:
+        helpers.shutdown_blender_pool(blender_pool)
+
+
+def compare(result_list, compare_file_path):
+    previous = json.loads(Path(compare_file_path).read_text(encoding='utf-8'))
+    previous_dict = {result['name']: result for result in previous['results']}
+
+    print(f'[BENCHMARK] Compare with {compare_file_path} ({previous.get("label", "")})')
+    for result in result_list:
+        if result['name'] not in previous_dict or result['seconds'] <= 0:
+            continue
+        previous_seconds = previous_dict[result['name']]['seconds']
+        print(f'[BENCHMARK] {result["name"]}: {previous_seconds:.3f} s -> {result["seconds"]:.3f} s '
+              f'(x{previous_seconds / result["seconds"]:.2f})')
+
+
+def run(scale=1.0, label='', use_blender=False, blender_instances=1, compare_file_path=None, seed=0):
+    config_file_path = Path('config.json')
+    config = json.loads(config_file_path.read_text()) if config_file_path.exists() else {}
+
+    # same structure as real output, but in own folder
+    benchmark_path = Path.cwd() / 'output' / 'BENCHMARK'
+    intermediate_path = benchmark_path / 'INTERMEDIATE'
+    convert_path = benchmark_path / 'CONVERT'
+    extract_path = benchmark_path / 'EXTRACT'
+    shutil.rmtree(extract_path, ignore_errors=True)
+    shutil.rmtree(intermediate_path, ignore_errors=True)
+    shutil.rmtree(convert_path, ignore_errors=True)
+    intermediate_path.mkdir(parents=True, exist_ok=True)
+    convert_path.mkdir(parents=True, exist_ok=True)
+
+    benchmark_config = dict(config, extract_folder=str(extract_path),
+                            intermediate_folder=str(intermediate_path), convert_folder=str(convert_path))
+    (benchmark_path / 'config.json').write_text(json.dumps(benchmark_config, indent=4), encoding='utf-8')
+
+    # line for every converted file would be timed too
+    os.environ['ZENGIN_FILE_LOG'] = '0'
+
+    random_generator = random.Random(seed)
+    result_list = []
+    polygon_count_dict = {}
+
+    benchmark_textures(result_list, random_generator, extract_path, convert_path, scale)
+    polygon_count_dict.update(benchmark_world(result_list, random_generator, intermediate_path, scale))
+    polygon_count_dict.update(benchmark_multiresolution_mesh(result_list, random_generator, intermediate_path, scale))
+    polygon_count_dict.update(benchmark_model(result_list, random_generator, intermediate_path, scale))
+
+    if use_blender:
+        blender_executable_file_path = Path(config.get('blender_folder', '')) / 'blender.exe'
+        if not blender_executable_file_path.exists():
+            blender_executable_file_path = Path(convert_all.find_latest_blender()) / 'blender.exe'
+        if not blender_executable_file_path.exists():
+            print(f'[BENCHMARK] ERROR: can\'t find blender executable file: {blender_executable_file_path}')
+        else:
+            benchmark_blender(result_list, benchmark_path, intermediate_path, polygon_count_dict,
+                              blender_executable_file_path, blender_instances)
+
+    report = {'label': label,
+              'date': datetime.now().isoformat(timespec='seconds'),
+              'platform': platform.platform(),
+              'python': sys.version.split()[0],
+              'cpu_count': os.cpu_count(),
+              'scale': scale,
+              'seed': seed,
+              'results': result_list}
+
+    result_folder_path = benchmark_path / 'results'
+    result_folder_path.mkdir(parents=True, exist_ok=True)
+    result_file_name = datetime.now().strftime('%Y%m%d_%H%M%S') + (f'_{label}' if label else '') + '.json'
+    result_file_path = result_folder_path / result_file_name
+    result_file_path.write_text(json.dumps(report, indent=4, ensure_ascii=False), encoding='utf-8')
+    print(f'[BENCHMARK] Results saved to {result_file_path}')
+
+    if compare_file_path:
+        compare(result_list, compare_file_path)
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--scale', type=float, default=1.0,
+                        help='multiply count of polygons, vobs and files, 0.1 - quick run')
+    parser.add_argument('--label', default='', help='name of run, added to result file name')
+    parser.add_argument('--blender', action='store_true', help='also run blender loaders for generated files')
+    parser.add_argument('-b', '--blender-instances', type=int, default=1, help='blender instances for loaders')
+    parser.add_argument('--compare', default=None, help='result file of previous run to compare with')
+    parser.add_argument('--seed', type=int, default=0, help='seed of random generator, same seed - same data')
+    arguments = parser.parse_args()
+
+    run(scale=arguments.scale, label=arguments.label, use_blender=arguments.blender,
+        blender_instances=arguments.blender_instances, compare_file_path=arguments.compare, seed=arguments.seed)
@@ -0,0 +1,412 @@
+import hashlib
+import json
+from pathlib import Path
+
+import helpers
+import manifest
+import metrics
+import progress
+
+
+# increase when output of any converter changed, all files will be converted again
+CONVERTER_VERSION = 2
+
+# config keys which change result of blender import
+BLENDER_CONFIG_KEY_LIST = ['export_format', 'use_gothic_normals', 'rename_bones', 'add_root_bone', 'split_world']
+# config keys which change textures used by materials, only for blender stages with materials
+BLENDER_TEXTURE_CONFIG_KEY_LIST = ['texture_format', 'texture_dedup', 'texture_animation_sheets']
+# config keys which change result of only some blender stages
+BLENDER_STAGE_CONFIG_KEY_DICT = {'ZEN_BLENDER': BLENDER_TEXTURE_CONFIG_KEY_LIST + ['texture_atlas'],
+                                 'MRM_BLENDER': BLENDER_TEXTURE_CONFIG_KEY_LIST,
+                                 'MDL_BLENDER': BLENDER_TEXTURE_CONFIG_KEY_LIST,
+                                 'MDM_BLENDER': BLENDER_TEXTURE_CONFIG_KEY_LIST,
+                                 'MMB_BLENDER': BLENDER_TEXTURE_CONFIG_KEY_LIST}
+
+
+def get_file_hash(file_path):
+    file_hash = hashlib.blake2b(digest_size=16)
+    with open(file_path, 'rb') as file:
+        while chunk := file.read(1024 * 1024):
+            file_hash.update(chunk)
+
+    return file_hash.hexdigest()
+
+
+def get_file_info(file_path, previous_file_info=None):
+    # file is not extracted, converter read it from archive
+    if not Path(file_path).exists() and manifest.get_file_info(file_path):
+        return manifest.get_source_info(file_path)
+
+    stat = Path(file_path).stat()
+
+    # same size and modification time - don't read file again
+    if (previous_file_info and previous_file_info['size'] == stat.st_size and
+            previous_file_info['mtime'] == stat.st_mtime_ns):
+        return previous_file_info
+
+    # extracted file - hash is in extract manifest
+    file_hash = manifest.get_extracted_hash(file_path, stat) or get_file_hash(file_path)
+
+    return {'hash': file_hash, 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+
+
+def get_list_digest(item_list):
+    list_hash = hashlib.blake2b(digest_size=16)
+    for item in sorted(str(item) for item in item_list):
+        list_hash.update(item.encode('utf-8'))
+        list_hash.update(b'\n')
+
+    return list_hash.hexdigest()
+
+
+def load(database_file_path, config):
+    database = None
+    if Path(database_file_path).exists():
+        try:
+            database = json.loads(Path(database_file_path).read_text(encoding='utf-8'))
+        except ValueError:
+            print(f'[BUILD DATABASE] WARNING: can\'t read {database_file_path}, full rebuild.')
+
+    if database is None or database.get('version') != CONVERTER_VERSION:
+        database = {'version': CONVERTER_VERSION, 'stages': {}}
+
+    database['config'] = config
+
+    return database
+
+
+def save(database, database_file_path):
+    Path(database_file_path).parent.mkdir(exist_ok=True, parents=True)
+    json_data = json.dumps(database, indent=4, ensure_ascii=False)
+    Path(database_file_path).write_text(json_data, encoding='utf-8')
+
+
+def get_stage_config(database, config_key_list=None, extra_config=None):
+    stage_config = {key: database['config'].get(key) for key in (config_key_list or [])}
+    if extra_config:
+        stage_config.update(extra_config)
+
+    return stage_config
+
+
+def get_blender_config_key_list(stage):
+    return BLENDER_CONFIG_KEY_LIST + BLENDER_STAGE_CONFIG_KEY_DICT.get(stage, [])
+
+
+def get_source_info_dict(previous_entry, source_file_path_list):
+    previous_source_info_dict = previous_entry['sources'] if previous_entry else {}
+
+    source_info_dict = {}
+    for source_file_path in source_file_path_list:
+        source_file_path = str(source_file_path)
+        source_info_dict[source_file_path] = get_file_info(source_file_path, previous_source_info_dict.get(source_file_path))
+
+    return source_info_dict
+
+
+def is_up_to_date(entry, source_file_path, stage_config):
+    if entry is None or entry['config'] != stage_config:
+        return False
+
+    for output_path in entry['outputs']:
+        if not Path(output_path).exists():
+            return False
+
+    # main file and all files which was read during convert
+    source_file_path_list = [source_file_path] + [path for path in entry['sources'] if path != str(source_file_path)]
+    for path in source_file_path_list:
+        if not manifest.exists(path):
+            return False
+
+    source_info_dict = get_source_info_dict(entry, source_file_path_list)
+    for path, source_info in source_info_dict.items():
+        if path not in entry['sources'] or entry['sources'][path]['hash'] != source_info['hash']:
+            return False
+
+    # keep new mtime, so next time file will not be read
+    entry['sources'] = source_info_dict
+
+    return True
+
+
+def remove_outputs(output_path_list, keep_output_path_list=None):
+    keep_output_path_set = set(keep_output_path_list or [])
+    for output_path in output_path_list:
+        if output_path in keep_output_path_set:
+            continue
+        Path(output_path).unlink(missing_ok=True)
+
+
+def convert_file_cached(source_file_path, function, arguments, previous_entry, stage_config):
+    if is_up_to_date(previous_entry, source_file_path, stage_config):
+        return dict(previous_entry, skipped=True)
+
+    # converter return {'outputs': [...], 'dependencies': [...], 'info': {...}}, dependencies - other files which was read
+    # info - data about converted file for index files, kept in database for not changed files
+    result, file_metrics = metrics.measure_file(function, arguments)
+    output_path_list = [str(path) for path in result.get('outputs', [])]
+    dependency_path_list = [str(path) for path in result.get('dependencies', [])]
+
+    if previous_entry:
+        remove_outputs(previous_entry['outputs'], output_path_list)
+
+    source_info_dict = get_source_info_dict(previous_entry, [source_file_path] + dependency_path_list)
+    entry = {'sources': source_info_dict, 'config': stage_config, 'outputs': output_path_list, 'skipped': False,
+             'metrics': file_metrics}
+    if result.get('info') is not None:
+        entry['info'] = result['info']
+
+    return entry
+
+
+def remove_stale_entries(database, stage, source_key_list):
+    stage_dict = database['stages'].setdefault(stage, {})
+    source_key_set = set(source_key_list)
+    for source_key in list(stage_dict):
+        if source_key in source_key_set:
+            continue
+
+        # source file was deleted, delete all files converted from it
+        remove_outputs(stage_dict[source_key]['outputs'])
+        del stage_dict[source_key]
+        print(f'[{stage}] removed: {source_key}')
+
+
+def run_parse_stage(database, stage, function, argument_list, jobs=1, config_key_list=None, extra_config=None, executor=None,
+                    feed=None, sort_by_size=True):
+    # first argument of converter is source file
+    # with feed every ready (or not changed) output is passed to consumer stage at once
+    def on_result(index, result):
+        entry, error = result
+        progress.advance(stage, failed=entry is None)
+        if feed and entry:
+            for output_path in entry['outputs']:
+                helpers.put_feed(feed, str(output_path))
+
+    # biggest files first, so workers finish at about same time, without sort_by_size order of caller is kept
+    if sort_by_size:
+        argument_list = sorted(argument_list, key=lambda arguments: manifest.get_size(arguments[0]), reverse=True)
+
+    progress.add_total(stage, len(argument_list))
+    try:
+        if database is None:
+            return helpers.run_parallel(function, argument_list, jobs, executor, on_result)
+
+        stage_dict = database['stages'].setdefault(stage, {})
+        source_key_list = [str(arguments[0]) for arguments in argument_list]
+        remove_stale_entries(database, stage, source_key_list)
+
+        stage_config = get_stage_config(database, config_key_list, extra_config)
+        cached_argument_list = [(arguments[0], function, arguments, stage_dict.get(source_key), stage_config)
+                                for source_key, arguments in zip(source_key_list, argument_list)]
+        result_list = helpers.run_parallel(convert_file_cached, cached_argument_list, jobs, executor, on_result)
+    finally:
+        if feed:
+            helpers.close_feed(feed)
+        progress.finish(stage)
+
+    skipped_count = 0
+    failed_count = 0
+    file_metrics_list = []
+    for source_key, (entry, error) in zip(source_key_list, result_list):
+        if entry is None:
+            # failed file will be converted again next run
+            stage_dict.pop(source_key, None)
+            failed_count += 1
+            continue
+        if entry.pop('skipped'):
+            skipped_count += 1
+        if 'metrics' in entry:
+            file_metrics_list.append(entry.pop('metrics'))
+        stage_dict[source_key] = entry
+
+    metrics.add_file_metrics(stage, file_metrics_list)
+    metrics.add_stage_metrics(stage, {'skipped_files': skipped_count, 'failed_files': failed_count})
+
+    if skipped_count:
+        print(f'[{stage}] {skipped_count} of {len(argument_list)} files not changed, skipped')
+
+    return result_list
+
+
+def get_texture_source_dict(database):
+    # {TEXTURE NAME: [converted files]} from texture index of convert_textures.py, blender materials load these files
+    # and exports embed them, so they are sources of blender outputs too
+    convert_path = Path(database['config'].get('convert_folder', ''))
+    if not convert_path.is_absolute():
+        convert_path = Path.cwd() / convert_path
+    texture_index_file_path = convert_path / 'texture_index.json'
+    if not texture_index_file_path.exists():
+        return {}
+
+    texture_index = json.loads(texture_index_file_path.read_text(encoding='utf-8'))
+    texture_source_dict = {}
+    for texture in texture_index['textures']:
+        texture_source_dict.setdefault(texture['name'], []).append(texture['path'])
+    for alias in texture_index.get('aliases', []):
+        texture_source_dict.setdefault(alias['name'], []).append(alias['path'] if alias.get('link') else alias['target'])
+    for animation in texture_index.get('animations', []):
+        for frame_name in animation['frame_names']:
+            texture_source_dict.setdefault(frame_name, []).append(animation['path'])
+
+    return texture_source_dict
+
+
+def get_used_texture_dict(database, stage):
+    # {output of parse stage: [TEXTURE NAME]}, textures of materials and decals, see helpers.collect_textures
+    used_texture_dict = {}
+    for entry in database['stages'].get(stage[:-len('_BLENDER')], {}).values():
+        for output_path in entry['outputs']:
+            used_texture_dict[str(output_path)] = (entry.get('info') or {}).get('textures', [])
+
+    return used_texture_dict
+
+
+def is_blender_up_to_date(entry, source_key, stage_config, texture_source_dict):
+    # texture which was not converted before can be converted now
+    if entry and any(texture_name in texture_source_dict for texture_name in entry.get('missing_textures', [])):
+        return False
+
+    return is_up_to_date(entry, source_key, stage_config)
+
+
+def update_blender_entries(database, stage, stage_config, blender_result_list, texture_source_dict):
+    stage_dict = database['stages'].setdefault(stage, {})
+    used_texture_dict = get_used_texture_dict(database, stage)
+    # same texture is used by many files, it is hashed once
+    known_source_info_dict = {}
+    for blender_result in blender_result_list:
+        source_key = blender_result['file']
+        previous_entry = stage_dict.pop(source_key, None)
+        if blender_result['error']:
+            continue
+
+        if previous_entry:
+            remove_outputs(previous_entry['outputs'], blender_result['outputs'])
+
+        # binary geometry and texture atlas next to json are read by blender too
+        source_path_list = [source_key]
+        for suffix in ['.bin', '.atlas.json']:
+            side_file_path = Path(source_key).with_suffix(suffix)
+            if side_file_path.exists():
+                source_path_list.append(side_file_path)
+
+        # converted textures used by materials, names of not converted textures are kept to check them next time
+        missing_texture_list = []
+        for texture_name in used_texture_dict.get(source_key, []):
+            texture_name = texture_name[:-4] if texture_name.endswith('.TGA') else texture_name
+            if texture_name in texture_source_dict:
+                source_path_list.extend(texture_source_dict[texture_name])
+            else:
+                missing_texture_list.append(texture_name)
+
+        previous_source_info_dict = dict(known_source_info_dict, **(previous_entry['sources'] if previous_entry else {}))
+        source_info_dict = get_source_info_dict({'sources': previous_source_info_dict},
+                                                dict.fromkeys(str(path) for path in source_path_list))
+        known_source_info_dict.update(source_info_dict)
+        stage_dict[source_key] = {'sources': source_info_dict, 'config': stage_config, 'outputs': blender_result['outputs'],
+                                  'missing_textures': missing_texture_list}
+
+
+def run_blender_stream_stage(database, stage, blender_script_file_path, file_pattern, feed, blender_instances, blender_pool):
+    import fnmatch
+    import threading
+
+    # files come from parse stage while it still work, only warm blenders from pool are used
+    stage_dict = database['stages'].setdefault(stage, {}) if database else {}
+    stage_config = get_stage_config(database, get_blender_config_key_list(stage)) if database else None
+    texture_source_dict = get_texture_source_dict(database) if database else {}
+
+    def on_result(blender_result):
+        progress.advance(stage, failed=bool(blender_result['error']))
+
+    # not more than two files for every blender in work, other files wait in feed
+    pending_semaphore = threading.BoundedSemaphore(max(blender_instances, 1) * 2)
+    source_key_list = []
+    future_list = []
+    for source_key in helpers.read_feed(feed):
+        if not fnmatch.fnmatch(Path(source_key).name, file_pattern):
+            continue
+        source_key_list.append(source_key)
+        if database and is_blender_up_to_date(stage_dict.get(source_key), source_key, stage_config, texture_source_dict):
+            continue
+
+        progress.add_total(stage, 1)
+        pending_semaphore.acquire()
+        future = blender_pool['executor'].submit(helpers.run_blender_server_job, blender_pool['server_queue'],
+                                                 blender_script_file_path, [source_key], on_result=on_result)
+        future.add_done_callback(lambda _: pending_semaphore.release())
+        future_list.append(future)
+
+    blender_result_list = [future.result()[0] for future in future_list]
+    progress.finish(stage)
+
+    skipped_count = len(source_key_list) - len(future_list)
+    if skipped_count:
+        print(f'[{stage}] {skipped_count} of {len(source_key_list)} files not changed, skipped')
+    metrics.add_stage_metrics(stage, {'skipped_files': skipped_count})
+    metrics.add_blender_metrics(stage, blender_result_list)
+
+    if database:
+        remove_stale_entries(database, stage, source_key_list)
+        update_blender_entries(database, stage, stage_config, blender_result_list, texture_source_dict)
+
+    return blender_result_list
+
+
+def find_stage_outputs(database, stage, intermediate_path, file_pattern):
+    import fnmatch
+
+    # files for blender stage are outputs of its parse stage, without scan of intermediate folder
+    # parse stage can take outputs of other parse stage by its name
+    parse_stage = stage[:-len('_BLENDER')] if stage.endswith('_BLENDER') else stage
+    if database is None or parse_stage not in database['stages']:
+        return [str(json_file_path) for json_file_path in Path(intermediate_path).rglob(file_pattern)]
+
+    return sorted({output_path for entry in database['stages'][parse_stage].values() for output_path in entry['outputs']
+                   if fnmatch.fnmatch(Path(output_path).name, file_pattern)})
+
+
+def run_blender_stage(database, stage, blender_executable_file_path, blender_script_file_path, intermediate_path, file_pattern,
+                      blender_instances=1, blender_pool=None, feed=None):
+    if feed:
+        return run_blender_stream_stage(database, stage, blender_script_file_path, file_pattern, feed,
+                                        blender_instances, blender_pool)
+
+    source_key_list = find_stage_outputs(database, stage, intermediate_path, file_pattern)
+
+    if database is None:
+        todo_json_file_path_list = source_key_list
+    else:
+        stage_dict = database['stages'].setdefault(stage, {})
+        remove_stale_entries(database, stage, source_key_list)
+
+        stage_config = get_stage_config(database, get_blender_config_key_list(stage))
+        texture_source_dict = get_texture_source_dict(database)
+        todo_json_file_path_list = []
+        for source_key in source_key_list:
+            if not is_blender_up_to_date(stage_dict.get(source_key), source_key, stage_config, texture_source_dict):
+                todo_json_file_path_list.append(source_key)
+
+        skipped_count = len(source_key_list) - len(todo_json_file_path_list)
+        if skipped_count:
+            print(f'[{stage}] {skipped_count} of {len(source_key_list)} files not changed, skipped')
+        metrics.add_stage_metrics(stage, {'skipped_files': skipped_count})
+
+    if len(todo_json_file_path_list) == 0:
+        return []
+
+    def on_result(blender_result):
+        progress.advance(stage, failed=bool(blender_result['error']))
+
+    progress.add_total(stage, len(todo_json_file_path_list))
+    job_folder_path = Path(intermediate_path) / '_jobs'
+    blender_result_list = helpers.run_blender_shards(blender_executable_file_path, blender_script_file_path,
+                                                     todo_json_file_path_list, job_folder_path / stage,
+                                                     blender_instances, blender_pool, on_result)
+    progress.finish(stage)
+    metrics.add_blender_metrics(stage, blender_result_list)
+    if database:
+        update_blender_entries(database, stage, stage_config, blender_result_list, texture_source_dict)
+
+    return blender_result_list
@@ -1,8 +1,11 @@
+import argparse
 import json
+import os
 import shutil
 from pathlib import Path
 
 import convert_textures
+import convert_atlas
 import convert_model_hierarchy
 import convert_model_scripts
 import convert_model
@@ -11,7 +14,12 @@ import convert_morph_mesh
 import convert_multiresolution_mesh
 import convert_model_animations
 import convert_worlds
+import build_database
+import extract_all
 import helpers
+import manifest
+import metrics
+import progress
 
 
 def find_latest_blender():
@@ -21,7 +29,7 @@ def find_latest_blender():
         if not blender_foundation_folder_path.exists():
             continue
 
-        blender_folder_path_list = list(blender_foundation_folder_path.glob(f'*'))
+        blender_folder_path_list = list(blender_foundation_folder_path.glob('*'))
         blender_folder_path_list = sorted([path for path in blender_folder_path_list if path.is_dir()])
 
         if len(blender_folder_path_list):
@@ -30,7 +38,7 @@ def find_latest_blender():
     return ''
 
 
-def convert():
+def convert(jobs=None, blender_instances=None, rebuild=False):
     config_file_path = Path('config.json')
     if not config_file_path.exists():
         print(f'ERROR: can\'t find config file [{config_file_path}].')
@@ -48,6 +56,10 @@ def convert():
     if not convert_path.is_absolute():
         convert_path = Path.cwd() / convert_path
 
+    # files are read from archives, list of files is made from archives every time, it is fast
+    if config.get('extract_direct', False):
+        extract_all.extract(jobs, direct=True)
+
     if not extract_path.exists():
         print(f'ERROR: folder "{extract_path}" not exist!')
         return
@@ -57,42 +69,220 @@ def convert():
         blender_folder = find_latest_blender()
         blender_executable_file_path = Path(blender_folder) / 'blender.exe'
         if not blender_executable_file_path.exists():
-            print(f'ERROR: can\'t find blender executable file.')
+            print('ERROR: can\'t find blender executable file.')
             return
         else:
             print(f'WARNING: Blender folder don\'t setup in config, used blender with path: {blender_folder}')
 
-    shutil.rmtree(intermediate_path, ignore_errors=True)
-    intermediate_path.mkdir(parents=True, exist_ok=True)
+    jobs = helpers.get_jobs(config, jobs)
+    blender_instances = helpers.get_blender_instances(config, blender_instances)
+    print(f'[CONVERT] Use {jobs} worker processes and {blender_instances} blender instances')
 
-    shutil.rmtree(convert_path, ignore_errors=True)
+    if rebuild:
+        shutil.rmtree(intermediate_path, ignore_errors=True)
+        shutil.rmtree(convert_path, ignore_errors=True)
+
+    intermediate_path.mkdir(parents=True, exist_ok=True)
     convert_path.mkdir(parents=True, exist_ok=True)
 
-    convert_textures.convert(extract_path, convert_path)
+    # files with same source, config and converter version will be skipped
+    database_file_path = intermediate_path / 'build_database.json'
+    database = build_database.load(database_file_path, config)
+    metrics.start_report()
+
+    # line for every file from worker processes and blenders is replaced by progress lines of stages
+    os.environ['ZENGIN_FILE_LOG'] = '1' if config.get('file_log', False) else '0'
+    progress.start(config.get('progress_interval', 5))
+    try:
+        convert_stages(extract_path, intermediate_path, convert_path, blender_executable_file_path, jobs, blender_instances,
+                       config, database)
+    finally:
+        build_database.save(database, database_file_path)
+        metrics.finish_report(intermediate_path / 'reports', config.get('report_slowest_files', 10))
+
+
+def get_blender_script_file_path(script_name):
+    return Path.cwd() / 'import_zengin_json' / script_name
+
+
+def get_texture_arguments(config):
+    return {'texture_format': config.get('texture_format', 'TGA'), 'texture_dedup': config.get('texture_dedup', False),
+            'texture_demand': config.get('texture_demand', False),
+            'texture_always_include': config.get('texture_always_include', []),
+            'texture_lod_levels': config.get('texture_lod_levels', []),
+            'texture_animation_sheets': config.get('texture_animation_sheets', False)}
+
+
+def get_atlas_arguments(config):
+    return {'page_size': config.get('texture_atlas_page_size', 2048), 'padding': config.get('texture_atlas_padding', 4)}
+
+
+def get_stage_list(extract_path, intermediate_path, convert_path, blender_executable_file_path, jobs, blender_instances,
+                   stream_queue_size, geometry_json, texture_arguments, atlas_arguments, database, executor, blender_pool):
+    # only real dependencies, all other stages run at same time
+    # blender stages need textures for materials
+    parse_arguments = {'jobs': jobs, 'database': database, 'executor': executor}
+    blender_arguments = {'database': database, 'blender_instances': blender_instances, 'blender_pool': blender_pool}
+
+    # with stream parse stage pass every ready file to blender stage, so blender don't wait end of parse stage
+    feed_dict = {}
+    if stream_queue_size > 0:
+        feed_dict = {name: helpers.create_feed(stream_queue_size) for name in ['MDL', 'MDM', 'MMB', 'MRM', 'MAN', 'ZEN']}
+        # world blender wait for atlas, atlas need all textures
+        if atlas_arguments:
+            del feed_dict['ZEN']
+        # textures are converted after these parse stages, their blender stages can't read feed before it
+        # and full feed would stop parse stage forever
+        if texture_arguments['texture_demand']:
+            for name in convert_textures.MATERIAL_STAGE_LIST:
+                feed_dict.pop(name, None)
 
-    convert_model_hierarchy.convert(extract_path, intermediate_path, convert_path)
+    stage_list = [
+        {'name': 'TEX', 'dependencies': [],
+         'function': lambda: convert_textures.convert(extract_path, convert_path, **texture_arguments, **parse_arguments)},
+        {'name': 'MDH', 'dependencies': [],
+         'function': lambda: convert_model_hierarchy.convert(extract_path, intermediate_path, convert_path, **parse_arguments)},
+        {'name': 'MSB', 'dependencies': [],
+         'function': lambda: convert_model_scripts.convert(extract_path, intermediate_path, convert_path, **parse_arguments)},
 
-    convert_model_scripts.convert(extract_path, intermediate_path, convert_path)
+        {'name': 'MDL', 'dependencies': [],
+         'function': lambda: convert_model.prepare(extract_path, intermediate_path, feed=feed_dict.get('MDL'),
+                                                   **parse_arguments)},
+        {'name': 'MDL_BLENDER', 'dependencies': ['MDL', 'TEX'],
+         'function': lambda: convert_model.convert_via_blender(intermediate_path, blender_executable_file_path,
+                                                               get_blender_script_file_path('import_mdl.py'),
+                                                               feed=feed_dict.get('MDL'), **blender_arguments)},
 
-    blender_script_file_path = Path.cwd() / 'import_zengin_json' / 'import_mdl.py'
-    convert_model.convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path)
+        # model mesh must be after "model hierarchy" and after "model"
+        {'name': 'MDM', 'dependencies': ['MDH', 'MDL'],
+         'function': lambda: convert_model_mesh.prepare(extract_path, intermediate_path, feed=feed_dict.get('MDM'),
+                                                        **parse_arguments)},
+        {'name': 'MDM_BLENDER', 'dependencies': ['MDM', 'TEX'],
+         'function': lambda: convert_model_mesh.convert_via_blender(intermediate_path, blender_executable_file_path,
+                                                                    get_blender_script_file_path('import_mdm.py'),
+                                                                    feed=feed_dict.get('MDM'), **blender_arguments)},
 
-    # model mesh must be after "model hierarchy" and after "model"
-    blender_script_file_path = Path.cwd() / 'import_zengin_json' / 'import_mdm.py'
-    convert_model_mesh.convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path)
+        {'name': 'MMB', 'dependencies': [],
+         'function': lambda: convert_morph_mesh.prepare(extract_path, intermediate_path, feed=feed_dict.get('MMB'),
+                                                        **parse_arguments)},
+        {'name': 'MMB_BLENDER', 'dependencies': ['MMB', 'TEX'],
+         'function': lambda: convert_morph_mesh.convert_via_blender(intermediate_path, blender_executable_file_path,
+                                                                    get_blender_script_file_path('import_mmb.py'),
+                                                                    feed=feed_dict.get('MMB'), **blender_arguments)},
 
-    blender_script_file_path = Path.cwd() / 'import_zengin_json' / 'import_mmb.py'
-    convert_morph_mesh.convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path)
+        {'name': 'MRM', 'dependencies': [],
+         'function': lambda: convert_multiresolution_mesh.prepare(extract_path, intermediate_path, feed=feed_dict.get('MRM'),
+                                                                  geometry_json=geometry_json, **parse_arguments)},
+        {'name': 'MRM_BLENDER', 'dependencies': ['MRM', 'TEX'],
+         'function': lambda: convert_multiresolution_mesh.convert_via_blender(intermediate_path, blender_executable_file_path,
+                                                                              get_blender_script_file_path('import_mrm.py'),
+                                                                              feed=feed_dict.get('MRM'), **blender_arguments)},
 
-    blender_script_file_path = Path.cwd() / 'import_zengin_json' / 'import_mrm.py'
-    convert_multiresolution_mesh.convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path)
+        {'name': 'MAN', 'dependencies': ['MDH'],
+         'function': lambda: convert_model_animations.prepare(extract_path, intermediate_path, feed=feed_dict.get('MAN'),
+                                                              **parse_arguments)},
+        {'name': 'MAN_BLENDER', 'dependencies': ['MAN'],
+         'function': lambda: convert_model_animations.convert_via_blender(intermediate_path, blender_executable_file_path,
+                                                                          get_blender_script_file_path('import_man.py'),
+                                                                          feed=feed_dict.get('MAN'), **blender_arguments)},
 
-    blender_script_file_path = Path.cwd() / 'import_zengin_json' / 'import_man.py'
-    convert_model_animations.convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path)
+        {'name': 'ZEN', 'dependencies': [],
+         'function': lambda: convert_worlds.prepare(extract_path, intermediate_path, feed=feed_dict.get('ZEN'),
+                                                    geometry_json=geometry_json, **parse_arguments)},
+        {'name': 'ZEN_BLENDER', 'dependencies': ['ZEN', 'TEX'],
+         'function': lambda: convert_worlds.convert_via_blender(intermediate_path, blender_executable_file_path,
+                                                                get_blender_script_file_path('import_zen.py'),
+                                                                feed=feed_dict.get('ZEN'), **blender_arguments)},
+    ]
 
-    blender_script_file_path = Path.cwd() / 'import_zengin_json' / 'import_zen.py'
-    convert_worlds.convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path)
+    # not tiling textures of world are packed to pages, world blender use pages instead of textures
+    if atlas_arguments:
+        stage_list.append({'name': 'ATLAS', 'type': 'ZEN', 'dependencies': ['ZEN', 'TEX'],
+                           'function': lambda: convert_atlas.convert(intermediate_path, convert_path, **atlas_arguments,
+                                                                     **parse_arguments)})
+        for stage in stage_list:
+            if stage['name'] == 'ZEN_BLENDER':
+                stage['dependencies'].append('ATLAS')
+
+    # only textures used by materials, they are known after parse of worlds and meshes
+    if texture_arguments['texture_demand']:
+        for stage in stage_list:
+            if stage['name'] == 'TEX':
+                stage['dependencies'] = list(convert_textures.MATERIAL_STAGE_LIST)
+
+    for stage in stage_list:
+        parse_stage_name = stage['name'].replace('_BLENDER', '')
+        if stage['name'].endswith('_BLENDER') and parse_stage_name in feed_dict:
+            stage['dependencies'].remove(parse_stage_name)
+            stage['cancel'] = lambda feed=feed_dict[parse_stage_name]: helpers.cancel_feed(feed)
+        # consumer don't wait forever if producer failed before close of feed or was skipped
+        if stage['name'] in feed_dict:
+            stage['finish'] = lambda feed=feed_dict[stage['name']]: helpers.close_feed(feed)
+
+    return stage_list
+
+
+def remove_stages_without_files(stage_list, type_set):
+    # extract filters can skip whole asset types, stages of these types have nothing to convert
+    if type_set is None:
+        return stage_list
+
+    # stage without own asset type use files of other type
+    removed_set = {stage['name'] for stage in stage_list
+                   if stage.get('type', stage['name'].replace('_BLENDER', '')) not in type_set}
+    if removed_set:
+        print(f'[CONVERT] Skip stages without extracted files: {", ".join(sorted(removed_set))}')
+
+    stage_list = [stage for stage in stage_list if stage['name'] not in removed_set]
+    for stage in stage_list:
+        stage['dependencies'] = [dependency for dependency in stage['dependencies'] if dependency not in removed_set]
+
+    return stage_list
+
+
+def convert_stages(extract_path, intermediate_path, convert_path, blender_executable_file_path, jobs, blender_instances,
+                   config, database):
+    # one process pool for all parse stages, so stages running at same time don't overload cpu
+    # same for blender - all blender stages together run not more than blender_instances blenders
+    executor = helpers.create_process_pool(jobs) if jobs > 1 else None
+
+    # warm blenders are started on first blender job and used by all blender stages
+    blender_server_script_file_path = None
+    use_blender_server = config.get('blender_server', True)
+    if use_blender_server:
+        blender_server_script_file_path = get_blender_script_file_path('job_server.py')
+    blender_pool = helpers.create_blender_pool(blender_instances, blender_executable_file_path,
+                                               blender_server_script_file_path)
+    try:
+        stage_list = get_stage_list(extract_path, intermediate_path, convert_path, blender_executable_file_path,
+                                    jobs, blender_instances,
+                                    config.get('blender_stream_queue', 0) if use_blender_server else 0,
+                                    config.get('geometry_json', False), get_texture_arguments(config),
+                                    get_atlas_arguments(config) if config.get('texture_atlas', False) else None,
+                                    database, executor, blender_pool)
+        stage_list = remove_stages_without_files(stage_list, manifest.get_type_set(extract_path))
+        if not config.get('texture_atlas', False):
+            convert_atlas.remove(database)
+        for stage in stage_list:
+            stage['function'] = metrics.measure_stage(stage['name'], stage['function'])
+        failed_stage_set = helpers.run_stage_graph(stage_list)
+    finally:
+        if executor:
+            executor.shutdown()
+        helpers.shutdown_blender_pool(blender_pool)
+
+    if failed_stage_set:
+        print(f'[CONVERT] ERROR: failed stages: {", ".join(sorted(failed_stage_set))}')
 
 
 if __name__ == '__main__':
-    convert()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='worker processes for parse stages, 0 - all cores (override "jobs" from config)')
+    parser.add_argument('-b', '--blender-instances', type=int, default=None,
+                        help='blender instances running at same time, 0 - all cores (override "blender_instances" from config)')
+    parser.add_argument('--rebuild', action='store_true',
+                        help='delete intermediate and convert folders, convert all files again')
+    arguments = parser.parse_args()
+
+    convert(jobs=arguments.jobs, blender_instances=arguments.blender_instances, rebuild=arguments.rebuild)
@@ -0,0 +1,242 @@
+import json
+from pathlib import Path
+
+from PIL import Image
+
+import build_database
+import helpers
+
+
+# materials with these names are split to own objects by import_zen.py, they stay with own textures
+SPLIT_MATERIAL_PREFIX_LIST = ['P:', 'PI:', 'PN:', 'S:', 'GHOSTOCCLUDER', 'SUN_BLOCKER']
+# uv a bit out of 0-1 is still inside of texture with padding
+UV_EPSILON = 0.001
+# dds with premultiplied alpha, pillow can't read them
+NOT_READABLE_FORMAT_LIST = ['DXT2', 'DXT4']
+
+
+def load_texture_dict(convert_path):
+    # {TEXTURE NAME: texture from texture_index.json}, same texture as blender material use, see utils.get_texture_info_dict
+    texture_index_file_path = Path(convert_path) / 'texture_index.json'
+    if not texture_index_file_path.exists():
+        return {}
+
+    texture_index = json.loads(texture_index_file_path.read_text(encoding='utf-8'))
+    return helpers.get_texture_index_dict(texture_index, helpers.get_texture_folder_list(convert_path), ['.tga', '.dds'])
+
+
+def get_uv_bounds(array_dict, material_count):
+    # [min u, min v, max u, max v] of all polygons of every material
+    bounds_list = [[float('inf'), float('inf'), float('-inf'), float('-inf')] for _ in range(material_count)]
+    _, texture = array_dict['texture']
+    _, polygon_feature_indices = array_dict['polygon_feature_indices']
+    _, polygon_loop_totals = array_dict['polygon_loop_totals']
+    _, polygon_material_indices = array_dict['polygon_material_indices']
+
+    loop_index = 0
+    for loop_total, material_index in zip(polygon_loop_totals, polygon_material_indices):
+        bounds = bounds_list[material_index]
+        for feature_index in polygon_feature_indices[loop_index:loop_index + loop_total]:
+            u = texture[feature_index * 2]
+            v = texture[feature_index * 2 + 1]
+            if u < bounds[0]:
+                bounds[0] = u
+            if v < bounds[1]:
+                bounds[1] = v
+            if u > bounds[2]:
+                bounds[2] = u
+            if v > bounds[3]:
+                bounds[3] = v
+        loop_index += loop_total
+
+    return bounds_list
+
+
+def is_atlas_material(material_dict, bounds, texture, max_texture_size):
+    # only not tiling and not animated textures, uv of all polygons inside of texture
+    material_name = material_dict['name'].upper()
+    if material_dict['matGroup'] == 'WATER' or material_dict['noCollDet']:
+        return False
+    if any(material_name.startswith(prefix) for prefix in SPLIT_MATERIAL_PREFIX_LIST):
+        return False
+    if material_dict.get('texAniFPS') or material_dict.get('texAniMapMode'):
+        return False
+    # scaled texture is tiled even if uv of mesh are inside of 0-1, 0 - scale is not set
+    if material_dict.get('texScale', [1.0, 1.0]) not in [[1.0, 1.0], [0.0, 0.0]]:
+        return False
+    if texture is None or texture.get('alpha') or texture.get('width') is None:
+        return False
+    if Path(texture['path']).suffix.upper() == '.DDS' and texture.get('format') in NOT_READABLE_FORMAT_LIST:
+        return False
+    if max(texture['width'], texture['height']) > max_texture_size:
+        return False
+    if bounds[0] > bounds[2]:
+        # material without polygons
+        return False
+
+    return (bounds[0] >= -UV_EPSILON and bounds[1] >= -UV_EPSILON and
+            bounds[2] <= 1.0 + UV_EPSILON and bounds[3] <= 1.0 + UV_EPSILON)
+
+
+def pack_textures(texture_list, page_size, padding):
+    # shelf packing, highest textures first, return {texture name: (page, x, y)}, x and y - corner of texture without padding
+    place_dict = {}
+    page = 0
+    x = 0
+    y = 0
+    shelf_height = 0
+    for texture in sorted(texture_list, key=lambda texture: (texture['height'], texture['width']), reverse=True):
+        width = texture['width'] + padding * 2
+        height = texture['height'] + padding * 2
+        if x + width > page_size:
+            # next shelf
+            x = 0
+            y += shelf_height
+            shelf_height = 0
+        if y + height > page_size:
+            page += 1
+            x = 0
+            y = 0
+            shelf_height = 0
+
+        place_dict[texture['name']] = (page, x + padding, y + padding)
+        x += width
+        shelf_height = max(shelf_height, height)
+
+    return place_dict
+
+
+def save_pages(texture_list, place_dict, page_size, padding, page_path_list):
+    # return names of textures which can't be read, their materials stay with own textures
+    failed_texture_set = set()
+    page_image_list = [Image.new('RGB', (page_size, page_size)) for _ in page_path_list]
+    for texture in texture_list:
+        page, x, y = place_dict[texture['name']]
+        try:
+            with Image.open(texture['path']) as image:
+                image = image.convert('RGB')
+        except Exception as error:
+            print(f'[ATLAS] WARNING: can\'t read texture "{texture["path"]}", it is not in atlas. Error: "{error}"')
+            failed_texture_set.add(texture['name'])
+            continue
+
+        # padding is filled by stretched texture, so filtering and mipmaps don't take color of neighbour
+        if padding > 0:
+            border_image = image.resize((texture['width'] + padding * 2, texture['height'] + padding * 2),
+                                        Image.Resampling.NEAREST)
+            page_image_list[page].paste(border_image, (x - padding, y - padding))
+        page_image_list[page].paste(image, (x, y))
+
+    for page_image, page_path in zip(page_image_list, page_path_list):
+        page_path.parent.mkdir(exist_ok=True, parents=True)
+        page_image.save(page_path)
+
+    return failed_texture_set
+
+
+def convert_file(zen_json_file_path, intermediate_path, convert_path, page_size=2048, padding=4):
+    zen_json_file_path = Path(zen_json_file_path)
+    relative_path = zen_json_file_path.relative_to(intermediate_path).parent
+    world_name = zen_json_file_path.stem.upper().replace('.ZEN', '').replace('.JSON', '')
+    atlas_file_path = zen_json_file_path.with_suffix('.atlas.json')
+
+    world_dict = json.loads(zen_json_file_path.read_text(encoding='utf-8'))
+    material_list = world_dict['materials']
+    geometry_file_path = zen_json_file_path.parent / world_dict['mesh']['geometry']['file']
+    array_dict = helpers.read_geometry(geometry_file_path, world_dict['mesh']['geometry'])
+    bounds_list = get_uv_bounds(array_dict, len(material_list))
+
+    # big textures take whole page, draw calls are not saved with them
+    texture_dict = load_texture_dict(convert_path)
+    atlas_texture_dict = {}
+    atlas_material_list = []
+    for material_dict, bounds in zip(material_list, bounds_list):
+        texture = texture_dict.get((material_dict['texture'] or material_dict['name']).upper())
+        if is_atlas_material(material_dict, bounds, texture, (page_size - padding * 2) // 2):
+            atlas_texture_dict[texture['name']] = texture
+            atlas_material_list.append((material_dict, texture))
+
+    # atlas with one texture don't save anything
+    if len(atlas_texture_dict) < 2:
+        atlas_file_path.write_text(json.dumps({'pages': [], 'materials': {}}, indent=4), encoding='utf-8')
+        helpers.print_file(f'[ATLAS] {relative_path / world_name}: no textures for atlas')
+        return {'outputs': [atlas_file_path], 'dependencies': [geometry_file_path]}
+
+    texture_list = list(atlas_texture_dict.values())
+    place_dict = pack_textures(texture_list, page_size, padding)
+
+    # pages are next to converted world, new materials have indices after materials of world
+    page_count = max(page for page, _, _ in place_dict.values()) + 1
+    page_path_list = [convert_path / relative_path / world_name / f'{world_name}_ATLAS_{page:02d}.TGA'
+                      for page in range(page_count)]
+    failed_texture_set = save_pages(texture_list, place_dict, page_size, padding, page_path_list)
+    texture_list = [texture for texture in texture_list if texture['name'] not in failed_texture_set]
+
+    # uv in atlas = offset + uv * scale, in zengin uv space (v from top of image)
+    material_remap_dict = {}
+    for material_dict, texture in atlas_material_list:
+        if texture['name'] in failed_texture_set:
+            continue
+        page, x, y = place_dict[texture['name']]
+        material_remap_dict[str(material_dict['index'])] = {
+            'name': material_dict['name'], 'texture': texture['name'], 'page': page,
+            'offset': [x / page_size, y / page_size],
+            'scale': [texture['width'] / page_size, texture['height'] / page_size]}
+
+    atlas_dict = {'page_size': page_size, 'padding': padding,
+                  'pages': [{'index': len(material_list) + page, 'name': page_path.stem, 'path': str(page_path)}
+                            for page, page_path in enumerate(page_path_list)],
+                  'materials': material_remap_dict}
+    atlas_file_path.write_text(json.dumps(atlas_dict, indent=4, ensure_ascii=False), encoding='utf-8')
+
+    helpers.print_file(f'[ATLAS] {relative_path / world_name}: {len(material_remap_dict)} materials, '
+                       f'{len(texture_list)} textures in {page_count} pages')
+
+    dependency_list = [geometry_file_path] + [texture['path'] for texture in atlas_texture_dict.values()]
+    return {'outputs': [atlas_file_path] + page_path_list, 'dependencies': dependency_list}
+
+
+def convert(intermediate_path, convert_path, jobs=1, database=None, executor=None, page_size=2048, padding=4):
+    zen_json_file_path_list = build_database.find_stage_outputs(database, 'ZEN_BLENDER', intermediate_path, '*.ZEN.json')
+
+    # textures which are taken for atlas, their alpha and size are in texture index, any change of it make atlas again
+    texture_index_file_path = Path(convert_path) / 'texture_index.json'
+    texture_index_hash = build_database.get_file_hash(texture_index_file_path) if texture_index_file_path.exists() else None
+
+    argument_list = [(zen_json_file_path, intermediate_path, convert_path, page_size, padding)
+                     for zen_json_file_path in zen_json_file_path_list]
+    result_list = build_database.run_parse_stage(database, 'ATLAS', convert_file, argument_list, jobs,
+                                                 ['texture_atlas_page_size', 'texture_atlas_padding'],
+                                                 extra_config={'texture_index': texture_index_hash}, executor=executor)
+    helpers.print_errors('ATLAS', result_list)
+
+
+def remove(database):
+    # texture_atlas is turned off, atlas files and pages of previous convert are not used anymore
+    if database and database['stages'].get('ATLAS'):
+        build_database.remove_stale_entries(database, 'ATLAS', [])
+        del database['stages']['ATLAS']
+
+
+def main():
+    config_file_path = Path('config.json')
+    config_data = config_file_path.read_text()
+    config = json.loads(config_data)
+
+    intermediate_path = Path(config['intermediate_folder'])
+    if not intermediate_path.is_absolute():
+        intermediate_path = Path.cwd() / intermediate_path
+    convert_path = Path(config['convert_folder'])
+    if not convert_path.is_absolute():
+        convert_path = Path.cwd() / convert_path
+
+    if not intermediate_path.exists():
+        print(f'ERROR: folder "{intermediate_path}" not exist!')
+        return
+
+    convert(intermediate_path, convert_path, jobs=helpers.get_jobs(config),
+            page_size=config.get('texture_atlas_page_size', 2048), padding=config.get('texture_atlas_padding', 4))
+
+
+if __name__ == '__main__':
+    main()
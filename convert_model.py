@@ -1,15 +1,13 @@
 import json
-import shutil
-from importlib.resources import read_text
 from pathlib import Path
-import subprocess
-from decimal import Decimal
 
 from zenkit import Model
 
 from convert_model_hierarchy import parse_mdh
 from convert_model_mesh import parse_model_mesh
+import build_database
 import helpers
+import manifest
 
 
 def rf(f):
@@ -25,41 +23,61 @@ def parse_model(model: Model):
     return model_dict
 
 
-def convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path):
-    mdl_file_path_list = list(Path(extract_path).rglob(f'*.MDL'))
+def convert_file(mdl_file_path, extract_path, intermediate_path):
+    relative_path = mdl_file_path.relative_to(extract_path).parent  # / zen_file_path.stem
 
-    for mdl_file_path in mdl_file_path_list:
-        relative_path = mdl_file_path.relative_to(extract_path).parent  # / zen_file_path.stem
+    # if 'Gothic II' not in str(mdl_file_path):  # Gothic II
+    #     return
 
-        # if 'Gothic II' not in str(mdl_file_path):  # Gothic II
-        #     continue
+    # if 'CR2_BODY' not in str(mdl_file_path):  # NW_HARBOUR_BARREL_01, CHESTBIG_OCCHESTMEDIUM, BARBQ_SCAV
+    #     return
 
-        # if 'CR2_BODY' not in str(mdl_file_path):  # NW_HARBOUR_BARREL_01, CHESTBIG_OCCHESTMEDIUM, BARBQ_SCAV
-        #     continue
+    model = None
+    try:
+        model = Model.load(manifest.read_file(mdl_file_path))
+    except:
+        raise RuntimeError(f'can\'t open: {relative_path / mdl_file_path.stem}.MDL')
 
-        model = None
-        try:
-            model = Model.load(mdl_file_path)
-        except:
-            print(f'[MODEL] ERROR: can\'t open: {relative_path / mdl_file_path.stem}.MDL')
-            continue
+    model_dict = parse_model(model)
 
-        model_dict = parse_model(model)
+    json_data = json.dumps(model_dict, indent=4, ensure_ascii=False)
 
-        json_data = json.dumps(model_dict, indent=4, ensure_ascii=False)
+    save_path = intermediate_path / relative_path
+    save_path.mkdir(exist_ok=True, parents=True)
 
-        save_path = intermediate_path / relative_path
-        save_path.mkdir(exist_ok=True, parents=True)
+    save_path = save_path / (mdl_file_path.stem + '.MDL.json')
+    save_path.write_text(json_data, encoding='utf-8')
 
-        save_path = save_path / (mdl_file_path.stem + '.MDL.json')
-        save_path.write_text(json_data, encoding='utf-8')
+    helpers.print_file(f'prepared: {relative_path / mdl_file_path.stem}.MDL')
 
-        print(f'prepared: {relative_path / mdl_file_path.stem}.MDL')
+    return {'outputs': [save_path], 'info': {'textures': helpers.collect_textures(model_dict)}}
+
+
+def prepare(extract_path, intermediate_path, jobs=1, database=None, executor=None, feed=None):
+    mdl_file_path_list = manifest.find_files(extract_path, '*.MDL')
+
+    argument_list = [(mdl_file_path, extract_path, intermediate_path) for mdl_file_path in mdl_file_path_list]
+    result_list = build_database.run_parse_stage(database, 'MDL', convert_file, argument_list, jobs, executor=executor, feed=feed)
+    helpers.print_errors('MODEL', result_list)
+
+
+def convert_via_blender(intermediate_path, blender_executable_file_path, blender_script_file_path, database=None,
+                        blender_instances=1, blender_pool=None, feed=None):
+    print('[MODEL] Start convert MDL via blender')
+    blender_result_list = build_database.run_blender_stage(database, 'MDL_BLENDER', blender_executable_file_path,
+                                                           blender_script_file_path, intermediate_path, '*.MDL.json',
+                                                           blender_instances, blender_pool, feed)
+    helpers.print_blender_errors('MODEL', blender_result_list)
+    print('[MODEL] End convert MDL via blender')
+
+
+def convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path, jobs=1, database=None,
+            blender_instances=1):
+    prepare(extract_path, intermediate_path, jobs=jobs, database=database)
 
     if __name__ != '__main__':
-        print(f'[MODEL] Start convert MDL via blender')
-        helpers.run_blender(blender_executable_file_path, blender_script_file_path)
-        print(f'[MODEL] End convert MDL via blender')
+        convert_via_blender(intermediate_path, blender_executable_file_path, blender_script_file_path, database=database,
+                            blender_instances=blender_instances)
 
 
 def main():
@@ -87,9 +105,11 @@ def main():
     blender_executable_file_path = Path(config['blender_folder']) / 'blender.exe'
     blender_script_file_path = Path.cwd() / 'import_zengin_json' / 'import_mdl.py'
 
-    convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path)
+    convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path,
+            jobs=helpers.get_jobs(config))
 
-    helpers.run_blender(blender_executable_file_path, blender_script_file_path)
+    convert_via_blender(intermediate_path, blender_executable_file_path, blender_script_file_path,
+                        blender_instances=helpers.get_blender_instances(config))
 
 
 if __name__ == '__main__':
@@ -1,13 +1,12 @@
 import json
-import shutil
 from pathlib import Path
-import subprocess
 
-from mathutils import Matrix, Quaternion, Vector
 
 from zenkit import ModelAnimation
 
+import build_database
 import helpers
+import manifest
 
 
 def rf(f, accuracy=4):
@@ -15,8 +14,6 @@ def rf(f, accuracy=4):
 
 
 def parse_man(model_animation, mdh_dict):
-    asc_name = str(model_animation.source_path).split('\\')[-1]
-
     if model_animation.checksum != mdh_dict['checksum']:
         return None
 
@@ -60,62 +57,87 @@ def parse_man(model_animation, mdh_dict):
     return animation_data
 
 
-def convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path):
-    man_file_path_list = list(Path(extract_path).rglob(f'*.MAN'))
-    for man_file_path in man_file_path_list:
-        relative_path = man_file_path.relative_to(extract_path)
+def convert_file(man_file_path, extract_path, intermediate_path, hierarchy_index_file_path):
+    relative_path = man_file_path.relative_to(extract_path)
 
-        game_type_folder = str(relative_path).split('/')[0]
-        game_type_folder = game_type_folder.split('\\')[0]
+    game_type_folder = str(relative_path).split('/')[0]
+    game_type_folder = game_type_folder.split('\\')[0]
 
-        # if 'HUMANS' not in str(man_file_path):
-        #     continue
-        #
-        # if 'VDF_Anims' not in str(man_file_path):
-        #     continue
+    # if 'HUMANS' not in str(man_file_path):
+    #     return
+    #
+    # if 'VDF_Anims' not in str(man_file_path):
+    #     return
 
-        model_animation = ModelAnimation.load(man_file_path)
-        checksum = model_animation.checksum
+    model_animation = ModelAnimation.load(manifest.read_file(man_file_path))
+    checksum = model_animation.checksum
 
-        # order is import
-        folder_path_list = ['Mod', 'Addon', 'Gothic II', 'Gothic']
-        for folder_path in folder_path_list[:]:
-            if folder_path.upper() != game_type_folder.upper():
-                folder_path_list.remove(folder_path)
-            else:
-                break
+    # hierarchies are found in index of stage, without scan of intermediate folder for every animation
+    hierarchy_index = helpers.load_hierarchy_index(hierarchy_index_file_path)
 
-        model_hierarchy_dict = None
-        for folder_path in folder_path_list:
-            mdh_file_path_list = list(Path(intermediate_path / folder_path).rglob(f'*.MDH.json'))
-            for temp_mdh_file_path in mdh_file_path_list:
-                mdh_data = temp_mdh_file_path.read_text()
-                mdh_dict = json.loads(mdh_data)
-                if 'checksum' in mdh_dict and mdh_dict['checksum'] == checksum:
-                    model_hierarchy_dict = mdh_dict
-                    break
-            if model_hierarchy_dict:
+    model_hierarchy_dict = None
+    model_hierarchy_file_path = None
+    for folder_path in helpers.get_hierarchy_folder_list(game_type_folder):
+        for mdh_info in hierarchy_index['mdh']:
+            if mdh_info['folder'] == folder_path and mdh_info['checksum'] == checksum:
+                model_hierarchy_file_path = Path(mdh_info['path'])
+                model_hierarchy_dict = json.loads(model_hierarchy_file_path.read_text())
                 break
+        if model_hierarchy_dict:
+            break
+
+    if model_hierarchy_dict is None:
+        raise RuntimeError(f'can\'t find model hierarchy for {relative_path / man_file_path.stem}.MAN')
+
+    man_data = parse_man(model_animation, model_hierarchy_dict)
+    man_data = {'hierarchy': model_hierarchy_dict, 'animation': man_data}
+
+    save_path = intermediate_path / (str(relative_path) + '.json')
+    save_path.parent.mkdir(exist_ok=True, parents=True)
+
+    json_data = json.dumps(man_data, indent=4, ensure_ascii=False, sort_keys=False, default=str)
+    save_path.write_text(json_data, encoding='utf-8')
+
+    helpers.print_file(f'prepared: {relative_path}')
+
+    return {'outputs': [save_path], 'dependencies': [model_hierarchy_file_path]}
+
+
+def prepare(extract_path, intermediate_path, jobs=1, database=None, executor=None, feed=None):
+    man_file_path_list = manifest.find_files(extract_path, '*.MAN')
+
+    # hierarchies are outputs of MDH stage, index of them is made once for all animations
+    mdh_file_path_list = build_database.find_stage_outputs(database, 'MDH', intermediate_path, '*.MDH.json')
+    hierarchy_index_file_path = Path(intermediate_path) / '_jobs' / 'MAN_hierarchies.json'
+    helpers.save_hierarchy_index(hierarchy_index_file_path, intermediate_path, mdh_file_path_list)
+
+    argument_list = [(man_file_path, extract_path, intermediate_path, hierarchy_index_file_path)
+                     for man_file_path in man_file_path_list]
 
-        if model_hierarchy_dict is None:
-            print(f'[MODEL ANIMATION] ERROR: can\'t find model hierarchy for {relative_path / man_file_path.stem}.MAN')
-            continue
+    # new or deleted hierarchy can change found hierarchy for any animation
+    hierarchy_list_digest = build_database.get_list_digest(mdh_file_path_list)
+    result_list = build_database.run_parse_stage(database, 'MAN', convert_file, argument_list, jobs,
+                                                 extra_config={'hierarchy_list': hierarchy_list_digest}, executor=executor, feed=feed)
+    helpers.print_errors('MODEL ANIMATION', result_list)
 
-        man_data = parse_man(model_animation, model_hierarchy_dict)
-        man_data = {'hierarchy': model_hierarchy_dict, 'animation': man_data}
 
-        save_path = intermediate_path / (str(relative_path) + '.json')
-        save_path.parent.mkdir(exist_ok=True, parents=True)
+def convert_via_blender(intermediate_path, blender_executable_file_path, blender_script_file_path, database=None,
+                        blender_instances=1, blender_pool=None, feed=None):
+    print('[MODEL ANIMATION] Start convert MAN via blender')
+    blender_result_list = build_database.run_blender_stage(database, 'MAN_BLENDER', blender_executable_file_path,
+                                                           blender_script_file_path, intermediate_path, '*.MAN.json',
+                                                           blender_instances, blender_pool, feed)
+    helpers.print_blender_errors('MODEL ANIMATION', blender_result_list)
+    print('[MODEL ANIMATION] End convert MAN via blender')
 
-        json_data = json.dumps(man_data, indent=4, ensure_ascii=False, sort_keys=False, default=str)
-        save_path.write_text(json_data, encoding='utf-8')
 
-        print(f'prepared: {relative_path}')
+def convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path, jobs=1, database=None,
+            blender_instances=1):
+    prepare(extract_path, intermediate_path, jobs=jobs, database=database)
 
     if __name__ != '__main__':
-        print(f'[MODEL ANIMATION] Start convert MAN via blender')
-        helpers.run_blender(blender_executable_file_path, blender_script_file_path)
-        print(f'[MODEL ANIMATION] End convert MAN via blender')
+        convert_via_blender(intermediate_path, blender_executable_file_path, blender_script_file_path, database=database,
+                            blender_instances=blender_instances)
 
 
 def main():
@@ -143,9 +165,11 @@ def main():
     blender_executable_file_path = Path(config['blender_folder']) / 'blender.exe'
     blender_script_file_path = Path.cwd() / 'import_zengin_json' / 'import_man.py'
 
-    convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path)
+    convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path,
+            jobs=helpers.get_jobs(config))
 
-    helpers.run_blender(blender_executable_file_path, blender_script_file_path)
+    convert_via_blender(intermediate_path, blender_executable_file_path, blender_script_file_path,
+                        blender_instances=helpers.get_blender_instances(config))
 
 
 if __name__ == '__main__':
@@ -1,11 +1,14 @@
 import json
-import shutil
 from pathlib import Path
 
-from mathutils import Matrix, Quaternion, Vector
+from mathutils import Matrix
 
 from zenkit import ModelHierarchy
 
+import build_database
+import helpers
+import manifest
+
 
 def rf(f, accuracy=4):
     return round(f, accuracy)
@@ -16,7 +19,7 @@ def parse_mdh(model_hierarchy, rename_bone_function=None):
     try:
         skeleton_name = model_hierarchy.source_path
     except:
-        print(f'[MODEL HIERARCHY] can\'t read source_path, set empty string.')
+        print('[MODEL HIERARCHY] can\'t read source_path, set empty string.')
     skeleton_name = skeleton_name.split('\\')[-1].split('.')[0]
 
     root_translation = [model_hierarchy.root_translation.x, model_hierarchy.root_translation.y, model_hierarchy.root_translation.z]
@@ -32,12 +35,6 @@ def parse_mdh(model_hierarchy, rename_bone_function=None):
     collision_bbox_max = [model_hierarchy.collision_bbox.max.x, model_hierarchy.collision_bbox.max.y, model_hierarchy.collision_bbox.max.z]
     collision_bbox_max = [rf(f) for f in collision_bbox_max]
 
-    date = 0
-    try:
-        date = model_hierarchy.source_date.total_seconds()
-    except:
-        pass
-
     skeleton_data = {'checksum': model_hierarchy.checksum,
                      'name': skeleton_name,
                      'root_translation': root_translation,
@@ -86,24 +83,32 @@ def parse_mdh(model_hierarchy, rename_bone_function=None):
     return skeleton_data
 
 
-def convert(extract_path, intermediate_path, convert_path):
-    mdh_file_path_list = list(Path(extract_path).rglob(f'*.MDH'))
+def convert_file(mdh_file_path, extract_path, intermediate_path):
+    relative_path = mdh_file_path.relative_to(extract_path)
+    # save_path_convert = convert_path / (str(relative_path) + '.json')
+    # save_path_convert.parent.mkdir(exist_ok=True, parents=True)
+    save_path_intermediate = intermediate_path / (str(relative_path) + '.json')
+    save_path_intermediate.parent.mkdir(exist_ok=True, parents=True)
+
+    model_hierarchy = ModelHierarchy.load(manifest.read_file(mdh_file_path))
+    mdh_data = parse_mdh(model_hierarchy)
+
+    json_data = json.dumps(mdh_data, indent=4, ensure_ascii=False, sort_keys=False, default=str)
+    # save_path_convert.write_text(json_data, encoding='utf-8')
+    save_path_intermediate.write_text(json_data, encoding='utf-8')
+
+    helpers.print_file(f'prepared: {relative_path}')
 
-    for mdh_file_path in mdh_file_path_list:
-        relative_path = mdh_file_path.relative_to(extract_path)
-        # save_path_convert = convert_path / (str(relative_path) + '.json')
-        # save_path_convert.parent.mkdir(exist_ok=True, parents=True)
-        save_path_intermediate = intermediate_path / (str(relative_path) + '.json')
-        save_path_intermediate.parent.mkdir(exist_ok=True, parents=True)
+    return {'outputs': [save_path_intermediate]}
 
-        model_hierarchy = ModelHierarchy.load(mdh_file_path)
-        mdh_data = parse_mdh(model_hierarchy)
 
-        json_data = json.dumps(mdh_data, indent=4, ensure_ascii=False, sort_keys=False, default=str)
-        # save_path_convert.write_text(json_data, encoding='utf-8')
-        save_path_intermediate.write_text(json_data, encoding='utf-8')
+def convert(extract_path, intermediate_path, convert_path, jobs=1, database=None, executor=None):
+    mdh_file_path_list = manifest.find_files(extract_path, '*.MDH')
 
-        print(f'prepared: {relative_path}')
+    argument_list = [(mdh_file_path, extract_path, intermediate_path) for mdh_file_path in mdh_file_path_list]
+    result_list = build_database.run_parse_stage(database, 'MDH', convert_file, argument_list, jobs,
+                                                 executor=executor)
+    helpers.print_errors('MODEL HIERARCHY', result_list)
 
 
 def main():
@@ -128,7 +133,7 @@ def main():
     # shutil.rmtree(convert_path, ignore_errors=True)
     # convert_path.mkdir()
 
-    convert(extract_path, intermediate_path, convert_path)
+    convert(extract_path, intermediate_path, convert_path, jobs=helpers.get_jobs(config))
 
 
 if __name__ == '__main__':
@@ -1,13 +1,12 @@
 import json
-import shutil
-from importlib.resources import read_text
 from pathlib import Path
-import subprocess
 
-from zenkit import ModelMesh, MultiResolutionMesh, SoftSkinMesh, SoftSkinWeight
+from zenkit import ModelMesh
 
 from convert_multiresolution_mesh import parse_multiresolution_mesh
+import build_database
 import helpers
+import manifest
 
 
 def rf(f):
@@ -134,132 +133,166 @@ def parse_model_mesh(model_mesh: ModelMesh):
     return model_mesh_dict
 
 
-def convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path):
-    mdm_file_path_list = list(Path(extract_path).rglob(f'*.MDM'))
+def convert_file(mdm_file_path, extract_path, intermediate_path, hierarchy_index_file_path):
+    filename = mdm_file_path.stem
+    relative_path = mdm_file_path.relative_to(extract_path).parent  # / zen_file_path.stem
 
-    for mdm_file_path in mdm_file_path_list:
-        filename = mdm_file_path.stem
-        relative_path = mdm_file_path.relative_to(extract_path).parent  # / zen_file_path.stem
+    game_type_folder = str(relative_path).split('/')[0]
+    game_type_folder = game_type_folder.split('\\')[0]
 
-        game_type_folder = str(relative_path).split('/')[0]
-        game_type_folder = game_type_folder.split('\\')[0]
+    # if 'Gothic II' not in str(mdm_file_path):  # Addon, Gothic II,
+    #     return
 
-        # if 'Gothic II' not in str(mdm_file_path):  # Addon, Gothic II,
-        #     continue
+    # if 'FIREPLACE_HIGH2' not in str(mdm_file_path):  # CHESTBIG_ADD_STONE_LOCKED, CHESTBIG_OCCHESTMEDIUM, GOL_BODY
+    #     return
 
-        # if 'FIREPLACE_HIGH2' not in str(mdm_file_path):  # CHESTBIG_ADD_STONE_LOCKED, CHESTBIG_OCCHESTMEDIUM, GOL_BODY
-        #     continue
+    # if 'HUM_BODY_NAKED0' not in str(mdm_file_path):  # Addon, Gothic II,
+    #     return
 
-        # if 'HUM_BODY_NAKED0' not in str(mdm_file_path):  # Addon, Gothic II,
-        #     continue
+    model_mesh = None
+    try:
+        model_mesh = ModelMesh.load(manifest.read_file(mdm_file_path))
+    except:
+        raise RuntimeError(f'can\'t open: {relative_path / mdm_file_path.stem}.MDM')
 
-        model_mesh = None
-        try:
-            model_mesh = ModelMesh.load(mdm_file_path)
-        except:
-            print(f'[MODEL MESH] ERROR: can\'t open: {relative_path / mdm_file_path.stem}.MDM')
-            continue
+    # mdh_file_path = intermediate_path / relative_path.parent / Path(str(relative_path.parent.name) + '.MDH.json')
+    # if not mdh_file_path.exists():
+    #     print(f'[MODEL MESH] ERROR: file "{mdh_file_path}" not exist, can\'t convert {relative_path}')
+    #     return
 
-        # mdh_file_path = intermediate_path / relative_path.parent / Path(str(relative_path.parent.name) + '.MDH.json')
-        # if not mdh_file_path.exists():
-        #     print(f'[MODEL MESH] ERROR: file "{mdh_file_path}" not exist, can\'t convert {relative_path}')
-        #     continue
+    model_mesh_dict = parse_model_mesh(model_mesh)
+    assert 'checksum' in model_mesh_dict
 
-        model_mesh_dict = parse_model_mesh(model_mesh)
-        assert 'checksum' in model_mesh_dict
+    checksum = model_mesh_dict['checksum']
 
-        checksum = model_mesh_dict['checksum']
+    model_hierarchy_dict = None
+    model_hierarchy_file_path = None
 
-        model_hierarchy_dict = None
+    # print(f'{checksum=}')
 
-        # print(f'{checksum=}')
+    # hierarchies are found in index of stage, without scan of intermediate folder for every mesh
+    hierarchy_index = helpers.load_hierarchy_index(hierarchy_index_file_path)
+    folder_path_list = helpers.get_hierarchy_folder_list(game_type_folder)
 
-        # order is import
-        folder_path_list = ['Mod', 'Addon', 'Gothic II', 'Gothic']
-        for folder_path in folder_path_list[:]:
-            if folder_path.upper() != game_type_folder.upper():
-                folder_path_list.remove(folder_path)
-            else:
+    if checksum != 0:
+        # try to find model hierarchy by checksum
+        for folder_path in folder_path_list:
+            for mdh_info in hierarchy_index['mdh']:
+                if mdh_info['folder'] == folder_path and mdh_info['checksum'] == checksum:
+                    model_hierarchy_file_path = Path(mdh_info['path'])
+                    model_hierarchy_dict = json.loads(model_hierarchy_file_path.read_text())
+                    break
+            if model_hierarchy_dict:
                 break
+    else:
+        # MDL -> MDH (param name) -> MDH (file name)
 
-        if checksum != 0:
-            # try to find model hierarchy by checksum
+        # try to find model hierarchy from .MDL with same name
+        if model_hierarchy_dict is None:
             for folder_path in folder_path_list:
-                mdh_file_path_list = list(Path(intermediate_path / folder_path).rglob(f'*.MDH.json'))
-                for mdh_file_path in mdh_file_path_list:
-                    mdh_data = mdh_file_path.read_text()
-                    mdh_dict = json.loads(mdh_data)
-                    if 'checksum' in mdh_dict and mdh_dict['checksum'] == checksum:
-                        model_hierarchy_dict = mdh_dict
+                for mdl_info in hierarchy_index['mdl']:
+                    if mdl_info['folder'] != folder_path or mdl_info['stem'] != filename.upper():
+                        continue
+                    mdl_file_path = Path(mdl_info['path'])
+                    mdl_data = mdl_file_path.read_text()
+                    mdl_dict = json.loads(mdl_data)
+                    if 'hierarchy' in mdl_dict and check_mdh_compatibility(mdl_dict['hierarchy'], model_mesh_dict):
+                        print(f'[MODEL MESH] WARNING: {relative_path / mdm_file_path.stem}.MDM using model hierarchy from {mdl_file_path}')
+                        model_hierarchy_dict = mdl_dict['hierarchy']
+                        model_hierarchy_file_path = mdl_file_path
                         break
                 if model_hierarchy_dict:
                     break
-        else:
-            # MDL -> MDH (param name) -> MDH (file name)
-
-            # try to find model hierarchy from .MDL with same name
-            if model_hierarchy_dict is None:
-                for folder_path in folder_path_list:
-                    mdl_file_path_list = list(Path(intermediate_path / folder_path).rglob(f'{filename}.MDL.json'))
-                    for mdl_file_path in mdl_file_path_list:
-                        mdl_data = mdl_file_path.read_text()
-                        mdl_dict = json.loads(mdl_data)
-                        if 'hierarchy' in mdl_dict and check_mdh_compatibility(mdl_dict['hierarchy'], model_mesh_dict):
-                            print(f'[MODEL MESH] WARNING: {relative_path / mdm_file_path.stem}.MDM using model hierarchy from {mdl_file_path}')
-                            model_hierarchy_dict = mdl_dict['hierarchy']
-                            break
-                    if model_hierarchy_dict:
-                        break
 
-            # try to find model hierarchy from any .MDH with same name (in param)
-            if model_hierarchy_dict is None:
-                for folder_path in folder_path_list:
-                    mdh_file_path_list = list(Path(intermediate_path / folder_path).rglob(f'*.MDH.json'))
-                    for mdh_file_path in mdh_file_path_list:
-                        mdh_data = mdh_file_path.read_text()
-                        mdh_dict = json.loads(mdh_data)
-                        if mdh_dict['name'].upper() == mdm_file_path.stem.upper():
-                            if check_mdh_compatibility(mdh_dict, model_mesh_dict):
-                                print(f'[MODEL MESH] WARNING: {relative_path / mdm_file_path.stem}.MDM using model hierarchy finding by name param (not by checksum) {mdh_file_path}')
-                                model_hierarchy_dict = mdh_dict
-                                break
-                    if model_hierarchy_dict:
+        # try to find model hierarchy from any .MDH with same name (in param)
+        if model_hierarchy_dict is None:
+            for folder_path in folder_path_list:
+                for mdh_info in hierarchy_index['mdh']:
+                    if mdh_info['folder'] != folder_path or mdh_info['name'].upper() != mdm_file_path.stem.upper():
+                        continue
+                    mdh_file_path = Path(mdh_info['path'])
+                    mdh_dict = json.loads(mdh_file_path.read_text())
+                    if check_mdh_compatibility(mdh_dict, model_mesh_dict):
+                        print(f'[MODEL MESH] WARNING: {relative_path / mdm_file_path.stem}.MDM using model hierarchy finding by name param (not by checksum) {mdh_file_path}')
+                        model_hierarchy_dict = mdh_dict
+                        model_hierarchy_file_path = mdh_file_path
                         break
+                if model_hierarchy_dict:
+                    break
 
-            # try to find model hierarchy from any .MDH with same name (by filename)
-            if model_hierarchy_dict is None:
-                for folder_path in folder_path_list:
-                    mdh_file_path_list = list(Path(intermediate_path / folder_path).rglob(f'*.MDH.json'))
-                    for mdh_file_path in mdh_file_path_list:
-                        mdh_data = mdh_file_path.read_text()
-                        mdh_dict = json.loads(mdh_data)
-                        if mdh_file_path.stem.split('.')[0].upper() == mdm_file_path.stem.upper():
-                            if check_mdh_compatibility(mdh_dict, model_mesh_dict):
-                                print(f'[MODEL MESH] WARNING: {relative_path / mdm_file_path.stem}.MDM using model hierarchy finding by file name (not by checksum) {mdh_file_path}')
-                                model_hierarchy_dict = mdh_dict
-                                break
-                    if model_hierarchy_dict:
+        # try to find model hierarchy from any .MDH with same name (by filename)
+        if model_hierarchy_dict is None:
+            for folder_path in folder_path_list:
+                for mdh_info in hierarchy_index['mdh']:
+                    if mdh_info['folder'] != folder_path or mdh_info['stem'] != mdm_file_path.stem.upper():
+                        continue
+                    mdh_file_path = Path(mdh_info['path'])
+                    mdh_dict = json.loads(mdh_file_path.read_text())
+                    if check_mdh_compatibility(mdh_dict, model_mesh_dict):
+                        print(f'[MODEL MESH] WARNING: {relative_path / mdm_file_path.stem}.MDM using model hierarchy finding by file name (not by checksum) {mdh_file_path}')
+                        model_hierarchy_dict = mdh_dict
+                        model_hierarchy_file_path = mdh_file_path
                         break
+                if model_hierarchy_dict:
+                    break
 
-        if model_hierarchy_dict is None:
-            model_hierarchy_dict = dict()
-            print(f'[MODEL MESH] ERROR: can\'t find model hierarchy for {relative_path / mdm_file_path.stem}.MDM')
+    if model_hierarchy_dict is None:
+        model_hierarchy_dict = dict()
+        print(f'[MODEL MESH] ERROR: can\'t find model hierarchy for {relative_path / mdm_file_path.stem}.MDM')
+
+    model_dict = {'hierarchy': model_hierarchy_dict, 'mesh': model_mesh_dict}
+    json_data = json.dumps(model_dict, indent=4, ensure_ascii=False)
+
+    save_path = intermediate_path / relative_path
+    save_path.mkdir(exist_ok=True, parents=True)
+
+    save_path_model_mesh = save_path / (mdm_file_path.stem + '.MDM.json')
+    save_path_model_mesh.write_text(json_data, encoding='utf-8')
+
+    helpers.print_file(f'prepared: {relative_path / mdm_file_path.stem}.MDM')
+
+    dependency_list = [model_hierarchy_file_path] if model_hierarchy_file_path else []
+
+    return {'outputs': [save_path_model_mesh], 'dependencies': dependency_list,
+            'info': {'textures': helpers.collect_textures(model_mesh_dict)}}
+
+
+def prepare(extract_path, intermediate_path, jobs=1, database=None, executor=None, feed=None):
+    mdm_file_path_list = manifest.find_files(extract_path, '*.MDM')
+
+    # hierarchies are outputs of MDH and MDL stages, index of them is made once for all meshes
+    mdh_file_path_list = build_database.find_stage_outputs(database, 'MDH', intermediate_path, '*.MDH.json')
+    mdl_file_path_list = build_database.find_stage_outputs(database, 'MDL', intermediate_path, '*.MDL.json')
+    hierarchy_index_file_path = Path(intermediate_path) / '_jobs' / 'MDM_hierarchies.json'
+    helpers.save_hierarchy_index(hierarchy_index_file_path, intermediate_path, mdh_file_path_list, mdl_file_path_list)
+
+    argument_list = [(mdm_file_path, extract_path, intermediate_path, hierarchy_index_file_path)
+                     for mdm_file_path in mdm_file_path_list]
+
+    # new or deleted hierarchy can change found hierarchy for any mesh
+    hierarchy_list_digest = build_database.get_list_digest(mdh_file_path_list + mdl_file_path_list)
+    result_list = build_database.run_parse_stage(database, 'MDM', convert_file, argument_list, jobs,
+                                                 extra_config={'hierarchy_list': hierarchy_list_digest}, executor=executor, feed=feed)
+    helpers.print_errors('MODEL MESH', result_list)
 
-        model_dict = {'hierarchy': model_hierarchy_dict, 'mesh': model_mesh_dict}
-        json_data = json.dumps(model_dict, indent=4, ensure_ascii=False)
 
-        save_path = intermediate_path / relative_path
-        save_path.mkdir(exist_ok=True, parents=True)
+def convert_via_blender(intermediate_path, blender_executable_file_path, blender_script_file_path, database=None,
+                        blender_instances=1, blender_pool=None, feed=None):
+    print('[MODEL MESH] Start convert MDM via blender')
+    blender_result_list = build_database.run_blender_stage(database, 'MDM_BLENDER', blender_executable_file_path,
+                                                           blender_script_file_path, intermediate_path, '*.MDM.json',
+                                                           blender_instances, blender_pool, feed)
+    helpers.print_blender_errors('MODEL MESH', blender_result_list)
+    print('[MODEL MESH] End convert MDM via blender')
 
-        save_path_model_mesh = save_path / (mdm_file_path.stem + '.MDM.json')
-        save_path_model_mesh.write_text(json_data, encoding='utf-8')
 
-        print(f'prepared: {relative_path / mdm_file_path.stem}.MDM')
+def convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path, jobs=1, database=None,
+            blender_instances=1):
+    prepare(extract_path, intermediate_path, jobs=jobs, database=database)
 
     if __name__ != '__main__':
-        print(f'[MODEL MESH] Start convert MDM via blender')
-        helpers.run_blender(blender_executable_file_path, blender_script_file_path)
-        print(f'[MODEL MESH] End convert MDM via blender')
+        convert_via_blender(intermediate_path, blender_executable_file_path, blender_script_file_path, database=database,
+                            blender_instances=blender_instances)
 
 
 def main():
@@ -287,9 +320,11 @@ def main():
     blender_executable_file_path = Path(config['blender_folder']) / 'blender.exe'
     blender_script_file_path = Path.cwd() / 'import_zengin_json' / 'import_mdm.py'
 
-    convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path)
+    convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path,
+            jobs=helpers.get_jobs(config))
 
-    helpers.run_blender(blender_executable_file_path, blender_script_file_path)
+    convert_via_blender(intermediate_path, blender_executable_file_path, blender_script_file_path,
+                        blender_instances=helpers.get_blender_instances(config))
 
 
 if __name__ == '__main__':
@@ -1,9 +1,12 @@
 import json
-import shutil
 from pathlib import Path
 
 from zenkit import ModelScript, AnimationFlags, AnimationDirection
 
+import build_database
+import helpers
+import manifest
+
 
 def parse_msb(model_script):
     # https://github.com/GothicKit/ZenKit/blob/main/src/ModelScript.cc
@@ -145,23 +148,31 @@ def parse_msb(model_script):
     return msb_data
 
 
-def convert(extract_path, intermediate_path, convert_path):
-    msb_file_path_list = list(Path(extract_path).rglob(f'*.MSB'))
+def convert_file(msb_file_path, extract_path, convert_path):
+    relative_path = msb_file_path.relative_to(extract_path)
+    save_path = convert_path / (str(relative_path) + '.json')
+    save_path.parent.mkdir(exist_ok=True, parents=True)
+
+    model_script = ModelScript.load(manifest.read_file(msb_file_path))
+    msb_data = parse_msb(model_script)
+    group_name = msb_file_path.stem.upper().split('_')[0]
+    msb_data['group_name'] = group_name
+
+    json_data = json.dumps(msb_data, indent=4, ensure_ascii=False)
+    save_path.write_text(json_data, encoding='utf-8')
+
+    helpers.print_file(f'prepared: {relative_path}')
 
-    for msb_file_path in msb_file_path_list:
-        relative_path = msb_file_path.relative_to(extract_path)
-        save_path = convert_path / (str(relative_path) + '.json')
-        save_path.parent.mkdir(exist_ok=True, parents=True)
+    return {'outputs': [save_path]}
 
-        model_script = ModelScript.load(msb_file_path)
-        msb_data = parse_msb(model_script)
-        group_name = msb_file_path.stem.upper().split('_')[0]
-        msb_data['group_name'] = group_name
 
-        json_data = json.dumps(msb_data, indent=4, ensure_ascii=False)
-        save_path.write_text(json_data, encoding='utf-8')
+def convert(extract_path, intermediate_path, convert_path, jobs=1, database=None, executor=None):
+    msb_file_path_list = manifest.find_files(extract_path, '*.MSB')
 
-        print(f'prepared: {relative_path}')
+    argument_list = [(msb_file_path, extract_path, convert_path) for msb_file_path in msb_file_path_list]
+    result_list = build_database.run_parse_stage(database, 'MSB', convert_file, argument_list, jobs,
+                                                 executor=executor)
+    helpers.print_errors('MODEL SCRIPT', result_list)
 
 
 def main():
@@ -186,7 +197,7 @@ def main():
     # shutil.rmtree(convert_path, ignore_errors=True)
     # convert_path.mkdir()
 
-    convert(extract_path, intermediate_path, convert_path)
+    convert(extract_path, intermediate_path, convert_path, jobs=helpers.get_jobs(config))
 
 
 if __name__ == '__main__':
@@ -1,13 +1,12 @@
 import json
-import shutil
-from importlib.resources import read_text
 from pathlib import Path
-import subprocess
 
 from zenkit import MorphMesh
 
 from convert_multiresolution_mesh import parse_multiresolution_mesh
+import build_database
 import helpers
+import manifest
 
 
 
@@ -58,42 +57,62 @@ def parse_morph_mesh(morph_mesh: MorphMesh):
     return morph_mesh_dict
 
 
-def convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path):
-    mmb_file_path_list = list(Path(extract_path).rglob(f'*.MMB'))
+def convert_file(mmb_file_path, extract_path, intermediate_path):
+    relative_path = mmb_file_path.relative_to(extract_path).parent  # / zen_file_path.stem
 
-    for mmb_file_path in mmb_file_path_list:
-        relative_path = mmb_file_path.relative_to(extract_path).parent  # / zen_file_path.stem
+    # if 'Gothic II' not in str(mmb_file_path):
+    #     return
+    #
+    # if 'ITRW_BOW_L_01' not in str(mmb_file_path):
+    #     return
 
-        # if 'Gothic II' not in str(mmb_file_path):
-        #     continue
-        #
-        # if 'ITRW_BOW_L_01' not in str(mmb_file_path):
-        #     continue
+    morph_mesh = None
+    try:
+        morph_mesh = MorphMesh.load(manifest.read_file(mmb_file_path))
+    except:
+        raise RuntimeError(f'can\'t open: {relative_path / mmb_file_path.stem}.MMB')
 
-        morph_mesh = None
-        try:
-            morph_mesh = MorphMesh.load(mmb_file_path)
-        except:
-            print(f'[MORPH MESH] ERROR: can\'t open: {relative_path / mmb_file_path.stem}.MMB')
-            continue
 
+    morph_mesh_dict = parse_morph_mesh(morph_mesh)
 
-        morph_mesh_dict = parse_morph_mesh(morph_mesh)
+    json_data = json.dumps(morph_mesh_dict, indent=4, ensure_ascii=False)
 
-        json_data = json.dumps(morph_mesh_dict, indent=4, ensure_ascii=False)
+    save_path = intermediate_path / relative_path
+    save_path.mkdir(exist_ok=True, parents=True)
 
-        save_path = intermediate_path / relative_path
-        save_path.mkdir(exist_ok=True, parents=True)
+    save_path = save_path / (mmb_file_path.stem + '.MMB.json')
+    save_path.write_text(json_data, encoding='utf-8')
 
-        save_path = save_path / (mmb_file_path.stem + '.MMB.json')
-        save_path.write_text(json_data, encoding='utf-8')
+    helpers.print_file(f'prepared: {relative_path / mmb_file_path.stem}.MMB')
 
-        print(f'prepared: {relative_path / mmb_file_path.stem}.MMB')
+    return {'outputs': [save_path], 'info': {'textures': helpers.collect_textures(morph_mesh_dict)}}
+
+
+def prepare(extract_path, intermediate_path, jobs=1, database=None, executor=None, feed=None):
+    mmb_file_path_list = manifest.find_files(extract_path, '*.MMB')
+
+    argument_list = [(mmb_file_path, extract_path, intermediate_path) for mmb_file_path in mmb_file_path_list]
+    result_list = build_database.run_parse_stage(database, 'MMB', convert_file, argument_list, jobs, executor=executor, feed=feed)
+    helpers.print_errors('MORPH MESH', result_list)
+
+
+def convert_via_blender(intermediate_path, blender_executable_file_path, blender_script_file_path, database=None,
+                        blender_instances=1, blender_pool=None, feed=None):
+    print('[MORPH MESH] Start convert MMB via blender')
+    blender_result_list = build_database.run_blender_stage(database, 'MMB_BLENDER', blender_executable_file_path,
+                                                           blender_script_file_path, intermediate_path, '*.MMB.json',
+                                                           blender_instances, blender_pool, feed)
+    helpers.print_blender_errors('MORPH MESH', blender_result_list)
+    print('[MORPH MESH] End convert MMB via blender')
+
+
+def convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path, jobs=1, database=None,
+            blender_instances=1):
+    prepare(extract_path, intermediate_path, jobs=jobs, database=database)
 
     if __name__ != '__main__':
-        print(f'[MORPH MESH] Start convert MMB via blender')
-        helpers.run_blender(blender_executable_file_path, blender_script_file_path)
-        print(f'[MORPH MESH] End convert MMB via blender')
+        convert_via_blender(intermediate_path, blender_executable_file_path, blender_script_file_path, database=database,
+                            blender_instances=blender_instances)
 
 
 def main():
@@ -121,9 +140,11 @@ def main():
     blender_executable_file_path = Path(config['blender_folder']) / 'blender.exe'
     blender_script_file_path = Path.cwd() / 'import_zengin_json' / 'import_mmb.py'
 
-    convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path)
+    convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path,
+            jobs=helpers.get_jobs(config))
 
-    helpers.run_blender(blender_executable_file_path, blender_script_file_path)
+    convert_via_blender(intermediate_path, blender_executable_file_path, blender_script_file_path,
+                        blender_instances=helpers.get_blender_instances(config))
 
 
 if __name__ == '__main__':
@@ -1,13 +1,13 @@
 import json
-import shutil
-from importlib.resources import read_text
 from pathlib import Path
-import subprocess
 import math
+from array import array
 
 from zenkit import MultiResolutionMesh
 
+import build_database
 import helpers
+import manifest
 
 
 def rf(f):
@@ -63,41 +63,114 @@ def parse_multiresolution_mesh(multiresolution_mesh: MultiResolutionMesh):
     return multi_resolution_mesh_dict
 
 
-def convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path):
-    mrm_file_path_list = list(Path(extract_path).rglob(f'*.MRM'))
+def parse_multiresolution_mesh_arrays(multiresolution_mesh: MultiResolutionMesh):
+    # same data as parse_multiresolution_mesh, wedges of all submeshes in one array
+    positions = array('f')
+    for position in multiresolution_mesh.positions:
+        positions.extend([position.x, position.y, position.z])
+
+    wedge_positions_index = array('i')
+    wedge_normals = array('f')
+    wedge_texture = array('f')
+    triangles = array('i')
+    triangle_submesh = array('i')
+    for submesh_index, submesh in enumerate(multiresolution_mesh.submeshes):
+        wedge_offset = len(wedge_positions_index)
+        for triangle in submesh.triangles:
+            triangles.extend([wedge_offset + wedge_index for wedge_index in triangle.wedges])
+            triangle_submesh.append(submesh_index)
 
-    for mrm_file_path in mrm_file_path_list:
-        relative_path = mrm_file_path.relative_to(extract_path).parent  # / zen_file_path.stem
+        for wedge in submesh.wedges:
+            wedge_positions_index.append(wedge.index)
+            wedge_normals.extend([wedge.normal.x, wedge.normal.y, wedge.normal.z])
+            wedge_texture.extend([0.5 if math.isnan(f) else f for f in [wedge.texture.x, wedge.texture.y]])
 
-        # if 'VDF_Meshes_Addon' not in str(mrm_file_path):  # Gothic II
-        #     continue
+    return {'positions': (3, positions),
+            'wedge_positions_index': (1, wedge_positions_index),
+            'wedge_normals': (3, wedge_normals),
+            'wedge_texture': (2, wedge_texture),
+            'triangles': (3, triangles),
+            'triangle_submesh': (1, triangle_submesh)}
 
-        # if 'ITMI_BEER' not in str(mrm_file_path):  # NW_HARBOUR_BARREL_01
-        #     continue
 
-        multiresolution_mesh = None
-        try:
-            multiresolution_mesh = MultiResolutionMesh.load(mrm_file_path)
-        except:
-            print(f'[MULTIRESOLUTION MESH] ERROR: can\'t open: {relative_path / mrm_file_path.stem}.MRM')
-            continue
+def save_multiresolution_mesh(multiresolution_mesh, save_path, file_name, geometry_json=False, texture_list=None):
+    save_path.mkdir(exist_ok=True, parents=True)
 
+    # geometry in binary file, json lists only for debug
+    if geometry_json:
         multiresolution_mesh_dict = parse_multiresolution_mesh(multiresolution_mesh)
+    else:
+        multiresolution_mesh_dict = {}
+        materials_dict = helpers.parse_materials(multiresolution_mesh.material)
+        if materials_dict:
+            multiresolution_mesh_dict['materials'] = materials_dict
+
+    geometry_file_path = save_path / (file_name + '.MRM.bin')
+    multiresolution_mesh_dict['geometry'] = helpers.write_geometry(geometry_file_path,
+                                                                   parse_multiresolution_mesh_arrays(multiresolution_mesh))
+
+    json_data = json.dumps(multiresolution_mesh_dict, indent=4, ensure_ascii=False)
+
+    save_path_mesh = save_path / (file_name + '.MRM.json')
+    save_path_mesh.write_text(json_data, encoding='utf-8')
+
+    # textures used by mesh, for convert of only used textures
+    if texture_list is not None:
+        texture_list.extend(helpers.collect_textures(multiresolution_mesh_dict))
+
+    return [save_path_mesh, geometry_file_path]
+
+
+def convert_file(mrm_file_path, extract_path, intermediate_path, geometry_json=False):
+    relative_path = mrm_file_path.relative_to(extract_path).parent  # / zen_file_path.stem
+
+    # if 'VDF_Meshes_Addon' not in str(mrm_file_path):  # Gothic II
+    #     return
+
+    # if 'ITMI_BEER' not in str(mrm_file_path):  # NW_HARBOUR_BARREL_01
+    #     return
+
+    multiresolution_mesh = None
+    try:
+        multiresolution_mesh = MultiResolutionMesh.load(manifest.read_file(mrm_file_path))
+    except:
+        raise RuntimeError(f'can\'t open: {relative_path / mrm_file_path.stem}.MRM')
+
+    texture_list = []
+    output_path_list = save_multiresolution_mesh(multiresolution_mesh, intermediate_path / relative_path, mrm_file_path.stem,
+                                                 geometry_json, texture_list)
+
+    helpers.print_file(f'prepared: {relative_path / mrm_file_path.stem}.MRM')
+
+    return {'outputs': output_path_list, 'info': {'textures': texture_list}}
+
+
+def prepare(extract_path, intermediate_path, jobs=1, database=None, executor=None, feed=None, geometry_json=False):
+    mrm_file_path_list = manifest.find_files(extract_path, '*.MRM')
+
+    argument_list = [(mrm_file_path, extract_path, intermediate_path, geometry_json) for mrm_file_path in mrm_file_path_list]
+    result_list = build_database.run_parse_stage(database, 'MRM', convert_file, argument_list, jobs, ['geometry_json'],
+                                                 executor=executor, feed=feed)
+    helpers.print_errors('MULTIRESOLUTION MESH', result_list)
 
-        json_data = json.dumps(multiresolution_mesh_dict, indent=4, ensure_ascii=False)
 
-        save_path = intermediate_path / relative_path
-        save_path.mkdir(exist_ok=True, parents=True)
+def convert_via_blender(intermediate_path, blender_executable_file_path, blender_script_file_path, database=None,
+                        blender_instances=1, blender_pool=None, feed=None):
+    print('[MULTIRESOLUTION MESH] Start convert MRM via blender')
+    blender_result_list = build_database.run_blender_stage(database, 'MRM_BLENDER', blender_executable_file_path,
+                                                           blender_script_file_path, intermediate_path, '*.MRM.json',
+                                                           blender_instances, blender_pool, feed)
+    helpers.print_blender_errors('MULTIRESOLUTION MESH', blender_result_list)
+    print('[MULTIRESOLUTION MESH] End convert MRM via blender')
 
-        save_path = save_path / (mrm_file_path.stem + '.MRM.json')
-        save_path.write_text(json_data, encoding='utf-8')
 
-        print(f'prepared: {relative_path / mrm_file_path.stem}.MRM')
+def convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path, jobs=1, database=None,
+            blender_instances=1, geometry_json=False):
+    prepare(extract_path, intermediate_path, jobs=jobs, database=database, geometry_json=geometry_json)
 
     if __name__ != '__main__':
-        print(f'[MULTIRESOLUTION MESH] Start convert MRM via blender')
-        helpers.run_blender(blender_executable_file_path, blender_script_file_path)
-        print(f'[MULTIRESOLUTION MESH] End convert MRM via blender')
+        convert_via_blender(intermediate_path, blender_executable_file_path, blender_script_file_path, database=database,
+                            blender_instances=blender_instances)
 
 
 def main():
@@ -125,9 +198,11 @@ def main():
     blender_executable_file_path = Path(config['blender_folder']) / 'blender.exe'
     blender_script_file_path = Path.cwd() / 'import_zengin_json' / 'import_mrm.py'
 
-    convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path)
+    convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path,
+            jobs=helpers.get_jobs(config), geometry_json=config.get('geometry_json', False))
 
-    helpers.run_blender(blender_executable_file_path, blender_script_file_path)
+    convert_via_blender(intermediate_path, blender_executable_file_path, blender_script_file_path,
+                        blender_instances=helpers.get_blender_instances(config))
 
 
 if __name__ == '__main__':
@@ -2,8 +2,6 @@ import json
 import shutil
 from pathlib import Path
 
-from zenkit import DaedalusScript
-
 
 def convert(extract_path, convert_path):
     # https://github.com/GothicKit/ZenKit/blob/main/tests/TestDaedalusScript.cc
@@ -11,7 +9,7 @@ def convert(extract_path, convert_path):
     # https://worldofplayers.ru/threads/42582/page-6
 
 
-    tex_file_path_list = list(Path(extract_path).rglob(f'*.DAT'))
+    tex_file_path_list = list(Path(extract_path).rglob('*.DAT'))
 
     for tex_file_path in tex_file_path_list:
         print(tex_file_path)
@@ -1,10 +1,15 @@
 import json
-import shutil
+import math
+import os
 from pathlib import Path
 
 from PIL import Image
 
-from zenkit import Texture
+from zenkit import Texture, TextureFormat
+
+import build_database
+import helpers
+import manifest
 
 
 def image_is_transparent(image: Image, opaque: int = 255) -> bool:
@@ -31,38 +36,498 @@ def image_is_transparent(image: Image, opaque: int = 255) -> bool:
     return False
 
 
-def convert(extract_path, convert_path):
-    tex_file_path_list = list(Path(extract_path).rglob(f'*.TEX'))
+def get_relative_path(tex_file_path, extract_path):
+    relative_path = str(tex_file_path.relative_to(extract_path))
+    if relative_path[-4:] == '.TEX':
+        relative_path = relative_path[:-4]
+    if relative_path[-2:] == '-C':
+        relative_path = relative_path[:-2]
 
-    for tex_file_path in tex_file_path_list:
-        relative_path = str(tex_file_path.relative_to(extract_path))
-        if relative_path[-4:] == '.TEX':
-            relative_path = relative_path[:-4]
-        if relative_path[-2:] == '-C':
-            relative_path = relative_path[:-2]
+    return relative_path
+
+
+def convert_file(tex_file_path, extract_path, convert_path, texture_format='TGA', lod_path_dict=None):
+    relative_path = get_relative_path(tex_file_path, extract_path)
 
-        # if 'HUM_BODY_NAKED_V0_C0' not in tex_file_path.stem:
-        #     continue
+    # if 'HUM_BODY_NAKED_V0_C0' not in tex_file_path.stem:
+    #     return
 
+    texture = Texture.load(manifest.read_file(tex_file_path))
+
+    # compressed texture is written as is with all mipmaps, palette and not compressed textures are decoded to tga
+    if texture_format == 'DDS' and texture.format in DDS_FOURCC_DICT:
+        save_path = convert_path / (relative_path + '.DDS')
+        has_alpha = save_dds(texture, save_path)
+    else:
         save_path = convert_path / (relative_path + '.TGA')
+        has_alpha = save_texture(texture, save_path)
 
-        texture = Texture.load(tex_file_path)
+    # smaller copies for low end builds, from same loaded texture
+    lod_path_list = save_lod_textures(texture, relative_path, lod_path_dict or {}, has_alpha)
 
-        save_path.parent.mkdir(exist_ok=True, parents=True)
+    helpers.print_file(f'converted: {relative_path}.TEX')
 
-        image = Image.new('RGBA', (texture.width, texture.height))
-        image.frombytes(texture.mipmap_rgba(0))
+    # for texture index, blender materials don't open texture files to know it
+    info = {'width': texture.width, 'height': texture.height, 'alpha': has_alpha, 'format': texture.format.name,
+            'hash': get_content_hash(tex_file_path), 'color': get_average_color(texture)}
+    if lod_path_list:
+        info['lods'] = [str(lod_path) for lod_path in lod_path_list]
 
-        image_has_alpha = image_is_transparent(image, opaque=255)
-        if image_has_alpha is False:
-            image_rgb = Image.new('RGB', image.size)
-            image_rgb.paste(image, mask=image.split()[3])  # 3 is the alpha channel
+    # first output is main texture
+    return {'outputs': [save_path] + lod_path_list, 'info': info}
 
-            image = image_rgb
 
+def get_lod_path_dict(convert_path, lod_level_list):
+    # {mipmap level: folder}, every level in own folder next to convert folder: CONVERT_LOD1, CONVERT_LOD2
+    # not inside convert folder, so blender don't take them for textures of materials
+    convert_path = Path(convert_path)
+    return {int(level): convert_path.parent / f'{convert_path.name}_LOD{int(level)}' for level in lod_level_list or []}
+
+
+def save_lod_textures(texture, relative_path, lod_path_dict, has_alpha):
+    # level 1 - half size, level 2 - quarter size, taken from mipmaps of texture
+    # if texture don't have so many mipmaps, smallest mipmap is resized
+    lod_path_list = []
+    for level, lod_path in sorted(lod_path_dict.items()):
+        save_path = lod_path / (relative_path + '.TGA')
+        save_path.parent.mkdir(exist_ok=True, parents=True)
+
+        source_level = min(level, texture.mipmap_count - 1)
+        width = texture.width_mipmap(source_level)
+        height = texture.height_mipmap(source_level)
+        image = Image.frombuffer('RGBA', (width, height), texture.mipmap_rgba(source_level), 'raw', 'RGBA', 0, 1)
+        if source_level != level:
+            image = image.resize((max(texture.width >> level, 1), max(texture.height >> level, 1)), Image.Resampling.BOX)
+
+        # same alpha as main texture, so all levels have same format
+        if not has_alpha:
+            image = image.convert('RGB')
         image.save(save_path)
 
-        print(f'converted: {relative_path}.TEX')
+        lod_path_list.append(save_path)
+
+    return lod_path_list
+
+
+def get_average_color(texture):
+    # smallest mipmap is average of texture, [r, g, b, a] 0-255
+    level = texture.mipmap_count - 1
+    rgba_data = texture.mipmap_rgba(level)
+    pixel_count = max(len(rgba_data) // 4, 1)
+
+    return [sum(rgba_data[channel::4]) // pixel_count for channel in range(4)]
+
+
+def rgba_has_alpha(rgba_data, width, height, opaque=255):
+    # one pass over alpha bytes only, rgba data is not copied
+    try:
+        import numpy as np
+    except ImportError:
+        np = None
+
+    if np is not None:
+        return int(np.frombuffer(rgba_data, dtype=np.uint8)[3::4].min(initial=255)) < opaque
+
+    alpha_image = Image.frombuffer('RGBA', (width, height), rgba_data, 'raw', 'RGBA', 0, 1).getchannel('A')
+    return alpha_image.getextrema()[0] < opaque
+
+
+def save_texture(texture, save_path):
+    save_path.parent.mkdir(exist_ok=True, parents=True)
+
+    # image use buffer of texture data, without copy
+    rgba_data = texture.mipmap_rgba(0)
+    image = Image.frombuffer('RGBA', (texture.width, texture.height), rgba_data, 'raw', 'RGBA', 0, 1)
+
+    # opaque texture - only drop alpha channel, all alpha values are 255 so no composite is needed
+    has_alpha = rgba_has_alpha(rgba_data, texture.width, texture.height, opaque=255)
+    if not has_alpha:
+        image = image.convert('RGB')
+
+    image.save(save_path)
+
+    return has_alpha
+
+
+# dds pixel format of compressed zengin textures, DXT2 and DXT4 are DXT3 and DXT5 with premultiplied alpha
+DDS_FOURCC_DICT = {TextureFormat.DXT1: b'DXT1', TextureFormat.DXT2: b'DXT2', TextureFormat.DXT3: b'DXT3',
+                   TextureFormat.DXT4: b'DXT4', TextureFormat.DXT5: b'DXT5'}
+
+
+def get_mipmap_raw(texture, level):
+    # Texture.mipmap_raw of zenkit 1.3 read data as c string, so data is cut on first zero byte
+    from ctypes import byref, c_size_t, c_void_p, string_at
+    from zenkit._core import DLL
+
+    get_mipmap_raw_function = DLL['ZkTexture_getMipmapRaw']
+    get_mipmap_raw_function.restype = c_void_p
+    size = c_size_t(0)
+    data_pointer = get_mipmap_raw_function(texture._handle, c_size_t(level), byref(size))
+
+    return string_at(data_pointer, size.value)
+
+
+def dxt_has_alpha(mipmap_data, fourcc):
+    # alpha of compressed blocks without decode, None - numpy is not installed
+    # small mipmaps average thin transparent parts away, so only biggest mipmap is checked
+    try:
+        import numpy as np
+    except ImportError:
+        return None
+
+    if fourcc == b'DXT1':
+        # 8 bytes block: 2 colors and 2 bits index per pixel, with color0 <= color1 index 3 is transparent
+        blocks = np.frombuffer(mipmap_data, dtype=np.uint8).reshape(-1, 8).astype(np.uint16)
+        color0 = blocks[:, 0] | (blocks[:, 1] << 8)
+        color1 = blocks[:, 2] | (blocks[:, 3] << 8)
+        index_bytes = blocks[:, 4:8]
+        index_3 = np.zeros(len(blocks), dtype=bool)
+        for shift in range(0, 8, 2):
+            index_3 |= ((index_bytes >> shift) & 3 == 3).any(axis=1)
+        return bool((index_3 & (color0 <= color1)).any())
+
+    blocks = np.frombuffer(mipmap_data, dtype=np.uint8).reshape(-1, 16)
+    if fourcc in [b'DXT2', b'DXT3']:
+        # 16 bytes block, first 8 bytes - 4 bits alpha per pixel
+        return bool((blocks[:, :8] != 255).any())
+
+    # DXT4, DXT5: 2 alpha values and 3 bits index per pixel
+    alpha0 = blocks[:, 0].astype(np.int32)
+    alpha1 = blocks[:, 1].astype(np.int32)
+    bits = np.zeros(len(blocks), dtype=np.uint64)
+    for i in range(6):
+        bits |= blocks[:, 2 + i].astype(np.uint64) << np.uint64(8 * i)
+    index = np.stack([(bits >> np.uint64(3 * pixel)) & np.uint64(7) for pixel in range(16)], axis=1).astype(np.int32)
+
+    # opaque pixel: index of alpha 255, index 7 is 255 in 6 values mode, values between alpha0 and alpha1 are less than 255
+    opaque = (index == 0) & (alpha0 == 255)[:, None]
+    opaque |= (index == 1) & (alpha1 == 255)[:, None]
+    opaque |= (index == 7) & (alpha0 <= alpha1)[:, None]
+    opaque |= (index >= 2) & (index <= 5) & ((alpha0 == 255) & (alpha1 == 255))[:, None]
+    return not bool(opaque.all())
+
+
+def save_dds(texture, save_path):
+    import struct
+
+    save_path.parent.mkdir(exist_ok=True, parents=True)
+
+    # same alpha as tga of this texture would have
+    has_alpha = dxt_has_alpha(get_mipmap_raw(texture, 0), DDS_FOURCC_DICT[texture.format])
+    if has_alpha is None:
+        has_alpha = rgba_has_alpha(texture.mipmap_rgba(0), texture.width, texture.height)
+
+    # https://learn.microsoft.com/en-us/windows/win32/direct3ddds/dds-header
+    # zenkit mipmap 0 is biggest, same order as in dds
+    mipmap_list = [get_mipmap_raw(texture, level) for level in range(texture.mipmap_count)]
+    # caps, height, width, pixel format, mipmap count, linear size
+    flags = 0x1 | 0x2 | 0x4 | 0x1000 | 0x20000 | 0x80000
+    # texture, mipmap, complex
+    caps = 0x1000 | (0x400000 | 0x8 if len(mipmap_list) > 1 else 0)
+    # fourcc, alpha pixels - loaders use it for DXT1 with transparent pixels
+    pixel_format_flags = 0x4 | (0x1 if has_alpha else 0)
+
+    header = struct.pack('<4s7I44x', b'DDS ', 124, flags, texture.height, texture.width, len(mipmap_list[0]), 0,
+                         len(mipmap_list))
+    header += struct.pack('<2I4s5I', 32, pixel_format_flags, DDS_FOURCC_DICT[texture.format], 0, 0, 0, 0, 0)
+    header += struct.pack('<4I4x', caps, 0, 0, 0)
+    assert len(header) == 128
+
+    with open(save_path, 'wb') as dds_file:
+        dds_file.write(header)
+        for mipmap_data in mipmap_list:
+            dds_file.write(mipmap_data)
+
+    return has_alpha
+
+
+def get_content_hash(tex_file_path):
+    # hash of extracted file is in manifest, in direct mode there is no hash and file is not deduplicated
+    file_info = manifest.get_file_info(tex_file_path)
+    if file_info is not None:
+        return file_info.get('hash')
+    if Path(tex_file_path).exists():
+        return build_database.get_file_hash(tex_file_path)
+
+    return None
+
+
+def group_duplicates(tex_file_path_list):
+    # same texture is in VDF_Textures, VDF_Textures_Addon and mods, every unique texture is converted once
+    # return {first file: [files with same content]}, first - first in list
+    duplicate_dict = {}
+    first_dict = {}
+    for tex_file_path in tex_file_path_list:
+        content_hash = get_content_hash(tex_file_path)
+        if content_hash is None:
+            duplicate_dict[tex_file_path] = []
+        elif content_hash in first_dict:
+            duplicate_dict[first_dict[content_hash]].append(tex_file_path)
+        else:
+            first_dict[content_hash] = tex_file_path
+            duplicate_dict[tex_file_path] = []
+
+    return duplicate_dict
+
+
+def link_duplicates(convert_path, extract_path, duplicate_dict, output_dict, texture_dedup):
+    # "hardlink" - duplicate is file on disk without own data, "alias" - duplicate is only in texture index
+    # return alias list for texture index
+    alias_list = []
+    for tex_file_path, duplicate_path_list in duplicate_dict.items():
+        output_path = output_dict.get(str(tex_file_path))
+        if output_path is None:
+            continue
+
+        for duplicate_path in duplicate_path_list:
+            alias_path = convert_path / (get_relative_path(duplicate_path, extract_path) + Path(output_path).suffix)
+            if texture_dedup == 'HARDLINK':
+                alias_path.parent.mkdir(exist_ok=True, parents=True)
+                alias_path.unlink(missing_ok=True)
+                try:
+                    os.link(output_path, alias_path)
+                    alias_list.append({'name': alias_path.stem.upper(), 'path': str(alias_path), 'target': str(output_path),
+                                       'link': True})
+                    continue
+                except OSError:
+                    # other disk or file system without hardlinks
+                    pass
+            alias_list.append({'name': alias_path.stem.upper(), 'path': str(alias_path), 'target': str(output_path)})
+
+    return alias_list
+
+
+def remove_old_links(convert_path, alias_list):
+    # hardlinks of previous convert which are not duplicates anymore
+    texture_index_file_path = Path(convert_path) / 'texture_index.json'
+    if not texture_index_file_path.exists():
+        return
+
+    alias_path_set = {alias['path'] for alias in alias_list if alias.get('link')}
+    previous_index = json.loads(texture_index_file_path.read_text(encoding='utf-8'))
+    for alias in previous_index.get('aliases', []):
+        if alias.get('link') and alias['path'] not in alias_path_set:
+            Path(alias['path']).unlink(missing_ok=True)
+
+
+# stages which write materials, blender stages of them need textures
+MATERIAL_STAGE_LIST = ['ZEN', 'MRM', 'MDL', 'MDM', 'MMB']
+
+
+def get_used_texture_rank_dict(database):
+    # {TEXTURE NAME: rank}, rank - order of first use, files of all stages go one by one like blender stages import them
+    # textures of every file are in database, see helpers.collect_textures
+    # None - some file was converted by old version without list of textures
+    stage_texture_list = []
+    for stage in MATERIAL_STAGE_LIST:
+        stage_dict = database['stages'].get(stage, {})
+        source_key_list = sorted(stage_dict, key=manifest.get_size, reverse=True)
+        if any('textures' not in (stage_dict[source_key].get('info') or {}) for source_key in source_key_list):
+            return None
+        stage_texture_list.append([stage_dict[source_key]['info']['textures'] for source_key in source_key_list])
+
+    rank_dict = {}
+    for position in range(max([len(texture_list) for texture_list in stage_texture_list], default=0)):
+        for texture_list in stage_texture_list:
+            if position < len(texture_list):
+                for texture_name in texture_list[position]:
+                    rank_dict.setdefault(texture_name, len(rank_dict))
+
+    return rank_dict
+
+
+def select_used_textures(tex_file_path_list, extract_path, rank_dict, always_include_list=None):
+    import fnmatch
+    import re
+
+    # material use first frame of animated texture (FIRE_A0), all frames are needed
+    animation_rank_dict = {}
+    for texture_name, rank in rank_dict.items():
+        match = re.match(r'(.*_A)\d+$', texture_name)
+        if match and rank < animation_rank_dict.get(match.group(1), rank + 1):
+            animation_rank_dict[match.group(1)] = rank
+
+    ranked_list = []
+    for tex_file_path in tex_file_path_list:
+        texture_name = Path(get_relative_path(tex_file_path, extract_path)).name.upper()
+        rank = rank_dict.get(texture_name)
+        match = re.match(r'(.*_A)\d+$', texture_name)
+        if rank is None and match:
+            rank = animation_rank_dict.get(match.group(1))
+        # textures which are not in materials, for example used by scripts
+        if rank is None and any(fnmatch.fnmatchcase(texture_name, pattern.upper()) for pattern in always_include_list or []):
+            rank = len(rank_dict)
+        if rank is not None:
+            ranked_list.append((rank, str(tex_file_path), tex_file_path))
+
+    return [tex_file_path for _, _, tex_file_path in sorted(ranked_list)]
+
+
+# bigger images are not loaded by some gpus, such sequences stay only as frames
+MAX_SHEET_SIZE = 8192
+
+
+def get_animation_frame_dict(texture_list, alias_list):
+    import re
+
+    # {(folder, FIRE_A): {frame: texture}}, frames of one sequence are in one folder
+    # alias frame use converted file of its target
+    texture_path_dict = {texture['path']: texture for texture in texture_list}
+    location_list = [(texture['path'], texture) for texture in texture_list]
+    for alias in alias_list:
+        if alias['target'] in texture_path_dict:
+            location_list.append((alias['path'], dict(texture_path_dict[alias['target']], name=alias['name'])))
+
+    frame_dict = {}
+    for location, texture in location_list:
+        match = re.match(r'(.*_A)(\d+)$', texture['name'])
+        if match:
+            frame_dict.setdefault((str(Path(location).parent), match.group(1)), {})[int(match.group(2))] = texture
+
+    return frame_dict
+
+
+def save_animation_sheet(frame_list, animation):
+    # frames go by rows from top left corner
+    width = animation['width']
+    height = animation['height']
+    sheet_image = Image.new('RGBA' if animation['alpha'] else 'RGB', (animation['columns'] * width, animation['rows'] * height))
+    for frame_index, frame in enumerate(frame_list):
+        with Image.open(frame['path']) as image:
+            position = ((frame_index % animation['columns']) * width, (frame_index // animation['columns']) * height)
+            sheet_image.paste(image.convert(sheet_image.mode), position)
+
+    Path(animation['path']).parent.mkdir(exist_ok=True, parents=True)
+    sheet_image.save(animation['path'])
+
+
+def save_animation_sheets(convert_path, texture_list, alias_list):
+    # animated texture (FIRE_A0, FIRE_A1, ...) is also saved as one sheet, so material load one image instead of every frame
+    # sheet with same frames as in previous convert is not saved again
+    texture_index_file_path = Path(convert_path) / 'texture_index.json'
+    previous_animation_dict = {}
+    if texture_index_file_path.exists():
+        previous_index = json.loads(texture_index_file_path.read_text(encoding='utf-8'))
+        previous_animation_dict = {animation['path']: animation for animation in previous_index.get('animations', [])}
+
+    animation_list = []
+    for (folder, name), frame_dict in sorted(get_animation_frame_dict(texture_list, alias_list).items()):
+        # sequence without some frames or with frames of different size
+        frame_list = [frame_dict.get(frame_index) for frame_index in range(len(frame_dict))]
+        if len(frame_list) < 2 or None in frame_list or frame_list[0].get('width') is None:
+            continue
+        width = frame_list[0]['width']
+        height = frame_list[0]['height']
+        if any(frame.get('width') != width or frame.get('height') != height for frame in frame_list):
+            continue
+
+        # nearly square grid
+        columns = math.ceil(math.sqrt(len(frame_list)))
+        rows = math.ceil(len(frame_list) / columns)
+        if max(columns * width, rows * height) > MAX_SHEET_SIZE:
+            continue
+
+        animation = {'name': name, 'path': str(Path(folder) / f'{name}_SHEET.TGA'), 'frames': len(frame_list),
+                     'columns': columns, 'rows': rows, 'width': width, 'height': height,
+                     'alpha': any(frame.get('alpha') for frame in frame_list),
+                     'frame_names': [frame['name'] for frame in frame_list],
+                     'frame_hashes': [frame.get('hash') for frame in frame_list]}
+        if (previous_animation_dict.get(animation['path']) != animation or None in animation['frame_hashes'] or
+                not Path(animation['path']).exists()):
+            save_animation_sheet(frame_list, animation)
+        animation_list.append(animation)
+
+    if animation_list:
+        print(f'[TEXTURE] {len(animation_list)} animated textures are saved as sheets')
+
+    return animation_list
+
+
+def remove_old_sheets(convert_path, animation_list):
+    # sheets of previous convert which are not made anymore
+    texture_index_file_path = Path(convert_path) / 'texture_index.json'
+    if not texture_index_file_path.exists():
+        return
+
+    animation_path_set = {animation['path'] for animation in animation_list}
+    previous_index = json.loads(texture_index_file_path.read_text(encoding='utf-8'))
+    for animation in previous_index.get('animations', []):
+        if animation['path'] not in animation_path_set:
+            Path(animation['path']).unlink(missing_ok=True)
+
+
+def convert(extract_path, convert_path, jobs=1, database=None, executor=None, texture_format='TGA',
+            texture_dedup=False, texture_demand=False, texture_always_include=None, texture_lod_levels=None,
+            texture_animation_sheets=False):
+    tex_file_path_list = sorted(manifest.find_files(extract_path, '*.TEX'))
+    texture_format = texture_format.upper()
+    texture_dedup = str(texture_dedup).upper()
+
+    # only textures used by converted worlds and meshes, in order of first use
+    if texture_demand:
+        rank_dict = get_used_texture_rank_dict(database) if database else None
+        if rank_dict is None:
+            print('[TEXTURE] WARNING: list of used textures is not known, all textures are converted. '
+                  'Use "convert_all.py --rebuild" once to make it.')
+        else:
+            all_count = len(tex_file_path_list)
+            tex_file_path_list = select_used_textures(tex_file_path_list, extract_path, rank_dict, texture_always_include)
+            print(f'[TEXTURE] {len(tex_file_path_list)} of {all_count} textures are used by materials and decals')
+
+    duplicate_dict = {tex_file_path: [] for tex_file_path in tex_file_path_list}
+    if texture_dedup in ['ALIAS', 'HARDLINK']:
+        duplicate_dict = group_duplicates(tex_file_path_list)
+        duplicate_count = len(tex_file_path_list) - len(duplicate_dict)
+        if duplicate_count:
+            print(f'[TEXTURE] {duplicate_count} of {len(tex_file_path_list)} textures are duplicates, '
+                  f'{len(duplicate_dict)} unique textures are converted')
+
+    lod_path_dict = get_lod_path_dict(convert_path, texture_lod_levels)
+    argument_list = [(tex_file_path, extract_path, convert_path, texture_format, lod_path_dict)
+                     for tex_file_path in duplicate_dict]
+    result_list = build_database.run_parse_stage(database, 'TEX', convert_file, argument_list, jobs,
+                                                 config_key_list=['texture_format', 'texture_lod_levels'], executor=executor,
+                                                 sort_by_size=not texture_demand)
+    helpers.print_errors('TEXTURE', result_list)
+
+    output_dict = {str(arguments[0]): str(entry['outputs'][0]) for arguments, (entry, _) in zip(argument_list, result_list)
+                   if entry and entry['outputs']}
+    alias_list = link_duplicates(Path(convert_path), extract_path, duplicate_dict, output_dict, texture_dedup)
+    remove_old_links(convert_path, alias_list)
+
+    texture_list = get_index_texture_list(result_list)
+    animation_list = []
+    if texture_animation_sheets:
+        animation_list = save_animation_sheets(convert_path, texture_list, alias_list)
+    remove_old_sheets(convert_path, animation_list)
+
+    save_texture_index(convert_path, texture_list, alias_list, animation_list)
+
+
+def get_index_texture_list(result_list):
+    # texture = {'name', 'path', 'width', 'height', 'alpha', 'format', 'hash', 'color'}, format - format in TEX file
+    # lods - smaller copies of texture, see texture_lod_levels in config
+    texture_list = []
+    for entry, _ in result_list:
+        if not entry or not entry['outputs']:
+            continue
+        output_path = entry['outputs'][0]
+        texture_list.append(dict({'name': Path(output_path).stem.upper(), 'path': str(output_path)},
+                                 **(entry.get('info') or {})))
+
+    return texture_list
+
+
+def save_texture_index(convert_path, texture_list, alias_list=None, animation_list=None):
+    # blender scripts take textures from this list instead of scan of convert folder for every mesh
+    # alias - texture with same content as other texture, "target" is converted file, with "link" path is hardlink
+    # animation - all frames of animated texture in one sheet, frames go by rows, "name" - name of frames without number
+    texture_index = {'textures': sorted(texture_list, key=lambda texture: texture['path']),
+                     'aliases': sorted(alias_list or [], key=lambda alias: alias['path']),
+                     'animations': sorted(animation_list or [], key=lambda animation: animation['path'])}
+
+    json_data = json.dumps(texture_index, indent=4, ensure_ascii=False)
+    (Path(convert_path) / 'texture_index.json').write_text(json_data, encoding='utf-8')
 
 
 def main():
@@ -87,7 +552,10 @@ def main():
     # shutil.rmtree(convert_path, ignore_errors=True)
     # convert_path.mkdir()
 
-    convert(extract_path, convert_path)
+    # without database list of used textures is not known, texture_demand is not used
+    convert(extract_path, convert_path, jobs=helpers.get_jobs(config), texture_format=config.get('texture_format', 'TGA'),
+            texture_dedup=config.get('texture_dedup', False), texture_lod_levels=config.get('texture_lod_levels', []),
+            texture_animation_sheets=config.get('texture_animation_sheets', False))
 
 
 if __name__ == '__main__':
@@ -1,18 +1,17 @@
 import json
-import shutil
-from importlib.resources import read_text
 from pathlib import Path
-import subprocess
+from array import array
 
-from zenkit import World, VirtualObject, VobType, VisualDecal, VisualType
-from zenkit import MovableObject, InteractiveObject, Container, Door, Fire, SoundMaterialType
-from zenkit import Trigger, TriggerList, TriggerScript, TriggerChangeLevel, TriggerWorldStart, TriggerUntouch
-from zenkit import Mover, MoverBehavior, MoverSpeedType, TriggerBatchMode, TriggerListTarget
+from zenkit import World, VisualType
+from zenkit import MovableObject, InteractiveObject, Container, Door, Fire
+from zenkit import Trigger, TriggerList, TriggerScript, TriggerChangeLevel
+from zenkit import Mover
 from zenkit import Sound, SoundDaytime
-from zenkit import ModelScript, AnimationFlags, AnimationDirection
 from zenkit import GameVersion
 
+import build_database
 import helpers
+import manifest
 
 vob_index = 0
 
@@ -454,7 +453,38 @@ def parse_waypoints(way_net):
     return way_point_dict_list
 
 
-def parse_mesh(mesh, bsp_tree):
+def parse_mesh_arrays(mesh):
+    # same data as parse_mesh, polygons as flat index arrays and count of indices for every polygon
+    positions = array('f')
+    for position in mesh.positions:
+        positions.extend([position.x, position.y, position.z])
+
+    texture = array('f')
+    normals = array('f')
+    for feature in mesh.features:
+        texture.extend([feature.texture.x, feature.texture.y])
+        normals.extend([feature.normal.x, feature.normal.y, feature.normal.z])
+
+    polygon_position_indices = array('i')
+    polygon_feature_indices = array('i')
+    polygon_loop_totals = array('i')
+    polygon_material_indices = array('i')
+    for polygon in mesh.polygons:
+        polygon_position_indices.extend(polygon.position_indices)
+        polygon_feature_indices.extend(polygon.feature_indices)
+        polygon_loop_totals.append(len(polygon.position_indices))
+        polygon_material_indices.append(polygon.material_index)
+
+    return {'positions': (3, positions),
+            'texture': (2, texture),
+            'normals': (3, normals),
+            'polygon_position_indices': (1, polygon_position_indices),
+            'polygon_feature_indices': (1, polygon_feature_indices),
+            'polygon_loop_totals': (1, polygon_loop_totals),
+            'polygon_material_indices': (1, polygon_material_indices)}
+
+
+def parse_mesh(mesh, bsp_tree, geometry_json=True):
     name = ''
     try:
         name = mesh.name
@@ -466,6 +496,9 @@ def parse_mesh(mesh, bsp_tree):
     bbox_max = [mesh.bounding_box.max.x, mesh.bounding_box.max.y, mesh.bounding_box.max.z]
     bbox_max = [rf(f) for f in bbox_max]
 
+    if not geometry_json:
+        return {'name': name, 'datetime': '', 'bounding_box': {'min': bbox_min, 'max': bbox_max}}
+
     positions = []
     for position in mesh.positions:
         position = [position.x, position.y, position.z]
@@ -507,46 +540,86 @@ def parse_mesh(mesh, bsp_tree):
     return mesh_data
 
 
-def convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path):
-    zen_file_path_list = list(Path(extract_path).rglob(f'*.ZEN'))
+def save_world(world, save_path, world_name, geometry_json=False, texture_list=None):
+    global vob_index
 
-    for zen_file_path in zen_file_path_list:
-        relative_path = zen_file_path.relative_to(extract_path).parent  # / zen_file_path.stem
+    # vob id is unique per world, so output not depend on files order or worker process
+    vob_index = 0
 
-        # if 'FIRETREE_LAMP.ZEN' not in str(zen_file_path):  # ARCHOLOS_SEWERS, FIRETREE_LAMP, NEWWORLD.ZEN
-        #     continue
+    save_path.mkdir(exist_ok=True, parents=True)
 
-        print(f'[WORLD] Start parse file: [{relative_path / zen_file_path.stem}.ZEN]')
+    # geometry in binary file, json lists only for debug
+    mesh_dict = parse_mesh(world.mesh, world.bsp_tree, geometry_json)
+    geometry_file_path = save_path / (world_name + '.ZEN.bin')
+    mesh_dict['geometry'] = helpers.write_geometry(geometry_file_path, parse_mesh_arrays(world.mesh))
+
+    waypoints_dict = parse_waypoints(world.way_net)
+    materials_dict = helpers.parse_materials(world.mesh.materials)
+    vob_dict = pasrse_vob(world.root_objects)
+
+    # print(f'{len(world.root_objects)=}')
+
+    world_dict = {'mesh': mesh_dict, 'vobs': vob_dict, 'materials': materials_dict, 'waypoints': waypoints_dict}
+    json_data = json.dumps(world_dict, indent=4, ensure_ascii=False)
+
+    save_path_world = save_path / (world_name + '.ZEN.json')
+    save_path_world.write_text(json_data, encoding='utf-8')
+
+    # textures used by world mesh and decal vobs, for convert of only used textures
+    if texture_list is not None:
+        texture_list.extend(helpers.collect_textures(world_dict))
+
+    return [save_path_world, geometry_file_path]
+
+
+def convert_file(zen_file_path, extract_path, intermediate_path, geometry_json=False):
+    relative_path = zen_file_path.relative_to(extract_path).parent  # / zen_file_path.stem
+
+    # if 'FIRETREE_LAMP.ZEN' not in str(zen_file_path):  # ARCHOLOS_SEWERS, FIRETREE_LAMP, NEWWORLD.ZEN
+    #     return
+
+    helpers.print_file(f'[WORLD] Start parse file: [{relative_path / zen_file_path.stem}.ZEN]')
+
+    world = None
+    try:
+        world = World.load(manifest.read_file(zen_file_path), version=GameVersion.GOTHIC2)
+    except:
+        raise RuntimeError(f'can\'t open: {relative_path / zen_file_path.stem}.ZEN')
+
+    texture_list = []
+    output_path_list = save_world(world, intermediate_path / relative_path, zen_file_path.stem, geometry_json, texture_list)
+
+    helpers.print_file(f'[WORLD] End parse file: [{relative_path / zen_file_path.stem}.ZEN]')
+
+    return {'outputs': output_path_list, 'info': {'textures': texture_list}}
 
-        world = None
-        try:
-            world = World.load(zen_file_path, version=GameVersion.GOTHIC2)
-        except:
-            print(f'[WORLD] ERROR: can\'t open: {relative_path / zen_file_path.stem}.ZEN')
-            continue
 
-        mesh_dict = parse_mesh(world.mesh, world.bsp_tree)
-        waypoints_dict = parse_waypoints(world.way_net)
-        materials_dict = helpers.parse_materials(world.mesh.materials)
-        vob_dict = pasrse_vob(world.root_objects)
+def prepare(extract_path, intermediate_path, jobs=1, database=None, executor=None, feed=None, geometry_json=False):
+    zen_file_path_list = manifest.find_files(extract_path, '*.ZEN')
 
-        # print(f'{len(world.root_objects)=}')
+    argument_list = [(zen_file_path, extract_path, intermediate_path, geometry_json) for zen_file_path in zen_file_path_list]
+    result_list = build_database.run_parse_stage(database, 'ZEN', convert_file, argument_list, jobs, ['geometry_json'],
+                                                 executor=executor, feed=feed)
+    helpers.print_errors('WORLD', result_list)
 
-        world_dict = {'mesh': mesh_dict, 'vobs': vob_dict, 'materials': materials_dict, 'waypoints': waypoints_dict}
-        json_data = json.dumps(world_dict, indent=4, ensure_ascii=False)
 
-        save_path = intermediate_path / relative_path
-        save_path.mkdir(exist_ok=True, parents=True)
+def convert_via_blender(intermediate_path, blender_executable_file_path, blender_script_file_path, database=None,
+                        blender_instances=1, blender_pool=None, feed=None):
+    print('[WORLD] Start convert ZEN via blender')
+    blender_result_list = build_database.run_blender_stage(database, 'ZEN_BLENDER', blender_executable_file_path,
+                                                           blender_script_file_path, intermediate_path, '*.ZEN.json',
+                                                           blender_instances, blender_pool, feed)
+    helpers.print_blender_errors('WORLD', blender_result_list)
+    print('[WORLD] End convert ZEN via blender')
 
-        save_path_world = save_path / (zen_file_path.stem + '.ZEN.json')
-        save_path_world.write_text(json_data, encoding='utf-8')
 
-        print(f'[WORLD] End parse file: [{relative_path / zen_file_path.stem}.ZEN]')
+def convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path, jobs=1, database=None,
+            blender_instances=1, geometry_json=False):
+    prepare(extract_path, intermediate_path, jobs=jobs, database=database, geometry_json=geometry_json)
 
     if __name__ != '__main__':
-        print(f'[WORLD] Start convert ZEN via blender')
-        helpers.run_blender(blender_executable_file_path, blender_script_file_path)
-        print(f'[WORLD] End convert ZEN via blender')
+        convert_via_blender(intermediate_path, blender_executable_file_path, blender_script_file_path, database=database,
+                            blender_instances=blender_instances)
 
 
 def main():
@@ -574,9 +647,11 @@ def main():
     blender_executable_file_path = Path(config['blender_folder']) / 'blender.exe'
     blender_script_file_path = Path.cwd() / 'import_zengin_json' / 'import_zen.py'
 
-    convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path)
+    convert(extract_path, intermediate_path, convert_path, blender_executable_file_path, blender_script_file_path,
+            jobs=helpers.get_jobs(config), geometry_json=config.get('geometry_json', False))
 
-    helpers.run_blender(blender_executable_file_path, blender_script_file_path)
+    convert_via_blender(intermediate_path, blender_executable_file_path, blender_script_file_path,
+                        blender_instances=helpers.get_blender_instances(config))
 
 
 if __name__ == '__main__':
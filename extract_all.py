@@ -1,42 +1,409 @@
+import argparse
 import json
-import shutil
+import time
 from pathlib import Path
 
 from zenkit import Vfs, VfsOverwriteBehavior, GameVersion
 
+import helpers
 
-def save_file(vfs, node, path):
+
+def get_file_save_path(path, node_name):
+    file_name = ""
+    file_format = ""
+    if '.' in node_name:
+        file_format, file_name = node_name[::-1].split('.', 1)
+        file_name = file_name[::-1]
+        file_format = file_format[::-1]
+    else:
+        file_name = node_name
+
+    file_to_save = Path(path)
+
+    if file_format == 'MAN' and '-' in file_name:
+        folder_name, file_name = file_name.split('-')
+        file_to_save = file_to_save / folder_name / (file_name + '.' + file_format)
+    elif file_format == 'MSB' or file_format == 'MDH':
+        file_to_save = file_to_save / file_name / (file_name + '.' + file_format)
+    else:
+        file_to_save = file_to_save / node_name
+
+    return file_to_save
+
+
+def collect_files(node, path, file_dict):
+    # file_dict = {vfs path in upper case: (folder path in vfs, node)}
     if node.is_dir():
         subpath = path + node.name + '/'
         # print(f'path {Path(subpath)}')
         for node_children in node.children:
-            save_file(vfs, node_children, subpath)
+            collect_files(node_children, subpath, file_dict)
     if node.is_file():
-        node_name = node.name
-        file_name = ""
-        file_format = ""
-        if '.' in node_name:
-            file_format, file_name = node_name[::-1].split('.', 1)
-            file_name = file_name[::-1]
-            file_format = file_format[::-1]
-        else:
-            file_name = node_name
+        file_dict[(path + node.name).upper()] = (path, node)
+
+
+def get_filters(config, include=None, exclude=None, archives=None, exclude_archives=None):
+    # patterns from command line replace patterns from config
+    # ".ZEN" - extension, other patterns - glob for path in archive or name of file, empty include - all files
+    return {'include': include or config.get('extract_include', []),
+            'exclude': exclude or config.get('extract_exclude', []),
+            'archives': archives or config.get('extract_archives', []),
+            'exclude_archives': exclude_archives or config.get('extract_exclude_archives', [])}
+
+
+def match_entry(entry, pattern):
+    import fnmatch
+
+    entry = entry.upper()
+    pattern = pattern.upper()
+    if pattern.startswith('.') and not any(character in pattern for character in '*?['):
+        return entry.endswith(pattern)
+
+    return fnmatch.fnmatchcase(entry, pattern) or fnmatch.fnmatchcase(entry.rsplit('/', 1)[-1], pattern)
+
+
+def is_entry_included(entry, filters):
+    if filters is None:
+        return True
+    if filters['include'] and not any(match_entry(entry, pattern) for pattern in filters['include']):
+        return False
+
+    return not any(match_entry(entry, pattern) for pattern in filters['exclude'])
+
+
+def is_archive_included(vfs_file, filters):
+    import fnmatch
+
+    # "Anims", "Anims.vdf" or "*.mod"
+    def match_archive(pattern):
+        pattern = pattern.upper()
+        return fnmatch.fnmatchcase(vfs_file.name.upper(), pattern) or fnmatch.fnmatchcase(vfs_file.stem.upper(), pattern)
+
+    if filters is None:
+        return True
+    if filters['archives'] and not any(match_archive(pattern) for pattern in filters['archives']):
+        return False
+
+    return not any(match_archive(pattern) for pattern in filters['exclude_archives'])
+
+
+# size of one write call, big entries are written part by part from view of data without copy
+WRITE_CHUNK_SIZE = 1024 * 1024
+
+
+def write_file(file_to_save, data, previous_hash=None):
+    import hashlib
+
+    # same hash as in build database, so convert don't read extracted files again
+    file_hash = hashlib.blake2b(data, digest_size=16).hexdigest()
+
+    # same data is already on disk from previous extract
+    # folders are created before by write_files
+    if file_hash != previous_hash:
+        data_view = memoryview(data)
+        with open(file_to_save, 'wb') as file:
+            for offset in range(0, len(data_view), WRITE_CHUNK_SIZE):
+                file.write(data_view[offset:offset + WRITE_CHUNK_SIZE])
+
+    return len(data), file_hash
+
+
+def make_folders(file_path_list):
+    # every folder once, not mkdir for every file
+    # parents go first, so mkdir of folder don't need to create parents
+    folder_set = {Path(file_path).parent for file_path in file_path_list}
+    for folder_path in sorted(folder_set, key=lambda path: len(path.parts)):
+        folder_path.mkdir(exist_ok=True, parents=True)
+
+
+def write_files(save_list, write_threads=4, write_buffer=256 * 1024 * 1024):
+    from concurrent.futures import ThreadPoolExecutor
+    import threading
+
+    # save_list = [(file_to_save, node, previous_hash)], data is read from vfs only in this thread, threads only write
+    # return {file_to_save: (size, hash)}
+    make_folders(file_to_save for file_to_save, _, _ in save_list)
+
+    # read data wait for write not more than write_buffer bytes, so big archives don't fill memory
+    # one entry bigger than buffer is written alone, with buffer 0 entries are written one by one
+    pending = {'size': 0}
+    pending_condition = threading.Condition()
+
+    def release(size):
+        with pending_condition:
+            pending['size'] -= size
+            pending_condition.notify()
+
+    with ThreadPoolExecutor(max_workers=write_threads) as executor:
+        future_dict = {}
+        for file_to_save, node, previous_hash in save_list:
+            with pending_condition:
+                pending_condition.wait_for(lambda: pending['size'] == 0 or pending['size'] < write_buffer)
+            data = node.data
+            with pending_condition:
+                pending['size'] += len(data)
+            future = executor.submit(write_file, file_to_save, data, previous_hash)
+            future.add_done_callback(lambda _, size=len(data): release(size))
+            future_dict[file_to_save] = future
+            # data is only in write thread now, memory is freed right after write
+            del data
+
+        return {file_to_save: future.result() for file_to_save, future in future_dict.items()}
+
+
+def load_previous_extract(extract_path, extract_mode, direct, filters=None):
+    # files of previous extract which can be kept, None - extract all again
+    manifest_file_path = extract_path / 'extract_manifest.json'
+    if direct or not manifest_file_path.exists():
+        return None
+
+    try:
+        previous_manifest = json.loads(manifest_file_path.read_text(encoding='utf-8'))
+    except ValueError:
+        return None
+    if previous_manifest.get('mode') != extract_mode or previous_manifest.get('direct') or 'time' not in previous_manifest:
+        return None
+
+    # same size and modification time - archive is not changed
+    # with other filters other entries can be needed, so every archive is mounted, but not changed files are still kept
+    unchanged_archive_set = set()
+    for archive_info in (previous_manifest['archives'] if previous_manifest.get('filters') == filters else []):
+        archive_file_path = Path(archive_info['file'])
+        if not archive_file_path.exists():
+            continue
+        stat = archive_file_path.stat()
+        if stat.st_size == archive_info['size'] and stat.st_mtime_ns == archive_info['mtime']:
+            unchanged_archive_set.add(archive_info['file'])
+
+    return {'time': previous_manifest['time'], 'unchanged_archives': unchanged_archive_set,
+            'files': {str(extract_path / relative_path): file_info
+                      for relative_path, file_info in previous_manifest['files'].items()}}
+
+
+def remove_previous_files(extract_path):
+    # only files written by previous extract, other files in extract folder are not touched
+    # files of direct extract was not written, they are only in manifest
+    manifest_file_path = extract_path / 'extract_manifest.json'
+    if not manifest_file_path.exists():
+        return
+
+    try:
+        previous_manifest = json.loads(manifest_file_path.read_text(encoding='utf-8'))
+    except ValueError:
+        return
+    if previous_manifest.get('direct'):
+        return
+
+    for relative_path in previous_manifest.get('files', {}):
+        (extract_path / relative_path).unlink(missing_ok=True)
+
+
+def get_previous_hash(file_to_save, previous):
+    # hash of file from previous extract, if file on disk was not changed after it
+    if previous is None:
+        return None
+
+    file_info = previous['files'].get(str(file_to_save))
+    if file_info is None or file_info.get('hash') is None:
+        return None
+
+    try:
+        stat = Path(file_to_save).stat()
+    except OSError:
+        return None
+    if stat.st_size != file_info['size'] or stat.st_mtime_ns > previous['time']:
+        return None
+
+    return file_info['hash']
+
+
+def is_kept(file_to_save, vfs_file, previous):
+    # file from not changed archive, which is on disk from previous extract, is not read again
+    if previous is None or str(vfs_file) not in previous['unchanged_archives']:
+        return False
+
+    file_info = previous['files'].get(str(file_to_save))
+    return file_info is not None and file_info['archive'] == str(vfs_file) and get_previous_hash(file_to_save, previous)
+
+
+def extract_archive(vfs_file, save_path, write_threads=4, write_data=True, previous=None, write_buffer=256 * 1024 * 1024,
+                    filters=None):
+    # run in own process for every archive
+    # without write_data only list of files is returned, converters read files from archive
+    # previous - previous extract of this archive, changed files are written, not changed are kept
+    # filters - entries which are not included are not read from archive at all
+
+    # archive not changed and all its files are on disk - archive is not even mounted
+    if previous and str(vfs_file) in previous['unchanged_archives']:
+        if all(is_kept(file_to_save, vfs_file, previous) for file_to_save in previous['files']):
+            print(f'[EXTRACT] Not changed: {vfs_file}')
+            return {file_to_save: (file_info['entry'], file_info['size'], file_info['hash'])
+                    for file_to_save, file_info in previous['files'].items()}
+
+    print(f'[EXTRACT] Extract files from: {vfs_file}')
+
+    vfs = Vfs()
+    vfs.mount_disk(vfs_file, clobber=VfsOverwriteBehavior.OLDER)
+
+    file_dict = {}
+    collect_files(vfs.root, '', file_dict)
+
+    # different nodes can have same save path (MAN with folder in name), last node win like in serial extraction
+    save_dict = {}
+    for path, node in file_dict.values():
+        entry = (path + node.name).lstrip('/')
+        if is_entry_included(entry, filters):
+            save_dict[get_file_save_path(str(save_path) + path, node.name)] = (entry, node)
+
+    written_dict = {}
+    if write_data:
+        save_list = []
+        for file_to_save, (_, node) in save_dict.items():
+            if is_kept(file_to_save, vfs_file, previous):
+                file_info = previous['files'][str(file_to_save)]
+                written_dict[file_to_save] = (file_info['size'], file_info['hash'])
+            else:
+                save_list.append((file_to_save, node, get_previous_hash(file_to_save, previous)))
+        written_dict.update(write_files(save_list, write_threads, write_buffer))
+
+    print(f'[EXTRACT] Extracted {len(save_dict)} files from: {vfs_file}')
+
+    # {saved file: (path in archive, size, hash)}, without write_data size and hash are not known
+    return {str(file_to_save): (entry, *written_dict.get(file_to_save, (None, None)))
+            for file_to_save, (entry, _) in save_dict.items()}
+
+
+def extract_overlay(vdf_file_path_list, extract_path, write_threads=4, write_data=True, previous=None,
+                    write_buffer=256 * 1024 * 1024, filters=None):
+    # all archives in one vfs like in game: base archives by timestamp rule, mods over all of them
+    # only winning version of every file is written, to folder of archive it came from
+    vfs = Vfs()
+    archive_list = []
+    for vfs_file in vdf_file_path_list:
+        print(f'[EXTRACT] Mount: {vfs_file}')
+        clobber = VfsOverwriteBehavior.ALL if vfs_file.suffix.upper() == '.MOD' else VfsOverwriteBehavior.OLDER
+        vfs.mount_disk(vfs_file, clobber=clobber)
+
+        # own vfs of every archive to know which archive contain which files
+        archive_vfs = Vfs()
+        archive_vfs.mount_disk(vfs_file, clobber=VfsOverwriteBehavior.OLDER)
+        archive_file_dict = {}
+        collect_files(archive_vfs.root, '', archive_file_dict)
+        archive_list.append((vfs_file, archive_vfs, archive_file_dict))
 
-        file_to_save = Path(path)
+    file_dict = {}
+    collect_files(vfs.root, '', file_dict)
 
-        if file_format == 'MAN' and '-' in file_name:
-            folder_name, file_name = file_name.split('-')
-            file_to_save = file_to_save / folder_name / (file_name + '.' + file_format)
-        elif file_format == 'MSB' or file_format == 'MDH':
-            file_to_save = file_to_save / file_name / (file_name + '.' + file_format)
+    # archive of every entry in previous extract, it is same while all archives with this entry are not changed
+    previous_entry_dict = {}
+    if previous:
+        previous_entry_dict = {file_info['entry'].upper(): file_info for file_info in previous['files'].values()}
+
+    save_list = []
+    manifest_file_dict = {}
+    overridden_count = 0
+    for key, (path, node) in file_dict.items():
+        entry = (path + node.name).lstrip('/')
+        if not is_entry_included(entry, filters):
+            continue
+        candidate_list = [(vfs_file, archive_file_dict[key][1]) for vfs_file, _, archive_file_dict in archive_list
+                          if key in archive_file_dict]
+        source_vfs_file = candidate_list[-1][0] if candidate_list else vdf_file_path_list[-1]
+        if len(candidate_list) > 1:
+            overridden_count += len(candidate_list) - 1
+            candidate_dict = {str(vfs_file): vfs_file for vfs_file, _ in candidate_list}
+            previous_info = previous_entry_dict.get(entry.upper())
+            if (previous_info and all(vfs_file in previous['unchanged_archives'] for vfs_file in candidate_dict) and
+                    {previous_info['archive'], *previous_info['overrides']} == set(candidate_dict)):
+                source_vfs_file = candidate_dict[previous_info['archive']]
+            else:
+                # vfs don't tell from which archive file is, find archive with same data, last in load order if same
+                data = node.data
+                for vfs_file, candidate_node in reversed(candidate_list):
+                    if candidate_node.data == data:
+                        source_vfs_file = vfs_file
+                        break
+                del data
+
+        file_to_save = get_file_save_path(str(extract_path / get_game_type_folder(source_vfs_file)) + path, node.name)
+        manifest_file_dict[str(file_to_save)] = get_manifest_file_info(
+            source_vfs_file, entry, [vfs_file for vfs_file, _ in candidate_list if vfs_file != source_vfs_file])
+
+        if is_kept(file_to_save, source_vfs_file, previous):
+            file_info = previous['files'][str(file_to_save)]
+            manifest_file_dict[str(file_to_save)].update(size=file_info['size'], hash=file_info['hash'])
         else:
-            file_to_save = file_to_save / node_name
+            save_list.append((file_to_save, node, get_previous_hash(file_to_save, previous)))
+
+    print(f'[EXTRACT] {len(manifest_file_dict)} files, {overridden_count} overridden files skipped, '
+          f'{len(manifest_file_dict) - len(save_list)} files not changed')
+    if write_data:
+        for file_to_save, (size, file_hash) in write_files(save_list, write_threads, write_buffer).items():
+            manifest_file_dict[str(file_to_save)].update(size=size, hash=file_hash)
+
+    return manifest_file_dict
+
+
+def get_manifest_file_info(vfs_file, entry, override_list, size=None, file_hash=None):
+    # folder - game type folder, type - extension of file in archive
+    return {'archive': str(vfs_file), 'entry': entry, 'overrides': [str(path) for path in override_list],
+            'folder': get_game_type_folder(vfs_file).parts[0], 'type': Path(entry).suffix[1:].upper(),
+            'size': size, 'hash': file_hash}
+
+
+def get_load_order(vdf_file_path_list):
+    # .vdf then .mod, mod files override files of base archives
+    vdf_file_path_list = sorted(vdf_file_path_list, key=lambda path: path.name.upper())
+    return ([path for path in vdf_file_path_list if path.suffix.upper() != '.MOD'] +
+            [path for path in vdf_file_path_list if path.suffix.upper() == '.MOD'])
+
+
+def save_manifest(extract_path, extract_mode, direct, vdf_file_path_list, manifest_file_dict, filters=None):
+    # which archive every extracted file came from, paths are relative to extract folder
+    # size and mtime of archive - files of archive must be converted again if archive changed
+    # time - hash of file is valid if file was not changed after it
+    # filters - only files matching them are in manifest
+    manifest = {'mode': extract_mode,
+                'direct': direct,
+                'filters': filters,
+                'time': time.time_ns(),
+                'archives': [{'file': str(vfs_file), 'folder': get_game_type_folder(vfs_file).as_posix(),
+                              'size': vfs_file.stat().st_size, 'mtime': vfs_file.stat().st_mtime_ns}
+                             for vfs_file in vdf_file_path_list],
+                'files': {}}
+    for file_to_save, file_info in sorted(manifest_file_dict.items()):
+        manifest['files'][Path(file_to_save).relative_to(extract_path).as_posix()] = file_info
+
+    manifest_file_path = extract_path / 'extract_manifest.json'
+    manifest_file_path.write_text(json.dumps(manifest, indent=4, ensure_ascii=False), encoding='utf-8')
+    print(f'[EXTRACT] Manifest saved: {manifest_file_path}')
 
-        file_to_save.parent.mkdir(exist_ok=True, parents=True)
-        file_to_save.write_bytes(node.data)
 
+def get_game_type_folder(vfs_file):
+    vfs_file_name = vfs_file.stem
+    prefix = ''
+    if 'VDF' in vfs_file.suffix.upper():
+        prefix = 'VDF_'
+    elif 'MOD' in vfs_file.suffix.upper():
+        prefix = 'MOD_'
 
-def extract():
+    # how we can get gothic version from vfs?
+    game_version = GameVersion.GOTHIC2
+
+    game_type_folder = 'Game'
+    if game_version == GameVersion.GOTHIC1:
+        game_type_folder = 'Gothic'
+    elif game_version == GameVersion.GOTHIC2:
+        game_type_folder = 'Gothic II'
+    if 'ADDON' in vfs_file_name.upper():
+        game_type_folder = 'Addon'
+    elif prefix == 'MOD_':
+        game_type_folder = 'Mod'
+
+    return Path(game_type_folder) / (prefix + vfs_file_name)
+
+
+def extract(jobs=None, extract_mode=None, direct=None, rebuild=False, filters=None):
     config_file_path = Path('config.json')
     if not config_file_path.exists():
         print(f'ERROR: can\'t find config file [{config_file_path}].')
@@ -53,45 +420,96 @@ def extract():
     if not extract_path.is_absolute():
         extract_path = Path.cwd() / extract_path
 
-    vdf_file_path_list = list(vdf_folder_path.glob(f'*.vdf'))
-    vdf_file_path_list.extend(list(vdf_folder_path.glob(f'*.mod')))
+    vdf_file_path_list = list(vdf_folder_path.glob('*.vdf'))
+    vdf_file_path_list.extend(list(vdf_folder_path.glob('*.mod')))
     if len(vdf_file_path_list) == 0:
         print(f'ERROR: folder [{vdf_folder_path}] don\'t contain any .vdf/.mod files.')
         return
 
-    shutil.rmtree(extract_path, ignore_errors=True)
-    extract_path.mkdir(parents=True, exist_ok=True)
+    if extract_mode is None:
+        extract_mode = config.get('extract_mode', 'archives')
+    if direct is None:
+        direct = config.get('extract_direct', False)
 
-    for vfs_file in vdf_file_path_list:
-        vfs_file_name = vfs_file.stem
-        prefix = ''
-        if 'VDF' in vfs_file.suffix.upper():
-            prefix = 'VDF_'
-        elif 'MOD' in vfs_file.suffix.upper():
-            prefix = 'MOD_'
+    if filters is None:
+        filters = get_filters(config)
+    vdf_file_path_list = [vfs_file for vfs_file in vdf_file_path_list if is_archive_included(vfs_file, filters)]
+    if len(vdf_file_path_list) == 0:
+        print(f'ERROR: all archives in folder [{vdf_folder_path}] are excluded by filters.')
+        return
 
-        print(f'[EXTRACT] Extract files from: {vfs_file}')
+    # only changed archives and files are extracted again
+    previous = None if rebuild else load_previous_extract(extract_path, extract_mode, direct, filters)
+    if previous is None and not direct:
+        remove_previous_files(extract_path)
+    extract_path.mkdir(parents=True, exist_ok=True)
 
-        vfs = Vfs()
-        vfs.mount_disk(vfs_file, clobber=VfsOverwriteBehavior.OLDER)
+    write_threads = helpers.get_worker_count(config.get('extract_write_threads', 4))
+    write_buffer = int(config.get('extract_write_buffer_mb', 256) * 1024 * 1024)
+    vdf_file_path_list = get_load_order(vdf_file_path_list)
 
-        # how we can get gothic version from vfs?
-        game_version = GameVersion.GOTHIC2
+    if extract_mode == 'overlay':
+        manifest_file_dict = extract_overlay(vdf_file_path_list, extract_path, write_threads, not direct, previous,
+                                             write_buffer, filters)
+    else:
+        # every archive has own save folder, so archives can be extracted at same time
+        jobs = helpers.get_jobs(config, jobs)
+        print(f'[EXTRACT] Use {min(jobs, len(vdf_file_path_list))} worker processes and {write_threads} write threads')
 
-        game_type_folder = 'Game'
-        if game_version == GameVersion.GOTHIC1:
-            game_type_folder = 'Gothic'
-        elif game_version == GameVersion.GOTHIC2:
-            game_type_folder = 'Gothic II'
-        if 'ADDON' in vfs_file_name.upper():
-            game_type_folder = 'Addon'
-        elif prefix == 'MOD_':
-            game_type_folder = 'Mod'
+        argument_list = []
+        for vfs_file in vdf_file_path_list:
+            # worker get only files of own archive
+            archive_previous = None
+            if previous:
+                archive_previous = dict(previous, files={file_to_save: file_info
+                                                         for file_to_save, file_info in previous['files'].items()
+                                                         if file_info['archive'] == str(vfs_file)})
+            argument_list.append((vfs_file, extract_path / get_game_type_folder(vfs_file), write_threads, not direct,
+                                  archive_previous, write_buffer, filters))
+        result_list = helpers.run_parallel(extract_archive, argument_list, jobs)
+        helpers.print_errors('EXTRACT', result_list)
 
-        save_path = extract_path / game_type_folder / (prefix + vfs_file_name)
+        manifest_file_dict = {}
+        for (vfs_file, _, _, _, archive_previous, _, _), (save_dict, error) in zip(argument_list, result_list):
+            # files of failed archive stay from previous extract
+            if error and archive_previous:
+                manifest_file_dict.update(archive_previous['files'])
+            for file_to_save, (entry, size, file_hash) in (save_dict or {}).items():
+                manifest_file_dict[file_to_save] = get_manifest_file_info(vfs_file, entry, [], size, file_hash)
 
-        save_file(vfs, vfs.root, str(save_path))
+    # entries which are not in archives anymore, and files of deleted archives
+    if previous:
+        removed_count = 0
+        for file_to_save in previous['files']:
+            if file_to_save not in manifest_file_dict:
+                Path(file_to_save).unlink(missing_ok=True)
+                removed_count += 1
+        if removed_count:
+            print(f'[EXTRACT] Removed {removed_count} files which are not in archives anymore')
+
+    save_manifest(extract_path, extract_mode, direct, vdf_file_path_list, manifest_file_dict, filters)
 
 
 if __name__ == '__main__':
-    extract()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-j', '--jobs', type=int, default=None,
+                        help='count of archives extracted at same time, 0 - use all cores, default from config')
+    parser.add_argument('--overlay', action='store_const', const='overlay', dest='extract_mode', default=None,
+                        help='mount all archives together and extract only winning version of every file')
+    parser.add_argument('--direct', action='store_const', const=True, default=None,
+                        help='don\'t write files, only manifest, converters read files from archives')
+    parser.add_argument('--rebuild', action='store_true', help='delete files of previous extract and extract all files again')
+    parser.add_argument('--include', action='append', default=None, metavar='PATTERN',
+                        help='extract only matching files: extension (.ZEN) or glob (*/WORLDS/*), can be repeated')
+    parser.add_argument('--exclude', action='append', default=None, metavar='PATTERN',
+                        help='don\'t extract matching files, can be repeated')
+    parser.add_argument('--archive', action='append', default=None, metavar='PATTERN', dest='archives',
+                        help='extract only matching archives (Anims.vdf, *.mod), can be repeated')
+    parser.add_argument('--exclude-archive', action='append', default=None, metavar='PATTERN', dest='exclude_archives',
+                        help='don\'t extract matching archives, can be repeated')
+    arguments = parser.parse_args()
+
+    config = json.loads(Path('config.json').read_text()) if Path('config.json').exists() else {}
+    extract(jobs=arguments.jobs, extract_mode=arguments.extract_mode, direct=arguments.direct, rebuild=arguments.rebuild,
+            filters=get_filters(config, arguments.include, arguments.exclude, arguments.archives,
+                                arguments.exclude_archives))
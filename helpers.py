@@ -1,3 +1,6 @@
+import os
+
+
 def rf(f):
     return round(f, 2)
 
@@ -85,6 +88,38 @@ def parse_materials(material_list):
     return material_dict_list
 
 
+def collect_textures(data, texture_dict=None):
+    # names of textures used by materials (see parse_materials) and decal vobs, in order of first use
+    # data - json dict of world, mesh or model, materials and vobs can be at any depth
+    # only lists of dicts are checked, geometry lists are skipped
+    if texture_dict is None:
+        texture_dict = {}
+
+    if isinstance(data, list):
+        for value in data:
+            if isinstance(value, dict):
+                collect_textures(value, texture_dict)
+        return list(texture_dict)
+
+    for material_dict in data.get('materials') or []:
+        # same as create_materials, name is used if material don't have texture
+        texture_name = material_dict.get('texture') or material_dict.get('name')
+        if texture_name:
+            texture_dict.setdefault(texture_name.upper(), True)
+
+    visual_dict = data.get('visual')
+    if isinstance(visual_dict, dict) and visual_dict.get('type') == 'DECAL' and visual_dict.get('name'):
+        texture_dict.setdefault(visual_dict['name'].upper(), True)
+
+    for key, value in data.items():
+        if key == 'materials':
+            continue
+        if isinstance(value, dict) or (isinstance(value, list) and value and isinstance(value[0], dict)):
+            collect_textures(value, texture_dict)
+
+    return list(texture_dict)
+
+
 def rename_bone(bone_name):
     name = bone_name
 
@@ -109,18 +144,600 @@ def rename_bone(bone_name):
     return name
 
 
-def run_blender(blender_executable_file_path, blender_script_file_path):
+def run_blender(blender_executable_file_path, blender_script_file_path, script_argument_list=None, background=False,
+                on_line=None):
     import subprocess
 
     # https://blender.stackexchange.com/questions/6817/how-to-pass-command-line-arguments-to-a-blender-python-script
 
     arguments = [blender_executable_file_path]
-    # arguments.extend(['--background'])
+    if background:
+        arguments.extend(['--background'])
     # arguments.extend(['--factory-startup'])
     arguments.extend(['--python', blender_script_file_path])
-    process = subprocess.Popen(arguments,
-                               # stdout=subprocess.PIPE,
-                               # stderr=subprocess.PIPE,
-                               # stdin=subprocess.PIPE,
-                               encoding='utf-8')
+    if script_argument_list:
+        # blender don't parse arguments after "--", script get it from sys.argv
+        arguments.append('--')
+        arguments.extend([str(argument) for argument in script_argument_list])
+    if on_line is None:
+        process = subprocess.Popen(arguments,
+                                   # stdout=subprocess.PIPE,
+                                   # stderr=subprocess.PIPE,
+                                   # stdin=subprocess.PIPE,
+                                   encoding='utf-8')
+        process.wait()
+        return process.returncode
+
+    # on_line(line) return True if line was handled, other lines go to console
+    process = subprocess.Popen(arguments, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, encoding='utf-8',
+                               errors='replace')
+    for line in process.stdout:
+        if not on_line(line):
+            print(line, end='')
     process.wait()
+
+    return process.returncode
+
+
+def run_blender_job(blender_executable_file_path, blender_script_file_path, json_file_path_list, job_name_path,
+                    background=False, on_result=None):
+    import json
+    from pathlib import Path
+
+    # blender script convert only files from job and write result line for every file
+    job_file_path = Path(str(job_name_path) + '.job.json')
+    result_file_path = Path(str(job_name_path) + '.result.jsonl')
+    job_file_path.parent.mkdir(exist_ok=True, parents=True)
+    result_file_path.unlink(missing_ok=True)
+
+    job = {'files': [str(json_file_path) for json_file_path in json_file_path_list], 'result_file': str(result_file_path)}
+    job_file_path.write_text(json.dumps(job, indent=4, ensure_ascii=False), encoding='utf-8')
+
+    # blender print result line after every file, so progress is known before blender exit
+    def on_line(line):
+        if not line.startswith('[JOB RESULT] '):
+            return False
+        on_result(json.loads(line[len('[JOB RESULT] '):]))
+        return True
+
+    run_blender(blender_executable_file_path, blender_script_file_path, [job_file_path], background=background,
+                on_line=on_line if on_result else None)
+
+    result_dict = {}
+    if result_file_path.exists():
+        for line in result_file_path.read_text(encoding='utf-8').splitlines():
+            if line.strip():
+                result = json.loads(line)
+                result_dict[result['file']] = result
+
+    # blender crash or exit before file was converted
+    result_list = []
+    for json_file_path in job['files']:
+        if json_file_path not in result_dict:
+            result_dict[json_file_path] = {'file': json_file_path, 'outputs': [], 'error': 'no result from blender'}
+        result_list.append(result_dict[json_file_path])
+
+    return result_list
+
+
+def split_shards(file_path_list, shard_count):
+    # biggest files first to shard with smallest total size, so all instances finish at about same time
+    shard_list = [[] for _ in range(shard_count)]
+    shard_size_list = [0] * shard_count
+    for file_path in sorted(file_path_list, key=lambda path: os.path.getsize(path), reverse=True):
+        shard_index = shard_size_list.index(min(shard_size_list))
+        shard_list[shard_index].append(file_path)
+        shard_size_list[shard_index] += os.path.getsize(file_path)
+
+    return [shard for shard in shard_list if shard]
+
+
+def start_blender_server(server, connect_timeout=300):
+    import socket
+    import subprocess
+
+    # blender connect back to our port, so no race for free port
+    listen_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+    listen_socket.bind(('127.0.0.1', 0))
+    listen_socket.listen(1)
+    listen_socket.settimeout(connect_timeout)
+    port = listen_socket.getsockname()[1]
+
+    arguments = [server['blender_executable_file_path'], '--background',
+                 '--python', server['blender_script_file_path'], '--', str(port)]
+    server['process'] = subprocess.Popen([str(argument) for argument in arguments], encoding='utf-8')
+    try:
+        connection, _ = listen_socket.accept()
+    except OSError:
+        server['process'].kill()
+        server['process'] = None
+        raise RuntimeError(f'blender server don\'t connect in {connect_timeout} seconds')
+    finally:
+        listen_socket.close()
+
+    connection.settimeout(None)
+    server['connection'] = connection
+    server['stream'] = connection.makefile('rw', encoding='utf-8', newline='\n')
+
+
+def stop_blender_server(server):
+    import json
+    import subprocess
+
+    if server['process'] is None:
+        return
+
+    try:
+        server['stream'].write(json.dumps({'command': 'quit'}) + '\n')
+        server['stream'].flush()
+        server['stream'].close()
+        server['connection'].close()
+    except OSError:
+        pass
+
+    try:
+        server['process'].wait(timeout=30)
+    except subprocess.TimeoutExpired:
+        server['process'].kill()
+
+    server['process'] = None
+    server['connection'] = None
+    server['stream'] = None
+
+
+def send_blender_server_request(server, request):
+    import json
+
+    server['stream'].write(json.dumps(request, ensure_ascii=False) + '\n')
+    server['stream'].flush()
+
+    line = server['stream'].readline()
+    if not line:
+        raise RuntimeError(f'blender server closed connection, exit code: {server["process"].poll()}')
+
+    return json.loads(line)
+
+
+def run_blender_server_job(server_queue, blender_script_file_path, json_file_path_list, config_file_path=None,
+                           on_result=None):
+    from pathlib import Path
+
+    # take free warm blender, start it on first use
+    server = server_queue.get()
+    try:
+        result_list = []
+        for json_file_path in json_file_path_list:
+            request = {'command': 'convert', 'script': Path(blender_script_file_path).stem, 'file': str(json_file_path)}
+            if config_file_path:
+                request['config_file'] = str(config_file_path)
+            try:
+                if server['process'] is None:
+                    start_blender_server(server)
+                result = send_blender_server_request(server, request)
+            except (OSError, RuntimeError, ValueError) as error:
+                # blender crashed on this file, next file get new blender
+                stop_blender_server(server)
+                result = {'file': str(json_file_path), 'outputs': [], 'error': f'blender server failed: {error}'}
+            result_list.append(result)
+            if on_result:
+                on_result(result)
+    finally:
+        server_queue.put(server)
+
+    return result_list
+
+
+def create_blender_pool(blender_instances, blender_executable_file_path=None, blender_server_script_file_path=None):
+    from concurrent.futures import ThreadPoolExecutor
+    import queue
+
+    # blender is separate process, thread only wait for it
+    # with server script every thread use warm blender from queue instead of starting new blender for every job
+    server_queue = None
+    if blender_server_script_file_path:
+        server_queue = queue.Queue()
+        for _ in range(blender_instances):
+            server_queue.put({'blender_executable_file_path': blender_executable_file_path,
+                              'blender_script_file_path': blender_server_script_file_path,
+                              'process': None, 'connection': None, 'stream': None})
+
+    return {'executor': ThreadPoolExecutor(max_workers=blender_instances), 'server_queue': server_queue}
+
+
+def shutdown_blender_pool(blender_pool):
+    blender_pool['executor'].shutdown()
+
+    if blender_pool['server_queue']:
+        while not blender_pool['server_queue'].empty():
+            stop_blender_server(blender_pool['server_queue'].get_nowait())
+
+
+def run_blender_shards(blender_executable_file_path, blender_script_file_path, json_file_path_list, job_name_path,
+                       blender_instances=1, blender_pool=None, on_result=None):
+    from concurrent.futures import ThreadPoolExecutor
+
+    # every blender get own disjoint part of files, results returned in order of json_file_path_list
+    shard_list = split_shards(json_file_path_list, max(1, min(blender_instances, len(json_file_path_list))))
+
+    own_executor = None
+    if blender_pool is None:
+        own_executor = executor = ThreadPoolExecutor(max_workers=max(len(shard_list), 1))
+        server_queue = None
+    else:
+        executor = blender_pool['executor']
+        server_queue = blender_pool['server_queue']
+    try:
+        if server_queue:
+            future_list = [executor.submit(run_blender_server_job, server_queue, blender_script_file_path, shard,
+                                           on_result=on_result)
+                           for shard in shard_list]
+        else:
+            future_list = [executor.submit(run_blender_job, blender_executable_file_path, blender_script_file_path,
+                                           shard, f'{job_name_path}.{shard_index}', True, on_result)
+                           for shard_index, shard in enumerate(shard_list)]
+        result_dict = {}
+        for future in future_list:
+            for result in future.result():
+                result_dict[result['file']] = result
+    finally:
+        if own_executor:
+            own_executor.shutdown()
+
+    return [result_dict[str(json_file_path)] for json_file_path in json_file_path_list]
+
+
+def write_geometry(geometry_file_path, array_dict):
+    import sys
+
+    # array_dict = {name: (width, array)}, array typecode 'f' - float32, 'i' - int32
+    # blender read arrays from this file directly to numpy, without json lists
+    header = {'file': geometry_file_path.name, 'arrays': {}}
+    offset = 0
+    with open(geometry_file_path, 'wb') as geometry_file:
+        for name, (width, values) in array_dict.items():
+            assert values.itemsize == 4
+            header['arrays'][name] = {'type': 'float32' if values.typecode == 'f' else 'int32',
+                                      'offset': offset, 'count': len(values) // width, 'width': width}
+            if sys.byteorder != 'little':
+                values = type(values)(values.typecode, values)
+                values.byteswap()
+            geometry_file.write(values.tobytes())
+            offset += len(values) * values.itemsize
+
+    return header
+
+
+def read_geometry(geometry_file_path, header):
+    from array import array
+    from pathlib import Path
+    import sys
+
+    # read arrays written by write_geometry, {name: (width, array)}
+    geometry_data = Path(geometry_file_path).read_bytes()
+    array_dict = {}
+    for name, array_info in header['arrays'].items():
+        values = array('f' if array_info['type'] == 'float32' else 'i')
+        size = array_info['count'] * array_info['width'] * values.itemsize
+        values.frombytes(geometry_data[array_info['offset']:array_info['offset'] + size])
+        if sys.byteorder != 'little':
+            values.byteswap()
+        array_dict[name] = (array_info['width'], values)
+
+    return array_dict
+
+
+def get_texture_folder_list(convert_path):
+    from pathlib import Path
+
+    # texture from later folder override same texture from earlier, used by blender materials and texture atlas
+    convert_path = Path(convert_path)
+    texture_folder_list = []
+    if (convert_path / 'VDF_Textures').exists():
+        texture_folder_list.append(str(convert_path / 'VDF_Textures'))
+    if (convert_path / 'VDF_Textures_Addon').exists():
+        texture_folder_list.append(str(convert_path / 'VDF_Textures_Addon'))
+
+    for path in convert_path.glob('*'):
+        if not path.is_dir():
+            continue
+        if str(path) in texture_folder_list:
+            continue
+
+        texture_folder_list.append(str(path))
+
+    return texture_folder_list
+
+
+def get_texture_index_dict(texture_index, texture_folder_list, suffix_list=None):
+    from pathlib import Path
+
+    # {NAME: texture} from texture index of convert_textures.py, same texture as scan of texture folders would find
+    # duplicate textures are converted once, alias has info of converted file
+    # alias with hardlink use own path, other aliases use path of converted file
+    texture_path_dict = {texture['path']: texture for texture in texture_index['textures']}
+    texture_list = list(texture_index['textures'])
+    for alias in texture_index.get('aliases', []):
+        texture = dict(texture_path_dict.get(alias['target'], {}), name=alias['name'], location=alias['path'])
+        texture['path'] = alias['path'] if alias.get('link') else alias['target']
+        texture_list.append(texture)
+    if suffix_list is not None:
+        texture_list = [texture for texture in texture_list
+                        if Path(texture.get('location', texture['path'])).suffix.lower() in suffix_list]
+
+    # same order as scan of folders, without scan
+    texture_dict = {}
+    for texture_folder in texture_folder_list:
+        for texture in texture_list:
+            if Path(texture_folder) in Path(texture.get('location', texture['path'])).parents:
+                texture_dict[texture['name']] = texture
+    # alias in folder without own converted textures
+    for texture in texture_list:
+        texture_dict.setdefault(texture['name'], texture)
+
+    return texture_dict
+
+
+# {index file: (mtime, hierarchy index)}, every worker process read index once
+hierarchy_index_cache = {}
+
+
+def save_hierarchy_index(index_file_path, intermediate_path, mdh_file_path_list, mdl_file_path_list=()):
+    import json
+    from pathlib import Path
+
+    # MDM and MAN look for hierarchy of every file, all hierarchies are read once per stage instead of scan for every file
+    # mdh = {'path', 'folder', 'stem', 'checksum', 'name'}, mdl = {'path', 'folder', 'stem'}, folder - game type folder
+    hierarchy_index = {'mdh': [], 'mdl': []}
+    for mdh_file_path in sorted(str(path) for path in mdh_file_path_list):
+        mdh_dict = json.loads(Path(mdh_file_path).read_text(encoding='utf-8'))
+        hierarchy_index['mdh'].append({'path': mdh_file_path,
+                                       'folder': Path(mdh_file_path).relative_to(intermediate_path).parts[0],
+                                       'stem': Path(mdh_file_path).name.split('.')[0].upper(),
+                                       'checksum': mdh_dict.get('checksum'), 'name': mdh_dict.get('name', '')})
+    for mdl_file_path in sorted(str(path) for path in mdl_file_path_list):
+        hierarchy_index['mdl'].append({'path': mdl_file_path,
+                                       'folder': Path(mdl_file_path).relative_to(intermediate_path).parts[0],
+                                       'stem': Path(mdl_file_path).name.split('.')[0].upper()})
+
+    Path(index_file_path).parent.mkdir(exist_ok=True, parents=True)
+    Path(index_file_path).write_text(json.dumps(hierarchy_index, ensure_ascii=False), encoding='utf-8')
+
+    return hierarchy_index
+
+
+def load_hierarchy_index(index_file_path):
+    import json
+    from pathlib import Path
+
+    mtime = Path(index_file_path).stat().st_mtime_ns
+    if hierarchy_index_cache.get(str(index_file_path), (None, None))[0] != mtime:
+        hierarchy_index_cache[str(index_file_path)] = (mtime, json.loads(Path(index_file_path).read_text(encoding='utf-8')))
+
+    return hierarchy_index_cache[str(index_file_path)][1]
+
+
+def get_hierarchy_folder_list(game_type_folder):
+    # order is important, hierarchy from own game type folder or from base game
+    folder_path_list = ['Mod', 'Addon', 'Gothic II', 'Gothic']
+    for folder_path in folder_path_list[:]:
+        if folder_path.upper() != game_type_folder.upper():
+            folder_path_list.remove(folder_path)
+        else:
+            break
+
+    return folder_path_list
+
+
+def get_worker_count(count):
+    count = int(count)
+
+    # 0 or less - use all cores
+    if count <= 0:
+        count = os.cpu_count() or 1
+
+    return count
+
+
+def get_blender_instances(config, blender_instances=None):
+    if blender_instances is None:
+        blender_instances = config.get('blender_instances', 1)
+
+    return get_worker_count(blender_instances)
+
+
+def get_jobs(config, jobs=None):
+    if jobs is None:
+        jobs = config.get('jobs', 0)
+
+    return get_worker_count(jobs)
+
+
+def print_file(message):
+    # line for every converted file, convert_all turn it off and show progress of stages instead
+    if os.environ.get('ZENGIN_FILE_LOG', '1') != '0':
+        print(message)
+
+
+def call_safe(function, arguments):
+    # RuntimeError - expected error with own message, other errors get file (first argument) to message
+    try:
+        return function(*arguments), None
+    except RuntimeError as error:
+        return None, str(error)
+    except Exception as error:
+        return None, f'{arguments[0]}: {type(error).__name__}: {error}'
+
+
+def create_process_pool(jobs):
+    import sys
+    from concurrent.futures import ProcessPoolExecutor
+
+    # windows can't wait more than 61 processes
+    if sys.platform == 'win32':
+        jobs = min(jobs, 61)
+
+    return ProcessPoolExecutor(max_workers=jobs)
+
+
+def run_parallel(function, argument_list, jobs=1, executor=None, on_result=None):
+    # function must be module level, worker processes import it by name
+    # on_result(index, result) called as soon as file is ready, in order of finishing
+    if executor is None and (jobs <= 1 or len(argument_list) <= 1):
+        result_list = []
+        for index, arguments in enumerate(argument_list):
+            result_list.append(call_safe(function, arguments))
+            if on_result:
+                on_result(index, result_list[-1])
+        return result_list
+
+    if executor is None:
+        with create_process_pool(min(jobs, len(argument_list))) as executor:
+            return run_parallel(function, argument_list, jobs, executor, on_result)
+
+    if on_result is None:
+        future_list = [executor.submit(call_safe, function, arguments) for arguments in argument_list]
+        # keep results in argument order, so output same as serial run
+        return [future.result() for future in future_list]
+
+    from concurrent.futures import wait, FIRST_COMPLETED
+
+    # submit only few files ahead, so slow on_result (full feed) also slow down workers
+    max_pending_count = max(jobs, 1) * 2
+    result_list = [None] * len(argument_list)
+    pending_dict = {}
+    next_index = 0
+    while next_index < len(argument_list) or pending_dict:
+        while next_index < len(argument_list) and len(pending_dict) < max_pending_count:
+            pending_dict[executor.submit(call_safe, function, argument_list[next_index])] = next_index
+            next_index += 1
+
+        done_future_set, _ = wait(pending_dict, return_when=FIRST_COMPLETED)
+        for future in done_future_set:
+            index = pending_dict.pop(future)
+            result_list[index] = future.result()
+            on_result(index, result_list[index])
+
+    return result_list
+
+
+def create_feed(max_size):
+    import queue
+    import threading
+
+    # bounded queue of files between producer stage and consumer stage, full queue stop producer
+    # closed - producer will not put anymore, cancelled - consumer will not read anymore
+    return {'queue': queue.Queue(max_size), 'cancelled': threading.Event(), 'closed': threading.Event()}
+
+
+def put_feed(feed, item):
+    import queue
+
+    while not feed['cancelled'].is_set():
+        try:
+            feed['queue'].put(item, timeout=1)
+            return
+        except queue.Full:
+            pass
+
+
+def close_feed(feed):
+    # can be called few times, by producer and by stage graph after producer stage ended, failed or skipped
+    feed['closed'].set()
+
+
+def cancel_feed(feed):
+    # consumer will not read anymore, producer must not wait
+    feed['cancelled'].set()
+
+
+def read_feed(feed):
+    import queue
+
+    while not feed['cancelled'].is_set():
+        # closed before wait - all items are already in queue, empty queue is end of feed
+        closed = feed['closed'].is_set()
+        try:
+            item = feed['queue'].get(timeout=1)
+        except queue.Empty:
+            if closed:
+                return
+            continue
+        yield item
+
+
+def run_stage_graph(stage_list):
+    # stage = {'name': 'MDM', 'dependencies': ['MDH', 'MDL'], 'function': callable, 'cancel': optional callable,
+    #          'finish': optional callable}
+    # every stage start as soon as all dependencies finished, cancel called if stage skipped or failed
+    # finish called when stage ended for any reason, also skipped
+    from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+    stage_dict = {stage['name']: stage for stage in stage_list}
+    for stage in stage_list:
+        for dependency in stage['dependencies']:
+            assert dependency in stage_dict, f'stage {stage["name"]} depend on unknown stage {dependency}'
+
+    done_set = set()
+    failed_set = set()
+    running_dict = {}
+    waiting_list = list(stage_list)
+
+    with ThreadPoolExecutor(max_workers=max(len(stage_list), 1)) as executor:
+        while waiting_list or running_dict:
+            skipped = True
+            while skipped:
+                skipped = False
+                for stage in waiting_list[:]:
+                    if any(dependency in failed_set for dependency in stage['dependencies']):
+                        print(f'[{stage["name"]}] ERROR: skipped, dependency failed')
+                        if stage.get('cancel'):
+                            stage['cancel']()
+                        if stage.get('finish'):
+                            stage['finish']()
+                        failed_set.add(stage['name'])
+                        waiting_list.remove(stage)
+                        skipped = True
+                    elif all(dependency in done_set for dependency in stage['dependencies']):
+                        running_dict[executor.submit(stage['function'])] = stage['name']
+                        waiting_list.remove(stage)
+
+            if not running_dict:
+                # nothing can start - dependency cycle
+                assert not waiting_list, f'stage dependency cycle: {[stage["name"] for stage in waiting_list]}'
+                break
+
+            done_future_set, _ = wait(running_dict, return_when=FIRST_COMPLETED)
+            for future in done_future_set:
+                stage_name = running_dict.pop(future)
+                try:
+                    future.result()
+                    done_set.add(stage_name)
+                except Exception as error:
+                    print(f'[{stage_name}] ERROR: stage failed: {type(error).__name__}: {error}')
+                    if stage_dict[stage_name].get('cancel'):
+                        stage_dict[stage_name]['cancel']()
+                    failed_set.add(stage_name)
+                if stage_dict[stage_name].get('finish'):
+                    stage_dict[stage_name]['finish']()
+
+    return failed_set
+
+
+def print_errors(tag, result_list):
+    error_list = [error for _, error in result_list if error]
+    for error in error_list:
+        print(f'[{tag}] ERROR: {error}')
+    if error_list:
+        print(f'[{tag}] {len(error_list)} of {len(result_list)} files failed')
+
+    return error_list
+
+
+def print_blender_errors(tag, blender_result_list):
+    error_list = [f'{result["file"]}: {result["error"]}' for result in blender_result_list if result['error']]
+    for error in error_list:
+        print(f'[{tag}] ERROR: {error}')
+    if error_list:
+        print(f'[{tag}] {len(error_list)} of {len(blender_result_list)} files failed in blender')
+
+    return error_list
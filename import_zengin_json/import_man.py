@@ -60,13 +60,45 @@ def import_man_from_hierarchy_and_animation(hierarchy_dict, animation_dict, rena
         utils_module.add_root_bone(armature_obj)
 
 
-def load_from_gothic_hub_scripts(config_file_path):
-    global utils_module
+def convert_json_file(man_json_file_path, intermediate_path, convert_path, config):
+    file_name = man_json_file_path.stem.upper().replace('.MAN', '').replace('.JSON', '')
+    relative_path = man_json_file_path.relative_to(intermediate_path).parent
 
-    bpy.context.preferences.view.show_splash = False
+    # if 'HUMANS' not in str(man_json_file_path):  # HUMANS\\S_RUN
+    #     return []
 
-    config_data = config_file_path.read_text()
-    config = json.loads(config_data)
+    # if 'S_RUNL' not in str(man_json_file_path):  # HUMANS\\S_RUN
+    #     return []
+
+    # if 'VDF_Anims' not in str(man_json_file_path):
+    #     return []
+    #
+    # if 'GOTHIC II' not in str(man_json_file_path):
+    #     return []
+
+    man_json_data = Path(man_json_file_path).read_text()
+    man_json_dict = json.loads(man_json_data)
+
+    assert 'hierarchy' in man_json_dict
+    assert 'animation' in man_json_dict
+
+    import_man_from_hierarchy_and_animation(man_json_dict['hierarchy'], man_json_dict['animation'],
+                                            rename_bones=config['rename_bones'],
+                                            add_root_bone=config['add_root_bone'])
+
+    # Save
+    save_folder_path = convert_path / relative_path
+    save_folder_path.mkdir(exist_ok=True, parents=True)
+
+    output_path_list = utils_module.export(save_folder_path / file_name, config)
+
+    utils_module.print_file(f'converted: {relative_path / file_name}.MAN')
+
+    return output_path_list
+
+
+def get_convert_function(config):
+    global utils_module
 
     if utils_module is None:
         utils_module = import_module('utils')
@@ -75,46 +107,30 @@ def load_from_gothic_hub_scripts(config_file_path):
 
     extract_path, intermediate_path, convert_path = utils_module.get_eic_paths(config)
 
-    man_json_file_path_list = list(Path(intermediate_path).rglob(f'*.MAN.json'))
-    for man_json_file_path in man_json_file_path_list:
-        file_name = man_json_file_path.stem.upper().replace('.MAN', '').replace('.JSON', '')
-        relative_path = man_json_file_path.relative_to(intermediate_path).parent
-
-        # if 'HUMANS' not in str(man_json_file_path):  # HUMANS\\S_RUN
-        #     continue
-
-        # if 'S_RUNL' not in str(man_json_file_path):  # HUMANS\\S_RUN
-        #     continue
-
-        # if 'VDF_Anims' not in str(man_json_file_path):
-        #     continue
-        #
-        # if 'GOTHIC II' not in str(man_json_file_path):
-        #     continue
+    return lambda man_json_file_path: convert_json_file(man_json_file_path, intermediate_path, convert_path, config)
 
-        man_json_data = Path(man_json_file_path).read_text()
-        man_json_dict = json.loads(man_json_data)
 
-        assert 'hierarchy' in man_json_dict
-        assert 'animation' in man_json_dict
+def load_from_gothic_hub_scripts(config_file_path):
+    bpy.context.preferences.view.show_splash = False
 
-        import_man_from_hierarchy_and_animation(man_json_dict['hierarchy'], man_json_dict['animation'],
-                                                rename_bones=config['rename_bones'],
-                                                add_root_bone=config['add_root_bone'])
+    config_data = config_file_path.read_text()
+    config = json.loads(config_data)
 
-        # Save
-        save_folder_path = convert_path / relative_path
-        save_folder_path.mkdir(exist_ok=True, parents=True)
+    convert_function = get_convert_function(config)
 
-        utils_module.export(save_folder_path / file_name, config)
+    extract_path, intermediate_path, convert_path = utils_module.get_eic_paths(config)
 
-        print(f'converted: {relative_path / file_name}.MAN')
+    man_json_file_path_list, result_file_path = utils_module.get_job(intermediate_path, '*.MAN.json')
+    utils_module.run_job(man_json_file_path_list, result_file_path, convert_function, 'MODEL ANIMATION')
 
     # close blender
     exit()
 
 
 def init():
+    if __name__ != '__main__':
+        return
+
     config_file_path = Path('config.json')
     if config_file_path.exists():
         load_from_gothic_hub_scripts(config_file_path)
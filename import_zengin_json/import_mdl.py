@@ -4,7 +4,7 @@ import importlib.util
 import math
 
 import bpy
-from mathutils import Matrix, Quaternion, Vector
+from mathutils import Matrix, Vector
 
 
 import_mrm_module = None
@@ -147,13 +147,38 @@ def import_model_from_json(mdl_json_data, texture_folder_list, rename_bones=Fals
     import_model(mdl_json_data, texture_folder_list, rename_bones=False, add_root_bone=False)
 
 
-def load_from_gothic_hub_scripts(config_file_path):
-    global utils_module
+def convert_json_file(mdl_json_file_path, intermediate_path, convert_path, texture_folder_list, config):
+    file_name = mdl_json_file_path.stem.upper().replace('.JSON', '')
+    relative_path = mdl_json_file_path.relative_to(intermediate_path).parent
+    relative_path = Path(str(relative_path).replace('_Anims', '_Meshes'))
 
-    bpy.context.preferences.view.show_splash = False
+    # if 'BARBQ_SCAV' not in str(mdl_json_file_path):
+    #     return []
+    #
+    # # if 'VDF_Anims' not in str(mdl_json_file_path):
+    # #     return []
+    #
+    # if 'Gothic II' not in str(mdl_json_file_path):
+    #     return []
 
-    config_data = config_file_path.read_text()
-    config = json.loads(config_data)
+    mdl_json_data = mdl_json_file_path.read_text()
+    mdl_json_dict = json.loads(mdl_json_data)
+
+    import_model_from_json(mdl_json_dict, texture_folder_list, rename_bones=config['rename_bones'], add_root_bone=config['add_root_bone'])
+
+    # Save
+    save_folder_path = convert_path / relative_path
+    save_folder_path.mkdir(exist_ok=True, parents=True)
+
+    output_path_list = utils_module.export(save_folder_path / file_name, config)
+
+    utils_module.print_file(f'converted: {relative_path / file_name}')
+
+    return output_path_list
+
+
+def get_convert_function(config):
+    global utils_module
 
     if utils_module is None:
         utils_module = import_module('utils')
@@ -164,39 +189,31 @@ def load_from_gothic_hub_scripts(config_file_path):
 
     texture_folder_list = utils_module.get_texture_folder_list(convert_path)
 
-    mdl_json_file_path_list = list(Path(intermediate_path).rglob(f'*.MDL.json'))
-    for mdl_json_file_path in mdl_json_file_path_list:
-        file_name = mdl_json_file_path.stem.upper().replace('.JSON', '')
-        relative_path = mdl_json_file_path.relative_to(intermediate_path).parent
-        relative_path = Path(str(relative_path).replace('_Anims', '_Meshes'))
+    return lambda mdl_json_file_path: convert_json_file(mdl_json_file_path, intermediate_path, convert_path,
+                                                        texture_folder_list, config)
 
-        # if 'BARBQ_SCAV' not in str(mdl_json_file_path):
-        #     continue
-        #
-        # # if 'VDF_Anims' not in str(mdl_json_file_path):
-        # #     continue
-        #
-        # if 'Gothic II' not in str(mdl_json_file_path):
-        #     continue
 
-        mdl_json_data = mdl_json_file_path.read_text()
-        mdl_json_dict = json.loads(mdl_json_data)
+def load_from_gothic_hub_scripts(config_file_path):
+    bpy.context.preferences.view.show_splash = False
 
-        import_model_from_json(mdl_json_dict, texture_folder_list, rename_bones=config['rename_bones'], add_root_bone=config['add_root_bone'])
+    config_data = config_file_path.read_text()
+    config = json.loads(config_data)
 
-        # Save
-        save_folder_path = convert_path / relative_path
-        save_folder_path.mkdir(exist_ok=True, parents=True)
+    convert_function = get_convert_function(config)
 
-        utils_module.export(save_folder_path / file_name, config)
+    extract_path, intermediate_path, convert_path = utils_module.get_eic_paths(config)
 
-        print(f'converted: {relative_path / file_name}')
+    mdl_json_file_path_list, result_file_path = utils_module.get_job(intermediate_path, '*.MDL.json')
+    utils_module.run_job(mdl_json_file_path_list, result_file_path, convert_function, 'MODEL')
 
     # close blender
     exit()
 
 
 def init():
+    if __name__ != '__main__':
+        return
+
     config_file_path = Path('config.json')
     if config_file_path.exists():
         load_from_gothic_hub_scripts(config_file_path)
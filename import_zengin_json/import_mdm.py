@@ -4,7 +4,7 @@ import importlib.util
 import math
 
 import bpy
-from mathutils import Matrix, Quaternion, Vector
+from mathutils import Matrix, Vector
 
 
 load_armature_module = None
@@ -150,13 +150,51 @@ def import_model_mesh_from_json(mdm_json_data, texture_folder_list, rename_bones
                     mesh_obj.location.y -= bone.length
 
 
-def load_from_gothic_hub_scripts(config_file_path):
-    global utils_module
+def convert_json_file(mdm_json_file_path, intermediate_path, convert_path, texture_folder_list, config):
+    # only mdl file include double format coz same name with mdm
+    file_name = mdm_json_file_path.stem.upper().replace('.MDM', '').replace('.JSON', '')
+    relative_path = mdm_json_file_path.relative_to(intermediate_path).parent
+    relative_path = Path(str(relative_path).replace('_Anims', '_Meshes'))
 
-    bpy.context.preferences.view.show_splash = False
+    # if 'ARMOR_BDT_M' not in str(mdm_json_file_path):
+    #     return []
 
-    config_data = config_file_path.read_text()
-    config = json.loads(config_data)
+    # if 'VDF_Anims' not in str(mdm_json_file_path):
+    #     return []
+    #
+    # if 'Gothic II' not in str(mdm_json_file_path):
+    #     return []
+
+    # if 'Gothic II' not in str(mdm_json_file_path):  # Addon, Gothic II,
+    #     return []
+
+    # if 'HUM_BODY_NAKED0' not in str(mdm_json_file_path):  # CHESTBIG_ADD_STONE_LOCKED
+    #     return []
+
+    # print(f'{relative_path=}')
+    # print(f'{mdm_json_file_path=}')
+
+    mdm_json_data = mdm_json_file_path.read_text()
+    mdm_json_dict = json.loads(mdm_json_data)
+
+    import_model_mesh_from_json(mdm_json_dict, texture_folder_list,
+                                rename_bones=config['rename_bones'],
+                                add_root_bone=config['add_root_bone'],
+                                use_gothic_normals=config['use_gothic_normals'])
+
+    # Save
+    save_folder_path = convert_path / relative_path
+    save_folder_path.mkdir(exist_ok=True, parents=True)
+
+    output_path_list = utils_module.export(save_folder_path / file_name, config)
+
+    utils_module.print_file(f'converted: {relative_path / file_name}')
+
+    return output_path_list
+
+
+def get_convert_function(config):
+    global utils_module
 
     if utils_module is None:
         utils_module = import_module('utils')
@@ -167,57 +205,31 @@ def load_from_gothic_hub_scripts(config_file_path):
 
     texture_folder_list = utils_module.get_texture_folder_list(convert_path)
 
-    mdm_json_file_path_list = list(Path(intermediate_path).rglob(f'*.MDM.json'))
-    for mdm_json_file_path in mdm_json_file_path_list:
-        # only mdl file include double format coz same name with mdm
-        file_name = mdm_json_file_path.stem.upper().replace('.MDM', '').replace('.JSON', '')
-        relative_path = mdm_json_file_path.relative_to(intermediate_path).parent
-        relative_path = Path(str(relative_path).replace('_Anims', '_Meshes'))
-
-        # if 'ARMOR_BDT_M' not in str(mdm_json_file_path):
-        #     continue
-
-        # if 'VDF_Anims' not in str(mdm_json_file_path):
-        #     continue
-        #
-        # if 'Gothic II' not in str(mdm_json_file_path):
-        #     continue
-
-        # if 'Gothic II' not in str(mdm_json_file_path):  # Addon, Gothic II,
-        #     continue
-
-        # if 'HUM_BODY_NAKED0' not in str(mdm_json_file_path):  # CHESTBIG_ADD_STONE_LOCKED
-        #     continue
+    return lambda mdm_json_file_path: convert_json_file(mdm_json_file_path, intermediate_path, convert_path,
+                                                        texture_folder_list, config)
 
-        # print(f'{relative_path=}')
-        # print(f'{mdm_json_file_path=}')
 
-        mdm_json_data = mdm_json_file_path.read_text()
-        mdm_json_dict = json.loads(mdm_json_data)
-        # try:
-        #     mdm_json_dict = json.loads(mdm_json_data)
-        # except:
-        #     print(mdm_json_file_path)
-        #     return
+def load_from_gothic_hub_scripts(config_file_path):
+    bpy.context.preferences.view.show_splash = False
 
-        import_model_mesh_from_json(mdm_json_dict, texture_folder_list,
-                                    rename_bones=config['rename_bones'],
-                                    add_root_bone=config['add_root_bone'],
-                                    use_gothic_normals=config['use_gothic_normals'])
+    config_data = config_file_path.read_text()
+    config = json.loads(config_data)
 
-        # Save
-        save_folder_path = convert_path / relative_path
-        save_folder_path.mkdir(exist_ok=True, parents=True)
+    convert_function = get_convert_function(config)
 
-        utils_module.export(save_folder_path / file_name, config)
+    extract_path, intermediate_path, convert_path = utils_module.get_eic_paths(config)
 
-        print(f'converted: {relative_path / file_name}')
+    mdm_json_file_path_list, result_file_path = utils_module.get_job(intermediate_path, '*.MDM.json')
+    utils_module.run_job(mdm_json_file_path_list, result_file_path, convert_function, 'MODEL MESH')
 
     # close blender
     exit()
 
 
 def init():
+    if __name__ != '__main__':
+        return
+
     config_file_path = Path('config.json')
     if config_file_path.exists():
         load_from_gothic_hub_scripts(config_file_path)
@@ -4,7 +4,7 @@ import importlib.util
 import math
 
 import bpy
-from mathutils import Matrix, Quaternion, Vector
+from mathutils import Matrix, Vector
 
 
 import_mrm_module = None
@@ -125,13 +125,53 @@ def import_morph_mesh_from_json(mmb_json_data, texture_folder_list, use_gothic_n
     mesh_obj, mesh = import_morph_mesh(mmb_json_data, texture_folder_list, use_gothic_normals=use_gothic_normals)
 
 
-def load_from_gothic_hub_scripts(config_file_path):
-    global utils_module
+def convert_json_file(mmb_json_file_path, intermediate_path, convert_path, texture_folder_list, config):
+    file_name = mmb_json_file_path.stem.upper().replace('.MMB', '').replace('.JSON', '')
+    relative_path = mmb_json_file_path.relative_to(intermediate_path).parent
+    relative_path = Path(str(relative_path).replace('_Anims', '_Meshes'))
 
-    bpy.context.preferences.view.show_splash = False
+    # if 'HUM_HEAD_BABE' != file_name:
+    #     return []
+    #
+    # if 'HUM_HEAD_BABE' not in str(mmb_json_file_path):
+    #     return []
+    #
+    # if 'VDF_Anims' not in str(mmb_json_file_path):
+    #     return []
+    #
+    # if 'Gothic II' not in str(mmb_json_file_path):
+    #     return []
+
+    mmb_json_data = mmb_json_file_path.read_text()
+    mmb_json_dict = json.loads(mmb_json_data)
+
+    import_morph_mesh_from_json(mmb_json_dict, texture_folder_list, use_gothic_normals=config['use_gothic_normals'])
+
+    morph_mesh_script = dict()
+    morph_mesh_script['type'] = 'morph_mesh_script'
+    morph_mesh_script['animations'] = mmb_json_dict['animations'][:]
+    for animation_index in range(len(morph_mesh_script['animations'])):
+        morph_mesh_script['animations'][animation_index].pop('vertices', None)
+        morph_mesh_script['animations'][animation_index].pop('samples', None)
+
+    # Save
+    save_folder_path = convert_path / relative_path / file_name
+    save_folder_path.mkdir(exist_ok=True, parents=True)
+
+    json_data = json.dumps(morph_mesh_script, indent=4, ensure_ascii=False)
+    save_path_mms = save_folder_path / (file_name + '.MMS.json')
+    save_path_mms.write_text(json_data, encoding='utf-8')
+
+    save_path_file = save_folder_path / file_name
+    output_path_list = utils_module.export(save_path_file, config)
+
+    utils_module.print_file(f'converted: {relative_path / file_name}.MMB')
+
+    return [str(save_path_mms)] + output_path_list
 
-    config_data = config_file_path.read_text()
-    config = json.loads(config_data)
+
+def get_convert_function(config):
+    global utils_module
 
     if utils_module is None:
         utils_module = import_module('utils')
@@ -142,48 +182,22 @@ def load_from_gothic_hub_scripts(config_file_path):
 
     texture_folder_list = utils_module.get_texture_folder_list(convert_path)
 
-    mmb_json_file_path_list = list(Path(intermediate_path).rglob(f'*.MMB.json'))
-    for mmb_json_file_path in mmb_json_file_path_list:
-        file_name = mmb_json_file_path.stem.upper().replace('.MMB', '').replace('.JSON', '')
-        relative_path = mmb_json_file_path.relative_to(intermediate_path).parent
-        relative_path = Path(str(relative_path).replace('_Anims', '_Meshes'))
-
-        # if 'HUM_HEAD_BABE' != file_name:
-        #     continue
-        #
-        # if 'HUM_HEAD_BABE' not in str(mmb_json_file_path):
-        #     continue
-        #
-        # if 'VDF_Anims' not in str(mmb_json_file_path):
-        #     continue
-        #
-        # if 'Gothic II' not in str(mmb_json_file_path):
-        #     continue
-
-        mmb_json_data = mmb_json_file_path.read_text()
-        mmb_json_dict = json.loads(mmb_json_data)
-
-        import_morph_mesh_from_json(mmb_json_dict, texture_folder_list, use_gothic_normals=config['use_gothic_normals'])
-
-        morph_mesh_script = dict()
-        morph_mesh_script['type'] = 'morph_mesh_script'
-        morph_mesh_script['animations'] = mmb_json_dict['animations'][:]
-        for animation_index in range(len(morph_mesh_script['animations'])):
-            morph_mesh_script['animations'][animation_index].pop('vertices', None)
-            morph_mesh_script['animations'][animation_index].pop('samples', None)
-
-        # Save
-        save_folder_path = convert_path / relative_path / file_name
-        save_folder_path.mkdir(exist_ok=True, parents=True)
-
-        json_data = json.dumps(morph_mesh_script, indent=4, ensure_ascii=False)
-        save_path_mms = save_folder_path / (file_name + '.MMS.json')
-        save_path_mms.write_text(json_data, encoding='utf-8')
-
-        save_path_file = save_folder_path / file_name
-        utils_module.export(save_path_file, config)
-
-        print(f'converted: {relative_path / file_name}.MMB')
+    return lambda mmb_json_file_path: convert_json_file(mmb_json_file_path, intermediate_path, convert_path,
+                                                        texture_folder_list, config)
+
+
+def load_from_gothic_hub_scripts(config_file_path):
+    bpy.context.preferences.view.show_splash = False
+
+    config_data = config_file_path.read_text()
+    config = json.loads(config_data)
+
+    convert_function = get_convert_function(config)
+
+    extract_path, intermediate_path, convert_path = utils_module.get_eic_paths(config)
+
+    mmb_json_file_path_list, result_file_path = utils_module.get_job(intermediate_path, '*.MMB.json')
+    utils_module.run_job(mmb_json_file_path_list, result_file_path, convert_function, 'MORPH MESH')
 
     # close blender
     exit()
@@ -4,7 +4,8 @@ import importlib.util
 import math
 
 import bpy
-from mathutils import Matrix, Quaternion, Vector
+from mathutils import Matrix, Vector
+import numpy as np
 
 
 load_mesh_module = None
@@ -34,9 +35,61 @@ def import_module(module_name):
     return None
 
 
+def import_multiresolution_mesh_arrays(multiresolution_mesh_dict, texture_folder_list, use_gothic_normals=False, mesh_name='Mesh'):
+    global load_mesh_module, load_materials_module, utils_module
+
+    geometry_arrays = multiresolution_mesh_dict['geometry_arrays']
+
+    # sometimes have empty files
+    if len(geometry_arrays['positions']) < 3 or len(geometry_arrays['triangles']) <= 0:
+        return None, None
+
+    if load_mesh_module is None:
+        load_mesh_module = import_module('load_mesh')
+
+    if load_materials_module is None:
+        load_materials_module = import_module('load_materials')
+
+    if utils_module is None:
+        utils_module = import_module('utils')
+
+    assert load_mesh_module is not None
+    assert load_materials_module is not None
+    assert utils_module is not None
+
+    # every loop of triangle is wedge
+    loop_wedge_array = geometry_arrays['triangles'].ravel()
+    loop_vertex_index_array = geometry_arrays['wedge_positions_index'][loop_wedge_array]
+    loop_normal_array = -geometry_arrays['wedge_normals'][loop_wedge_array]
+    loop_uv_array = geometry_arrays['wedge_texture'][loop_wedge_array] * np.array([1.0, -1.0], dtype=np.float32)
+    loop_total_array = np.full(len(geometry_arrays['triangles']), 3, dtype=np.int32)
+
+    materials_by_index = None
+    if 'materials' in multiresolution_mesh_dict:
+        materials_dict = multiresolution_mesh_dict['materials']
+        texture_path_dict = utils_module.get_texture_path_dict(texture_folder_list)
+        materials_by_index = load_materials_module.create_materials(
+            materials_dict, texture_path_dict,
+            texture_info_dict=utils_module.get_texture_info_dict(texture_folder_list),
+            texture_animation_dict=utils_module.get_texture_animation_dict(texture_folder_list))
+
+    if not use_gothic_normals:
+        loop_normal_array = None
+
+    mesh_obj, mesh = load_mesh_module.create_mesh_from_arrays(mesh_name, geometry_arrays['positions'], loop_vertex_index_array,
+        loop_total_array, loop_normal_array=loop_normal_array, loop_uv_array=loop_uv_array,
+        blender_materials=materials_by_index, material_index_array=geometry_arrays['triangle_submesh'])
+
+    return mesh_obj, mesh
+
+
 def import_multiresolution_mesh(multiresolution_mesh_dict, texture_folder_list, use_gothic_normals=False, mesh_name='Mesh'):
     global load_mesh_module, load_materials_module, utils_module
 
+    if 'geometry_arrays' in multiresolution_mesh_dict:
+        return import_multiresolution_mesh_arrays(multiresolution_mesh_dict, texture_folder_list,
+                                                  use_gothic_normals=use_gothic_normals, mesh_name=mesh_name)
+
     assert 'positions' in multiresolution_mesh_dict
     assert 'submeshes' in multiresolution_mesh_dict
 
@@ -88,7 +141,10 @@ def import_multiresolution_mesh(multiresolution_mesh_dict, texture_folder_list,
     if 'materials' in multiresolution_mesh_dict:
         materials_dict = multiresolution_mesh_dict['materials']
         texture_path_dict = utils_module.get_texture_path_dict(texture_folder_list)
-        materials_by_index = load_materials_module.create_materials(materials_dict, texture_path_dict)
+        materials_by_index = load_materials_module.create_materials(
+            materials_dict, texture_path_dict,
+            texture_info_dict=utils_module.get_texture_info_dict(texture_folder_list),
+            texture_animation_dict=utils_module.get_texture_animation_dict(texture_folder_list))
 
     if not use_gothic_normals:
         normal_list = []
@@ -121,13 +177,46 @@ def import_multiresolution_mesh_from_json(mrm_json_data, texture_folder_list):
     mesh.transform(matrix_mirror_y)
 
 
-def load_from_gothic_hub_scripts(config_file_path):
-    global utils_module
+def convert_json_file(mrm_json_file_path, intermediate_path, convert_path, texture_folder_list, config):
+    file_name = mrm_json_file_path.stem.upper().replace('.MRM', '').replace('.JSON', '')
+    relative_path = mrm_json_file_path.relative_to(intermediate_path).parent
 
-    bpy.context.preferences.view.show_splash = False
+    # if 'NW_HARBOUR_BARREL_01' not in str(mrm_json_file_path):
+    #     return []
+    #
+    # if 'VDF_Meshes' not in str(mrm_json_file_path):
+    #     return []
+    #
+    # if 'Gothic II' not in str(mrm_json_file_path):
+    #     return []
 
-    config_data = config_file_path.read_text()
-    config = json.loads(config_data)
+
+    # if 'MOD_KM_Meshes' not in str(mrm_json_file_path):  # Gothic II
+    #     return []
+
+    # if 'NAKED' not in str(mrm_json_file_path):  # NW_HARBOUR_BARREL_01
+    #     return []
+
+    mrm_json_data = mrm_json_file_path.read_text()
+    mrm_json_dict = json.loads(mrm_json_data)
+    if 'geometry' in mrm_json_dict:
+        mrm_json_dict['geometry_arrays'] = utils_module.load_geometry(mrm_json_dict['geometry'], mrm_json_file_path.parent)
+
+    import_multiresolution_mesh_from_json(mrm_json_dict, texture_folder_list)
+
+    # Save
+    save_folder_path = convert_path / relative_path
+    save_folder_path.mkdir(exist_ok=True, parents=True)
+
+    output_path_list = utils_module.export(save_folder_path / file_name, config)
+
+    utils_module.print_file(f'converted: {relative_path / file_name}.MRM')
+
+    return output_path_list
+
+
+def get_convert_function(config):
+    global utils_module
 
     if utils_module is None:
         utils_module = import_module('utils')
@@ -138,39 +227,22 @@ def load_from_gothic_hub_scripts(config_file_path):
 
     texture_folder_list = utils_module.get_texture_folder_list(convert_path)
 
-    mrm_json_file_path_list = list(Path(intermediate_path).rglob(f'*.MRM.json'))
-    for mrm_json_file_path in mrm_json_file_path_list:
-        file_name = mrm_json_file_path.stem.upper().replace('.MRM', '').replace('.JSON', '')
-        relative_path = mrm_json_file_path.relative_to(intermediate_path).parent
-
-        # if 'NW_HARBOUR_BARREL_01' not in str(mrm_json_file_path):
-        #     continue
-        #
-        # if 'VDF_Meshes' not in str(mrm_json_file_path):
-        #     continue
-        #
-        # if 'Gothic II' not in str(mrm_json_file_path):
-        #     continue
+    return lambda mrm_json_file_path: convert_json_file(mrm_json_file_path, intermediate_path, convert_path,
+                                                        texture_folder_list, config)
 
 
-        # if 'MOD_KM_Meshes' not in str(mrm_json_file_path):  # Gothic II
-        #     continue
-
-        # if 'NAKED' not in str(mrm_json_file_path):  # NW_HARBOUR_BARREL_01
-        #     continue
-
-        mrm_json_data = mrm_json_file_path.read_text()
-        mrm_json_dict = json.loads(mrm_json_data)
+def load_from_gothic_hub_scripts(config_file_path):
+    bpy.context.preferences.view.show_splash = False
 
-        import_multiresolution_mesh_from_json(mrm_json_dict, texture_folder_list)
+    config_data = config_file_path.read_text()
+    config = json.loads(config_data)
 
-        # Save
-        save_folder_path = convert_path / relative_path
-        save_folder_path.mkdir(exist_ok=True, parents=True)
+    convert_function = get_convert_function(config)
 
-        utils_module.export(save_folder_path / file_name, config)
+    extract_path, intermediate_path, convert_path = utils_module.get_eic_paths(config)
 
-        print(f'converted: {relative_path / file_name}.MRM')
+    mrm_json_file_path_list, result_file_path = utils_module.get_job(intermediate_path, '*.MRM.json')
+    utils_module.run_job(mrm_json_file_path_list, result_file_path, convert_function, 'MULTIRESOLUTION MESH')
 
     # close blender
     exit()
@@ -5,7 +5,8 @@ import math
 
 import bpy
 import bmesh
-from mathutils import Matrix, Quaternion, Vector
+from mathutils import Matrix, Vector
+import numpy as np
 
 
 load_materials_module = None
@@ -168,9 +169,61 @@ def split_mesh(mesh_obj, mesh, zengin_materials):
     # bpy.ops.outliner.orphans_purge(do_recursive=True)
 
 
-def create_zen_mesh(name, mesh_dict, materials_by_index, use_gothic_normals=False):
+def create_zen_mesh_from_arrays(name, mesh_dict, materials_by_index, use_gothic_normals=False, atlas_dict=None):
     global load_mesh_module
 
+    geometry_arrays = mesh_dict['geometry_arrays']
+
+    if len(geometry_arrays['positions']) < 3 or len(geometry_arrays['polygon_loop_totals']) <= 0:
+        return None, None
+
+    if load_mesh_module is None:
+        load_mesh_module = import_module('load_mesh')
+
+    assert load_mesh_module is not None
+
+    # every loop have own feature with uv and normal
+    loop_feature_array = geometry_arrays['polygon_feature_indices']
+    loop_normal_array = -geometry_arrays['normals'][loop_feature_array]
+    loop_uv_array = geometry_arrays['texture'][loop_feature_array]
+    material_index_array = geometry_arrays['polygon_material_indices']
+
+    # not tiling textures are in atlas pages, uv is moved to place of texture in page and polygon get material of page
+    if atlas_dict and atlas_dict['materials']:
+        material_count = atlas_dict['pages'][0]['index']
+        offset_array = np.zeros((material_count, 2), dtype=np.float32)
+        scale_array = np.ones((material_count, 2), dtype=np.float32)
+        remap_array = np.arange(material_count, dtype=np.int32)
+        for material_index, atlas_material in atlas_dict['materials'].items():
+            offset_array[int(material_index)] = atlas_material['offset']
+            scale_array[int(material_index)] = atlas_material['scale']
+            remap_array[int(material_index)] = atlas_dict['pages'][atlas_material['page']]['index']
+
+        loop_material_array = np.repeat(material_index_array, geometry_arrays['polygon_loop_totals'])
+        loop_uv_array = loop_uv_array * scale_array[loop_material_array] + offset_array[loop_material_array]
+        material_index_array = remap_array[material_index_array]
+
+    loop_uv_array = loop_uv_array * np.array([1.0, -1.0], dtype=np.float32)
+
+    # for some worlds normals broken =(
+    if not use_gothic_normals:
+        loop_normal_array = None
+
+    mesh_obj, mesh = load_mesh_module.create_mesh_from_arrays(name, geometry_arrays['positions'],
+        geometry_arrays['polygon_position_indices'], geometry_arrays['polygon_loop_totals'],
+        loop_normal_array=loop_normal_array, loop_uv_array=loop_uv_array, blender_materials=materials_by_index,
+        material_index_array=material_index_array)
+
+    return mesh_obj, mesh
+
+
+def create_zen_mesh(name, mesh_dict, materials_by_index, use_gothic_normals=False, atlas_dict=None):
+    global load_mesh_module
+
+    if 'geometry_arrays' in mesh_dict:
+        return create_zen_mesh_from_arrays(name, mesh_dict, materials_by_index, use_gothic_normals=use_gothic_normals,
+                                           atlas_dict=atlas_dict)
+
     assert 'positions' in mesh_dict
     assert 'polygons' in mesh_dict
 
@@ -220,7 +273,8 @@ def create_zen_mesh(name, mesh_dict, materials_by_index, use_gothic_normals=Fals
     return mesh_obj, mesh
 
 
-def import_zen_from_mesh_and_materials(mesh_dict, materials_dict, texture_folder_list, split_world=False, use_gothic_normals=False):
+def import_zen_from_mesh_and_materials(mesh_dict, materials_dict, texture_folder_list, split_world=False, use_gothic_normals=False,
+                                       atlas_dict=None):
     global load_materials_module, load_mesh_module, utils_module
 
     if load_materials_module is None:
@@ -238,10 +292,22 @@ def import_zen_from_mesh_and_materials(mesh_dict, materials_dict, texture_folder
 
     texture_path_dict = utils_module.get_texture_path_dict(texture_folder_list)
 
+    # every atlas page is new material after materials of world, copy of dict coz it is cached for all worlds
+    if atlas_dict and atlas_dict['materials'] and 'geometry_arrays' in mesh_dict:
+        texture_path_dict = dict(texture_path_dict)
+        materials_dict = list(materials_dict)
+        for page in atlas_dict['pages']:
+            texture_path_dict[page['name']] = page['path']
+            materials_dict.append({'index': page['index'], 'name': page['name'], 'texture': page['name'],
+                                   'matGroup': 'UNDEF', 'color': [255, 255, 255, 255], 'noCollDet': False})
+
     utils_module.reset_scene()
 
-    materials_by_index = load_materials_module.create_materials(materials_dict, texture_path_dict)
-    mesh_obj, mesh = create_zen_mesh('World', mesh_dict, materials_by_index, use_gothic_normals=use_gothic_normals)
+    materials_by_index = load_materials_module.create_materials(
+        materials_dict, texture_path_dict, texture_info_dict=utils_module.get_texture_info_dict(texture_folder_list),
+        texture_animation_dict=utils_module.get_texture_animation_dict(texture_folder_list))
+    mesh_obj, mesh = create_zen_mesh('World', mesh_dict, materials_by_index, use_gothic_normals=use_gothic_normals,
+                                     atlas_dict=atlas_dict)
     if not mesh:
         return False
 
@@ -270,6 +336,11 @@ def import_zen_from_mesh_and_materials(mesh_dict, materials_dict, texture_folder
 
 
 def import_zen_from_json(path_to_zen_json_file, texture_folder_list):
+    global utils_module
+
+    if utils_module is None:
+        utils_module = import_module('utils')
+
     zen_json_data = Path(path_to_zen_json_file).read_text()
     zen_json_dict = json.loads(zen_json_data)
 
@@ -278,76 +349,103 @@ def import_zen_from_json(path_to_zen_json_file, texture_folder_list):
 
     mesh_dict = zen_json_dict['mesh']
     materials_dict = zen_json_dict['materials']
+    if 'geometry' in mesh_dict:
+        mesh_dict['geometry_arrays'] = utils_module.load_geometry(mesh_dict['geometry'], Path(path_to_zen_json_file).parent)
 
     import_zen_from_mesh_and_materials(mesh_dict, materials_dict, texture_folder_list)
 
 
-def load_from_gothic_hub_scripts(config_file_path):
-    global utils_module
+def convert_json_file(zen_json_file_path, intermediate_path, convert_path, texture_folder_list, config):
+    # if 'ARCHOLOS_SEWERS' not in str(zen_json_file_path.name):  # ARCHOLOS_SEWERS ARCHOLOS_MAINLAND ARCHOLOS_SILVERMINE
+    #     return []
 
-    bpy.context.preferences.view.show_splash = False
+    relative_path = zen_json_file_path.relative_to(intermediate_path).parent
 
-    config_data = config_file_path.read_text()
-    config = json.loads(config_data)
+    world_name = zen_json_file_path.stem.upper().replace('.ZEN', '').replace('.JSON', '')
+    # save_folder = convert_path / 'Worlds' / world_name
+    save_folder = convert_path / relative_path / world_name
+    save_folder.mkdir(exist_ok=True, parents=True)
 
-    if utils_module is None:
-        utils_module = import_module('utils')
+    # relative_path = zen_file_path.relative_to(extract_path).parent
+    # save_path = intermediate_path / relative_path
 
-    assert utils_module is not None
+    zen_json_data = Path(zen_json_file_path).read_text()
+    zen_json_dict = json.loads(zen_json_data)
 
-    extract_path, intermediate_path, convert_path = utils_module.get_eic_paths(config)
+    assert 'mesh' in zen_json_dict
+    assert 'materials' in zen_json_dict
 
-    texture_folder_list = utils_module.get_texture_folder_list(convert_path)
+    mesh_dict = zen_json_dict['mesh']
+    materials_dict = zen_json_dict['materials']
+    if 'geometry' in mesh_dict:
+        mesh_dict['geometry_arrays'] = utils_module.load_geometry(mesh_dict['geometry'], zen_json_file_path.parent)
+
+    # textures of not tiling materials are packed to pages by convert_atlas.py
+    atlas_dict = None
+    atlas_file_path = zen_json_file_path.with_suffix('.atlas.json')
+    if config.get('texture_atlas', False) and atlas_file_path.exists():
+        atlas_dict = json.loads(atlas_file_path.read_text(encoding='utf-8'))
+
+    import_zen_from_mesh_and_materials(mesh_dict, materials_dict, texture_folder_list,
+                                       split_world=config['split_world'],
+                                       use_gothic_normals=config['use_gothic_normals'], atlas_dict=atlas_dict)
+
+    json_data = json.dumps(materials_dict, indent=4, ensure_ascii=False)
+    save_path_materials = save_folder / 'materials.json'
+    save_path_materials.write_text(json_data, encoding='utf-8')
+
+    json_data = json.dumps(zen_json_dict['vobs'], indent=4, ensure_ascii=False)
+    save_path_vobs = save_folder / 'vobs.json'
+    save_path_vobs.write_text(json_data, encoding='utf-8')
+
+    json_data = json.dumps(zen_json_dict['waypoints'], indent=4, ensure_ascii=False)
+    save_path_waypoints = save_folder / 'waypoints.json'
+    save_path_waypoints.write_text(json_data, encoding='utf-8')
 
-    zen_json_file_path_list = list(Path(intermediate_path).rglob(f'*.ZEN.json'))
-    for zen_json_file_path in zen_json_file_path_list:
-        # if 'ARCHOLOS_SEWERS' not in str(zen_json_file_path.name):  # ARCHOLOS_SEWERS ARCHOLOS_MAINLAND ARCHOLOS_SILVERMINE
-        #     continue
+    output_path_list = utils_module.export(save_folder / world_name, config)
 
-        relative_path = zen_json_file_path.relative_to(intermediate_path).parent
+    utils_module.print_file(f'converted: {relative_path / world_name}.ZEN')
 
-        world_name = zen_json_file_path.stem.upper().replace('.ZEN', '').replace('.JSON', '')
-        # save_folder = convert_path / 'Worlds' / world_name
-        save_folder = convert_path / relative_path / world_name
-        save_folder.mkdir(exist_ok=True, parents=True)
+    return [str(save_path_materials), str(save_path_vobs), str(save_path_waypoints)] + output_path_list
 
-        # relative_path = zen_file_path.relative_to(extract_path).parent
-        # save_path = intermediate_path / relative_path
 
-        zen_json_data = Path(zen_json_file_path).read_text()
-        zen_json_dict = json.loads(zen_json_data)
+def get_convert_function(config):
+    global utils_module
 
-        assert 'mesh' in zen_json_dict
-        assert 'materials' in zen_json_dict
+    if utils_module is None:
+        utils_module = import_module('utils')
 
-        mesh_dict = zen_json_dict['mesh']
-        materials_dict = zen_json_dict['materials']
+    assert utils_module is not None
 
-        import_zen_from_mesh_and_materials(mesh_dict, materials_dict, texture_folder_list,
-                                           split_world=config['split_world'],
-                                           use_gothic_normals=config['use_gothic_normals'])
+    extract_path, intermediate_path, convert_path = utils_module.get_eic_paths(config)
 
-        json_data = json.dumps(materials_dict, indent=4, ensure_ascii=False)
-        save_path_materials = save_folder / 'materials.json'
-        save_path_materials.write_text(json_data, encoding='utf-8')
+    texture_folder_list = utils_module.get_texture_folder_list(convert_path)
 
-        json_data = json.dumps(zen_json_dict['vobs'], indent=4, ensure_ascii=False)
-        save_path_vobs = save_folder / 'vobs.json'
-        save_path_vobs.write_text(json_data, encoding='utf-8')
+    return lambda zen_json_file_path: convert_json_file(zen_json_file_path, intermediate_path, convert_path,
+                                                        texture_folder_list, config)
 
-        json_data = json.dumps(zen_json_dict['waypoints'], indent=4, ensure_ascii=False)
-        save_path_waypoints = save_folder / 'waypoints.json'
-        save_path_waypoints.write_text(json_data, encoding='utf-8')
 
-        utils_module.export(save_folder / world_name, config)
+def load_from_gothic_hub_scripts(config_file_path):
+    bpy.context.preferences.view.show_splash = False
 
-        print(f'converted: {relative_path / world_name}.ZEN')
+    config_data = config_file_path.read_text()
+    config = json.loads(config_data)
+
+    convert_function = get_convert_function(config)
+
+    extract_path, intermediate_path, convert_path = utils_module.get_eic_paths(config)
+
+    zen_json_file_path_list, result_file_path = utils_module.get_job(intermediate_path, '*.ZEN.json')
+    utils_module.run_job(zen_json_file_path_list, result_file_path, convert_function, 'WORLD')
 
     # close blender
     exit()
 
 
 def init():
+    if __name__ != '__main__':
+        return
+
     config_file_path = Path('config.json')
     if config_file_path.exists():
         load_from_gothic_hub_scripts(config_file_path)
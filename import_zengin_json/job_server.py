@@ -0,0 +1,114 @@
+import json
+import socket
+import sys
+import time
+import traceback
+from pathlib import Path
+import importlib.util
+
+import bpy
+
+
+# blender --background --python job_server.py -- port
+# warm blender: import modules are loaded once and used for all files of all stages
+# request = {'command': 'convert', 'script': 'import_mdm', 'file': 'path/to/file.MDM.json', 'config_file': optional}
+# reply = {'file': ..., 'outputs': [...], 'error': None or message,
+#          'timings': {'prepare': seconds, 'convert': seconds, 'cpu': seconds, 'peak_rss': bytes}}
+
+module_dict = {}
+
+
+def import_module(module_name):
+    module_path_list = []
+    module_path_list.append(Path(module_name + '.py'))
+    module_path_list.append(Path.cwd() / (module_name + '.py'))
+    module_path_list.append(Path.cwd() / 'import_zengin_json' / (module_name + '.py'))
+    for module_path in module_path_list:
+        if module_path.exists():
+            # Create a module spec from the given path
+            spec = importlib.util.spec_from_file_location(module_name, module_path)
+
+            # Load the module from the created spec
+            module = importlib.util.module_from_spec(spec)
+
+            # Execute the module to make its attributes accessible
+            spec.loader.exec_module(module)
+
+            # Return the imported module
+            return module
+
+    return None
+
+
+def get_module(script_name):
+    if script_name not in module_dict:
+        module_dict[script_name] = import_module(script_name)
+
+    return module_dict[script_name]
+
+
+def convert(request):
+    start_time = time.perf_counter()
+    start_cpu_time = time.thread_time()
+
+    # config read for every file, so changed config don't need restart of server
+    config_data = Path(request.get('config_file', 'config.json')).read_text()
+    config = json.loads(config_data)
+
+    module = get_module(request['script'])
+    if module is None:
+        raise RuntimeError(f'can\'t find script: {request["script"]}')
+
+    convert_function = module.get_convert_function(config)
+    prepare_time = time.perf_counter()
+
+    output_path_list = convert_function(Path(request['file']))
+    end_time = time.perf_counter()
+
+    timings = {'prepare': prepare_time - start_time, 'convert': end_time - prepare_time,
+               'cpu': time.thread_time() - start_cpu_time, 'peak_rss': get_module('utils').get_peak_rss()}
+    return [str(path) for path in output_path_list], timings
+
+
+def serve(port):
+    connection = socket.create_connection(('127.0.0.1', port))
+    stream = connection.makefile('rw', encoding='utf-8', newline='\n')
+
+    for line in stream:
+        request = json.loads(line)
+        if request['command'] == 'quit':
+            break
+
+        reply = {'file': request['file'], 'outputs': [], 'error': None, 'timings': {}}
+        try:
+            reply['outputs'], reply['timings'] = convert(request)
+        except Exception as error:
+            traceback.print_exc()
+            print(f'[BLENDER SERVER] ERROR: can\'t convert {request["file"]}: {error}')
+            reply['error'] = f'{type(error).__name__}: {error}'
+
+        stream.write(json.dumps(reply, ensure_ascii=False) + '\n')
+        stream.flush()
+
+    stream.close()
+    connection.close()
+
+
+def init():
+    if __name__ != '__main__':
+        return
+
+    argument_list = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    if len(argument_list) == 0:
+        print('[BLENDER SERVER] ERROR: port is not set')
+        exit()
+
+    bpy.context.preferences.view.show_splash = False
+
+    serve(int(argument_list[0]))
+
+    # close blender
+    exit()
+
+
+init()
@@ -1,5 +1,3 @@
-import math
-
 from mathutils import Matrix, Quaternion, Vector
 
 import bpy
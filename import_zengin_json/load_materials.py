@@ -1,7 +1,47 @@
+import re
+
 import bpy
 
 
-def create_materials(zengin_materials, texture_path_dict, verbose=False):
+def set_sheet_animation(material, tex_image, animation, fps):
+    # uv of polygon is repeated inside of frame cell, cell is changed by keyframes with fps of material
+    nodes = material.node_tree.nodes
+    links = material.node_tree.links
+
+    tex_coord = nodes.new('ShaderNodeTexCoord')
+    tex_coord.location = (-600, 0)
+    fraction = nodes.new('ShaderNodeVectorMath')
+    fraction.operation = 'FRACTION'
+    fraction.location = (-400, 0)
+    mapping = nodes.new('ShaderNodeMapping')
+    mapping.location = (-200, 0)
+    mapping.inputs['Scale'].default_value = (1.0 / animation['columns'], 1.0 / animation['rows'], 1.0)
+
+    links.new(tex_coord.outputs['UV'], fraction.inputs[0])
+    links.new(fraction.outputs['Vector'], mapping.inputs['Vector'])
+    links.new(mapping.outputs['Vector'], tex_image.inputs['Vector'])
+
+    # frames go by rows from top left corner of sheet, blender v go from bottom
+    # last key is first frame again, so loop have same length for every frame
+    frame_length = bpy.context.scene.render.fps / fps
+    location = mapping.inputs['Location']
+    for frame_index in range(animation['frames'] + 1):
+        column = frame_index % animation['frames'] % animation['columns']
+        row = frame_index % animation['frames'] // animation['columns']
+        location.default_value = (column / animation['columns'], 1.0 - (row + 1) / animation['rows'], 0.0)
+        location.keyframe_insert('default_value', frame=frame_index * frame_length)
+
+    for fcurve in material.node_tree.animation_data.action.fcurves:
+        for keyframe_point in fcurve.keyframe_points:
+            keyframe_point.interpolation = 'CONSTANT'
+        fcurve.modifiers.new('CYCLES')
+
+    material['texAniSheet'] = {'frames': animation['frames'], 'columns': animation['columns'], 'rows': animation['rows'],
+                               'fps': fps}
+
+
+def create_materials(zengin_materials, texture_path_dict, verbose=False, texture_info_dict=None,
+                     texture_animation_dict=None):
     def image_has_alpha(img):
         b = 32 if img.is_float else 8
         return (img.depth == 2 * b or   # Grayscale+Alpha
@@ -26,8 +66,19 @@ def create_materials(zengin_materials, texture_path_dict, verbose=False):
         else:
             # assert False, 'zengin_texture_name is None'
             continue
+
+        # material with animated texture (FIRE_A0) use sheet with all frames, see texture_animation_sheets in config
+        animation = None
+        match = re.match(r'(.*_A)\d+$', zengin_texture_name)
+        if match and zengin_material.get('texAniFPS', 0) > 0 and texture_animation_dict:
+            animation = texture_animation_dict.get(match.group(1))
+
         image = None
-        if zengin_texture_name in texture_path_dict:
+        if animation:
+            image = bpy.data.images.load(animation['path'], check_existing=True)
+            image.source = 'FILE'
+            image.filepath = animation['path']
+        elif zengin_texture_name in texture_path_dict:
             image = bpy.data.images.load(texture_path_dict[zengin_texture_name], check_existing=True)
             image.source = 'FILE'
             image.filepath = texture_path_dict[zengin_texture_name]
@@ -77,13 +128,19 @@ def create_materials(zengin_materials, texture_path_dict, verbose=False):
 
             links.new(tex_image.outputs['Color'], principled_bsdf.inputs['Base Color'])
 
-            if image_has_alpha(image):
+            # alpha from texture index, blender image is always rgba for dds
+            texture_info = animation or (texture_info_dict or {}).get(zengin_texture_name, {})
+            has_alpha = texture_info['alpha'] if texture_info.get('alpha') is not None else image_has_alpha(image)
+            if has_alpha:
                 links.new(tex_image.outputs['Alpha'], principled_bsdf.inputs['Alpha'])
                 material.show_transparent_back = False
                 material.blend_method = 'CLIP'
                 if hasattr(material, 'shadow_method'):
                     material.shadow_method = 'CLIP'
                 material['biplanar'] = True
+
+            if animation:
+                set_sheet_animation(material, tex_image, animation, zengin_material['texAniFPS'])
         else:
             principled_bsdf.inputs['Base Color'].default_value = zengin_material['color']
 
@@ -1,17 +1,8 @@
-import math
-from mathutils import Matrix, Quaternion, Vector
-import array
-
 import bpy
 import bmesh
-from bpy_extras.io_utils import unpack_list
 import numpy as np
 
 
-
-import random
-
-
 # https://github.com/scorpion81/blender-addons/blob/master/io_scene_obj/import_obj.py
 # https://projects.blender.org/blender/blender/src/commit/de3c473ebb167ef6f1f8aca699b7419a00485520/scripts/addons_core/io_scene_fbx/import_fbx.py#L1793
 # https://projects.blender.org/blender/blender -> scripts/addons_core/io_scene_fbx/import_fbx.py
@@ -307,3 +298,56 @@ def create_mesh_v2(name, vertex_list, face_list,
         mesh_obj.select_set(False)
 
     return mesh_obj, mesh
+
+
+def create_mesh_from_arrays(name, position_array, loop_vertex_index_array, loop_total_array,
+                            loop_normal_array=None, loop_uv_array=None, blender_materials=None, material_index_array=None,
+                            remove_unused_material=True, scale=0.01):
+    # same result as create_mesh_v2, but numpy arrays go to blender with foreach_set
+    loop_start_array = np.zeros(len(loop_total_array), dtype=np.int32)
+    np.cumsum(loop_total_array[:-1], out=loop_start_array[1:])
+
+    # Mesh
+    mesh = bpy.data.meshes.new(name)
+    mesh.vertices.add(len(position_array))
+    mesh.vertices.foreach_set('co', (np.asarray(position_array, dtype=np.float32) * scale).ravel())
+    mesh.loops.add(len(loop_vertex_index_array))
+    mesh.loops.foreach_set('vertex_index', np.asarray(loop_vertex_index_array, dtype=np.int32))
+    mesh.polygons.add(len(loop_total_array))
+    mesh.polygons.foreach_set('loop_start', loop_start_array)
+    if bpy.app.version < (4, 0, 0):
+        mesh.polygons.foreach_set('loop_total', np.asarray(loop_total_array, dtype=np.int32))
+    mesh.update(calc_edges=True)
+
+    # Texture
+    if loop_uv_array is not None and blender_materials and material_index_array is not None:
+        for material_index, material in blender_materials.items():
+            mesh.materials.append(material)
+
+        mesh.polygons.foreach_set('material_index', np.asarray(material_index_array, dtype=np.int32))
+
+        uv_layer = mesh.uv_layers.new(name='UVMap')
+        uv_layer.data.foreach_set('uv', np.asarray(loop_uv_array, dtype=np.float32).ravel())
+
+    # Use smooth anyway
+    mesh.polygons.foreach_set('use_smooth', np.ones(len(mesh.polygons), dtype=bool))
+
+    # Normals
+    if loop_normal_array is not None and len(loop_normal_array):
+        assert len(mesh.loops) == len(loop_normal_array)
+
+        mesh.normals_split_custom_set(np.asarray(loop_normal_array, dtype=np.float32))
+
+    mesh_obj = bpy.data.objects.new(mesh.name, mesh)
+    bpy.context.collection.objects.link(mesh_obj)
+
+    if remove_unused_material:
+        mesh_obj.select_set(True)
+        bpy.context.view_layer.objects.active = mesh_obj
+
+        bpy.ops.object.material_slot_remove_unused()
+
+        bpy.context.view_layer.objects.active = None
+        mesh_obj.select_set(False)
+
+    return mesh_obj, mesh
@@ -1,11 +1,31 @@
+import json
+import sys
+import time
+import traceback
 from pathlib import Path
-from mathutils import Vector
-
-import shutil
 
 import bpy
 
 
+def import_script_module(module_name):
+    import importlib.util
+
+    # module from scripts folder, it is parent of this folder and not in sys.path of blender
+    module_path = Path(__file__).resolve().parent.parent / (module_name + '.py')
+    spec = importlib.util.spec_from_file_location(f'gothic_hub_{module_name}', module_path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+
+    return module
+
+
+# one copy for scripts and blender
+scripts_helpers = import_script_module('helpers')
+print_file = scripts_helpers.print_file
+get_texture_folder_list = scripts_helpers.get_texture_folder_list
+get_peak_rss = import_script_module('metrics').get_peak_rss
+
+
 def rename_bone(bone_name, root_name='root'):
     name = bone_name
 
@@ -119,31 +139,101 @@ def reset_scene():
     bpy.ops.outliner.orphans_purge(do_recursive=True)
 
 
-def get_texture_folder_list(convert_path):
-    texture_folder_list = []
-    if (convert_path / 'VDF_Textures').exists():
-        texture_folder_list.append(str(convert_path / 'VDF_Textures'))
-    if (convert_path / 'VDF_Textures_Addon').exists():
-        texture_folder_list.append(str(convert_path / 'VDF_Textures_Addon'))
+def load_geometry(geometry_dict, folder_path):
+    import numpy as np
 
-    for path in Path(convert_path).glob('*'):
-        if not path.is_dir():
-            continue
-        if str(path) in texture_folder_list:
-            continue
+    # binary file from parse stage, every array is numpy view of one file read, no python lists
+    geometry_data = np.fromfile(Path(folder_path) / geometry_dict['file'], dtype=np.uint8)
 
-        texture_folder_list.append(str(path))
+    array_dict = {}
+    for name, array_info in geometry_dict['arrays'].items():
+        dtype = np.dtype(array_info['type']).newbyteorder('<')
+        values = np.frombuffer(geometry_data, dtype=dtype, count=array_info['count'] * array_info['width'],
+                               offset=array_info['offset'])
+        if array_info['width'] > 1:
+            values = values.reshape(array_info['count'], array_info['width'])
+        array_dict[name] = values
 
-    return texture_folder_list
+    return array_dict
 
 
-def get_texture_path_dict(texture_folder_list, texture_format='tga'):
-    texture_path_dict = {}
-    for texture_folder in texture_folder_list:
-        for path in Path(texture_folder).rglob(f'*.{texture_format}'):  # case_sensitive=False
-            texture_path_dict[path.stem.upper()] = str(path)
+# {(texture folders, format): texture_info_dict}, textures are found once per blender session
+texture_info_dict_cache = {}
+texture_path_dict_cache = {}
+texture_animation_dict_cache = {}
+# {convert folder: texture index}
+texture_index_cache = {}
+
+
+def load_texture_index(texture_folder_list):
+    # written by convert_textures.py to convert folder, parent of texture folders
+    if len(texture_folder_list) == 0:
+        return None
+
+    texture_index_file_path = Path(texture_folder_list[0]).parent / 'texture_index.json'
+    if texture_index_file_path not in texture_index_cache:
+        texture_index_cache[texture_index_file_path] = None
+        if texture_index_file_path.exists():
+            texture_index_cache[texture_index_file_path] = json.loads(texture_index_file_path.read_text(encoding='utf-8'))
+
+    return texture_index_cache[texture_index_file_path]
+
+
+def get_texture_info_dict(texture_folder_list, texture_format=('tga', 'dds')):
+    # {NAME: {'name', 'path', 'width', 'height', 'alpha', 'format', 'hash', 'color'}}
+    # without texture index only name and path are known
+    # dds - compressed textures with mipmaps, palette textures are still tga, see texture_format in config
+    if isinstance(texture_format, str):
+        texture_format = (texture_format,)
+    cache_key = (tuple(texture_folder_list), tuple(texture_format))
+    if cache_key in texture_info_dict_cache:
+        return texture_info_dict_cache[cache_key]
+
+    texture_index = load_texture_index(texture_folder_list)
+
+    suffix_list = [f'.{suffix.lower()}' for suffix in texture_format]
+    texture_info_dict = {}
+    if texture_index is None:
+        for texture_folder in texture_folder_list:
+            for path in Path(texture_folder).rglob('*'):  # case_sensitive=False
+                if path.suffix.lower() in suffix_list:
+                    texture_info_dict[path.stem.upper()] = {'name': path.stem.upper(), 'path': str(path)}
+    else:
+        texture_info_dict = scripts_helpers.get_texture_index_dict(texture_index, texture_folder_list, suffix_list)
 
-    return texture_path_dict
+    texture_info_dict_cache[cache_key] = texture_info_dict
+    return texture_info_dict
+
+
+def get_texture_path_dict(texture_folder_list, texture_format=('tga', 'dds')):
+    if isinstance(texture_format, str):
+        texture_format = (texture_format,)
+    cache_key = (tuple(texture_folder_list), tuple(texture_format))
+    if cache_key not in texture_path_dict_cache:
+        texture_info_dict = get_texture_info_dict(texture_folder_list, texture_format)
+        texture_path_dict_cache[cache_key] = {name: texture['path'] for name, texture in texture_info_dict.items()}
+
+    return texture_path_dict_cache[cache_key]
+
+
+def get_texture_animation_dict(texture_folder_list):
+    # {FIRE_A: animation}, all frames of animated texture FIRE_A0, FIRE_A1... in one sheet, see convert_textures.py
+    cache_key = tuple(texture_folder_list)
+    if cache_key not in texture_animation_dict_cache:
+        texture_index = load_texture_index(texture_folder_list) or {}
+        animation_list = texture_index.get('animations', [])
+
+        # same order as textures, sheet from later folder override
+        texture_animation_dict = {}
+        for texture_folder in texture_folder_list:
+            for animation in animation_list:
+                if Path(texture_folder) in Path(animation['path']).parents:
+                    texture_animation_dict[animation['name']] = animation
+        for animation in animation_list:
+            texture_animation_dict.setdefault(animation['name'], animation)
+        texture_animation_dict_cache[cache_key] = texture_animation_dict
+
+    return texture_animation_dict_cache[cache_key]
 
 
 def get_eic_paths(config):
@@ -160,6 +250,48 @@ def get_eic_paths(config):
     return extract_path, intermediate_path, convert_path
 
 
+def get_job(intermediate_path, file_pattern):
+    # blender --python import_mdm.py -- path/to/job.json
+    # job = {'files': [...], 'result_file': '...'}, without job convert all files from intermediate folder
+    argument_list = sys.argv[sys.argv.index('--') + 1:] if '--' in sys.argv else []
+    if len(argument_list) > 0:
+        job = json.loads(Path(argument_list[0]).read_text(encoding='utf-8'))
+        return [Path(file_path) for file_path in job['files']], job.get('result_file')
+
+    return list(Path(intermediate_path).rglob(file_pattern)), None
+
+
+def write_job_result(result_file_path, json_file_path, output_path_list, error=None, timings=None):
+    if result_file_path is None:
+        return
+
+    result = {'file': str(json_file_path), 'outputs': [str(path) for path in output_path_list], 'error': error,
+              'timings': timings or {}}
+    with open(result_file_path, 'a', encoding='utf-8') as result_file:
+        result_file.write(json.dumps(result, ensure_ascii=False) + '\n')
+
+    # convert_all read this line from pipe to show progress
+    print(f'[JOB RESULT] {json.dumps(result, ensure_ascii=False)}', flush=True)
+
+
+def run_job(json_file_path_list, result_file_path, convert_function, tag):
+    # convert_function(json_file_path) -> list of saved files
+    for json_file_path in json_file_path_list:
+        start_time = time.perf_counter()
+        start_cpu_time = time.thread_time()
+        try:
+            output_path_list = convert_function(json_file_path)
+        except Exception as error:
+            traceback.print_exc()
+            print(f'[{tag}] ERROR: can\'t convert {json_file_path}: {error}')
+            write_job_result(result_file_path, json_file_path, [], f'{type(error).__name__}: {error}')
+            continue
+
+        timings = {'convert': time.perf_counter() - start_time, 'cpu': time.thread_time() - start_cpu_time,
+                   'peak_rss': get_peak_rss()}
+        write_job_result(result_file_path, json_file_path, output_path_list, timings=timings)
+
+
 def export(file_path, config):
     export_format = ''
     if 'export_format' in config:
@@ -167,6 +299,7 @@ def export(file_path, config):
 
     # https://docs.blender.org/api/current/bpy.ops.export_scene.html
     if export_format.upper() == 'GLB':
+        output_path_list = [str(file_path) + '.glb']
         bpy.ops.export_scene.gltf(
             filepath=str(file_path),
             # export_normals=True,
@@ -183,6 +316,7 @@ def export(file_path, config):
         # texture_folder_path = file_path.parent.parent / 'GLTF_Textures'
         # shutil.rmtree(texture_folder_path, ignore_errors=True)
     elif export_format.upper() == 'GLTF_SEPARATE':
+        output_path_list = [str(file_path) + '.gltf', str(file_path) + '.bin']
         bpy.ops.export_scene.gltf(
             filepath=str(file_path),
             # export_normals=False,
@@ -200,6 +334,7 @@ def export(file_path, config):
         # texture_folder_path = file_path.parent.parent / 'GLTF_Textures'
         # shutil.rmtree(texture_folder_path, ignore_errors=True)
     elif export_format.upper() == 'FBX':
+        output_path_list = [str(file_path) + '.fbx']
         bpy.ops.export_scene.fbx(
             filepath=str(file_path) + '.fbx',
             check_existing=False,
@@ -209,4 +344,7 @@ def export(file_path, config):
             add_leaf_bones=False
         )
     else:
+        output_path_list = [str(file_path) + '.blend']
         bpy.ops.wm.save_as_mainfile(filepath=str(file_path) + '.blend')
+
+    return output_path_list
@@ -0,0 +1,126 @@
+import fnmatch
+import hashlib
+import json
+from pathlib import Path
+
+
+# extract_manifest.json is written by extract_all.py, paths of files are relative to extract folder
+# in "direct" mode files are not written to disk, converters read them from archive by manifest
+MANIFEST_FILE_NAME = 'extract_manifest.json'
+
+# {folder: manifest or None}, every process load manifest once
+manifest_cache = {}
+# {archive file: (vfs, {path in archive in upper case: node})}, archives mounted in this process
+archive_cache = {}
+
+
+def load(extract_path):
+    extract_path = Path(extract_path)
+    if extract_path not in manifest_cache:
+        manifest_file_path = extract_path / MANIFEST_FILE_NAME
+        manifest_cache[extract_path] = None
+        if manifest_file_path.exists():
+            manifest_cache[extract_path] = json.loads(manifest_file_path.read_text(encoding='utf-8'))
+
+    return manifest_cache[extract_path]
+
+
+def find_manifest(file_path):
+    # manifest is in one of parent folders of extracted file
+    for folder_path in Path(file_path).parents:
+        manifest = load(folder_path)
+        if manifest is not None:
+            return folder_path, manifest
+
+    return None, None
+
+
+def get_file_info(file_path):
+    extract_path, manifest = find_manifest(file_path)
+    if manifest is None:
+        return None
+
+    return manifest['files'].get(Path(file_path).relative_to(extract_path).as_posix())
+
+
+def get_size(file_path):
+    # size for schedulers, without stat of file if manifest know it
+    file_info = get_file_info(file_path)
+    if file_info and file_info.get('size') is not None:
+        return file_info['size']
+
+    try:
+        return Path(file_path).stat().st_size
+    except OSError:
+        return 0
+
+
+def get_extracted_hash(file_path, stat):
+    # hash written by extract, valid if file was not changed after extract
+    extract_path, manifest = find_manifest(file_path)
+    if manifest is None:
+        return None
+
+    file_info = manifest['files'].get(Path(file_path).relative_to(extract_path).as_posix())
+    if (file_info is None or not file_info.get('hash') or file_info['size'] != stat.st_size or
+            stat.st_mtime_ns > manifest.get('time', 0)):
+        return None
+
+    return file_info['hash']
+
+
+def find_files(extract_path, file_pattern):
+    # from manifest if extract wrote it, without scan of extract folder
+    manifest = load(extract_path)
+    if manifest is None:
+        return list(Path(extract_path).rglob(file_pattern))
+
+    return [Path(extract_path) / relative_path for relative_path in manifest['files']
+            if fnmatch.fnmatch(Path(relative_path).name.upper(), file_pattern.upper())]
+
+
+def get_type_set(extract_path):
+    # types of extracted files, None if extract don't wrote manifest
+    manifest = load(extract_path)
+    if manifest is None:
+        return None
+
+    return {file_info['type'] for file_info in manifest['files'].values()}
+
+
+def exists(file_path):
+    return Path(file_path).exists() or get_file_info(file_path) is not None
+
+
+def get_source_info(file_path):
+    # for build database: file in archive changed if archive changed
+    file_info = get_file_info(file_path)
+
+    stat = Path(file_info['archive']).stat()
+    source_hash = hashlib.blake2b(digest_size=16)
+    source_hash.update(json.dumps([file_info['archive'], file_info['entry'], stat.st_size, stat.st_mtime_ns]).encode('utf-8'))
+    return {'hash': source_hash.hexdigest(), 'size': file_info.get('size', 0), 'mtime': stat.st_mtime_ns}
+
+
+def read_file(file_path):
+    # path of extracted file, or data of file from archive if it was not extracted
+    if Path(file_path).exists():
+        return file_path
+
+    file_info = get_file_info(file_path)
+    if file_info is None:
+        raise RuntimeError(f'can\'t find file on disk or in archives: {file_path}')
+
+    if file_info['archive'] not in archive_cache:
+        from zenkit import Vfs, VfsOverwriteBehavior
+        import extract_all
+
+        vfs = Vfs()
+        vfs.mount_disk(file_info['archive'], clobber=VfsOverwriteBehavior.OLDER)
+        file_dict = {}
+        extract_all.collect_files(vfs.root, '', file_dict)
+        node_dict = {(path + node.name).lstrip('/').upper(): node for path, node in file_dict.values()}
+        archive_cache[file_info['archive']] = (vfs, node_dict)
+
+    _, node_dict = archive_cache[file_info['archive']]
+    return node_dict[file_info['entry'].upper()].data
@@ -0,0 +1,205 @@
+import json
+import os
+import sys
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+
+# report of current convert run, stages add to it from own threads
+# file metrics = {'file', 'type', 'wall', 'cpu', 'peak_rss', 'bytes_in', 'bytes_out'}, time in seconds, memory in bytes
+report = None
+report_lock = threading.Lock()
+
+
+def get_peak_rss():
+    # peak memory of this process, for worker process it is peak of all files converted by this worker
+    if sys.platform == 'win32':
+        import ctypes
+        from ctypes import wintypes
+
+        class ProcessMemoryCounters(ctypes.Structure):
+            _fields_ = [('cb', wintypes.DWORD), ('PageFaultCount', wintypes.DWORD),
+                        ('PeakWorkingSetSize', ctypes.c_size_t), ('WorkingSetSize', ctypes.c_size_t),
+                        ('QuotaPeakPagedPoolUsage', ctypes.c_size_t), ('QuotaPagedPoolUsage', ctypes.c_size_t),
+                        ('QuotaPeakNonPagedPoolUsage', ctypes.c_size_t), ('QuotaNonPagedPoolUsage', ctypes.c_size_t),
+                        ('PagefileUsage', ctypes.c_size_t), ('PeakPagefileUsage', ctypes.c_size_t)]
+
+        counters = ProcessMemoryCounters()
+        counters.cb = ctypes.sizeof(counters)
+        ctypes.windll.kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+        ctypes.windll.psapi.GetProcessMemoryInfo.argtypes = [wintypes.HANDLE, ctypes.c_void_p, wintypes.DWORD]
+        if not ctypes.windll.psapi.GetProcessMemoryInfo(ctypes.windll.kernel32.GetCurrentProcess(),
+                                                        ctypes.byref(counters), counters.cb):
+            return 0
+        return counters.PeakWorkingSetSize
+
+    import resource
+
+    # linux - kilobytes, mac - bytes
+    peak_rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak_rss if sys.platform == 'darwin' else peak_rss * 1024
+
+
+def get_size(path_list):
+    size = 0
+    for path in path_list:
+        try:
+            size += os.path.getsize(path)
+        except OSError:
+            pass
+
+    return size
+
+
+def get_asset_type(file_path):
+    # HUM_BODY.MDM -> MDM, HUM_BODY.MDM.json -> MDM
+    suffix_list = [suffix[1:].upper() for suffix in Path(file_path).suffixes]
+    if len(suffix_list) > 1 and suffix_list[-1] in ['JSON', 'BIN']:
+        return suffix_list[-2]
+
+    return suffix_list[-1] if suffix_list else ''
+
+
+def measure_file(function, arguments):
+    # run in worker process, first argument of converter is source file
+    start_time = time.perf_counter()
+    start_cpu_time = time.thread_time()
+    result = function(*arguments) or {}
+    cpu_time = time.thread_time() - start_cpu_time
+    wall_time = time.perf_counter() - start_time
+
+    input_path_list = [arguments[0]] + list(result.get('dependencies', []))
+    file_metrics = {'file': str(arguments[0]), 'type': get_asset_type(arguments[0]), 'wall': wall_time, 'cpu': cpu_time,
+                    'peak_rss': get_peak_rss(), 'bytes_in': get_size(input_path_list),
+                    'bytes_out': get_size(result.get('outputs', []))}
+
+    return result, file_metrics
+
+
+def get_blender_file_metrics(blender_result):
+    # timings are measured inside blender, see job_server.py and utils.run_job
+    timings = blender_result.get('timings') or {}
+    json_file_path = blender_result['file']
+    return {'file': json_file_path, 'type': get_asset_type(json_file_path),
+            'wall': timings.get('prepare', 0.0) + timings.get('convert', 0.0), 'cpu': timings.get('cpu', 0.0),
+            'peak_rss': timings.get('peak_rss', 0),
+            'bytes_in': get_size([json_file_path, Path(json_file_path).with_suffix('.bin')]),
+            'bytes_out': get_size(blender_result['outputs'])}
+
+
+def start_report():
+    global report
+
+    with report_lock:
+        report = {'start_time': time.time(), 'start_cpu_time': time.process_time(), 'stages': {}, 'files': {}}
+
+
+def add_file_metrics(stage, file_metrics_list):
+    if report is None:
+        return
+
+    with report_lock:
+        report['files'].setdefault(stage, []).extend(file_metrics_list)
+
+
+def add_blender_metrics(stage, blender_result_list):
+    add_file_metrics(stage, [get_blender_file_metrics(result) for result in blender_result_list if not result['error']])
+    add_stage_metrics(stage, {'failed_files': sum(1 for result in blender_result_list if result['error'])})
+
+
+def add_stage_metrics(stage, stage_metrics):
+    if report is None:
+        return
+
+    with report_lock:
+        report['stages'].setdefault(stage, {}).update(stage_metrics)
+
+
+def measure_stage(stage, function):
+    # wall time of stage is measured in orchestrator, cpu and memory are summed from files
+    def run_stage():
+        start_time = time.perf_counter()
+        try:
+            function()
+            add_stage_metrics(stage, {'failed': False})
+        except Exception:
+            add_stage_metrics(stage, {'failed': True})
+            raise
+        finally:
+            add_stage_metrics(stage, {'wall': time.perf_counter() - start_time})
+
+    return run_stage
+
+
+def get_totals(file_metrics_list):
+    return {'files': len(file_metrics_list),
+            'wall': sum(file_metrics['wall'] for file_metrics in file_metrics_list),
+            'cpu': sum(file_metrics['cpu'] for file_metrics in file_metrics_list),
+            'peak_rss': max([file_metrics['peak_rss'] for file_metrics in file_metrics_list], default=0),
+            'bytes_in': sum(file_metrics['bytes_in'] for file_metrics in file_metrics_list),
+            'bytes_out': sum(file_metrics['bytes_out'] for file_metrics in file_metrics_list)}
+
+
+def get_slowest(file_metrics_list, slowest_count):
+    return sorted(file_metrics_list, key=lambda file_metrics: file_metrics['wall'], reverse=True)[:slowest_count]
+
+
+def format_size(size):
+    return f'{size / 1024 / 1024:.1f} MB'
+
+
+def finish_report(report_folder_path, slowest_count=10):
+    if report is None:
+        return None
+
+    with report_lock:
+        stage_dict = {}
+        for stage, stage_metrics in report['stages'].items():
+            file_metrics_list = report['files'].get(stage, [])
+            totals = get_totals(file_metrics_list)
+            # wall of files is sum of all workers, wall of stage is real time
+            totals['files_wall'] = totals.pop('wall')
+            stage_dict[stage] = dict(stage_metrics, **totals, slowest=get_slowest(file_metrics_list, slowest_count))
+
+        type_file_metrics_dict = {}
+        for file_metrics_list in report['files'].values():
+            for file_metrics in file_metrics_list:
+                type_file_metrics_dict.setdefault(file_metrics['type'], []).append(file_metrics)
+        type_dict = {asset_type: get_totals(file_metrics_list)
+                     for asset_type, file_metrics_list in sorted(type_file_metrics_dict.items())}
+
+        all_file_metrics_list = [file_metrics for file_metrics_list in report['files'].values()
+                                 for file_metrics in file_metrics_list]
+        run_report = {'date': datetime.fromtimestamp(report['start_time']).isoformat(timespec='seconds'),
+                      'wall': time.time() - report['start_time'],
+                      'cpu': time.process_time() - report['start_cpu_time'] + sum(file_metrics['cpu']
+                                                                                  for file_metrics in all_file_metrics_list),
+                      'peak_rss': get_peak_rss(),
+                      'stages': stage_dict,
+                      'types': type_dict,
+                      'slowest': get_slowest(all_file_metrics_list, slowest_count)}
+
+    report_folder_path = Path(report_folder_path)
+    report_folder_path.mkdir(exist_ok=True, parents=True)
+    report_file_path = report_folder_path / f'convert_{datetime.fromtimestamp(report["start_time"]):%Y%m%d_%H%M%S}.json'
+    report_file_path.write_text(json.dumps(run_report, indent=4, ensure_ascii=False), encoding='utf-8')
+
+    print_report(run_report)
+    print(f'[REPORT] saved to {report_file_path}')
+
+    return report_file_path
+
+
+def print_report(run_report):
+    for stage, stage_metrics in run_report['stages'].items():
+        print(f'[REPORT] {stage}: {stage_metrics.get("wall", 0.0):.1f} s, {stage_metrics["files"]} files, '
+              f'cpu {stage_metrics["cpu"]:.1f} s, in {format_size(stage_metrics["bytes_in"])}, '
+              f'out {format_size(stage_metrics["bytes_out"])}, peak {format_size(stage_metrics["peak_rss"])}')
+    for asset_type, totals in run_report['types'].items():
+        print(f'[REPORT] type {asset_type}: {totals["files"]} files, {totals["wall"]:.1f} s, cpu {totals["cpu"]:.1f} s')
+    for file_metrics in run_report['slowest']:
+        print(f'[REPORT] slow: {file_metrics["wall"]:.2f} s {file_metrics["file"]}')
+    print(f'[REPORT] total: {run_report["wall"]:.1f} s, cpu {run_report["cpu"]:.1f} s, '
+          f'peak {format_size(run_report["peak_rss"])}')
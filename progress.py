@@ -0,0 +1,102 @@
+import threading
+import time
+from datetime import timedelta
+
+
+# progress of current convert run, stages update it from own threads
+# stage = {'total', 'done', 'failed', 'start_time', 'finished'}, total of stream stages grow while files come
+state = None
+state_lock = threading.Lock()
+
+
+def start(interval=5.0):
+    global state
+
+    # progress lines are printed not more often than interval, so console don't slow down conversion
+    with state_lock:
+        state = {'start_time': time.perf_counter(), 'interval': interval, 'last_print_time': 0.0, 'stages': {}}
+
+
+def get_stage_state(stage):
+    return state['stages'].setdefault(stage, {'total': 0, 'done': 0, 'failed': 0, 'start_time': time.perf_counter(),
+                                              'finished': False})
+
+
+def format_duration(seconds):
+    return str(timedelta(seconds=int(seconds)))
+
+
+def get_eta(done, total, seconds):
+    if done == 0 or seconds <= 0:
+        return '?'
+
+    return format_duration((total - done) / (done / seconds))
+
+
+def get_line_list(now):
+    line_list = []
+    all_done = 0
+    all_total = 0
+    for stage, stage_state in state['stages'].items():
+        all_done += stage_state['done']
+        all_total += stage_state['total']
+        if stage_state['finished'] or stage_state['total'] == 0:
+            continue
+
+        seconds = now - stage_state['start_time']
+        rate = stage_state['done'] / seconds if seconds > 0 else 0.0
+        failed = f', {stage_state["failed"]} failed' if stage_state['failed'] else ''
+        line_list.append(f'[PROGRESS] {stage}: {stage_state["done"]}/{stage_state["total"]} '
+                         f'({stage_state["done"] * 100 // stage_state["total"]}%), {rate:.1f} files/s, '
+                         f'ETA {get_eta(stage_state["done"], stage_state["total"], seconds)}{failed}')
+
+    # only files of started stages are known
+    seconds = now - state['start_time']
+    line_list.append(f'[PROGRESS] all: {all_done}/{all_total} known files, {format_duration(seconds)} elapsed, '
+                     f'ETA {get_eta(all_done, all_total, seconds)}')
+
+    return line_list
+
+
+def add_total(stage, count):
+    if state is None:
+        return
+
+    with state_lock:
+        get_stage_state(stage)['total'] += count
+
+
+def advance(stage, failed=False):
+    if state is None:
+        return
+
+    with state_lock:
+        stage_state = get_stage_state(stage)
+        stage_state['done'] += 1
+        if failed:
+            stage_state['failed'] += 1
+
+        now = time.perf_counter()
+        if now - state['last_print_time'] < state['interval']:
+            return
+        state['last_print_time'] = now
+        line_list = get_line_list(now)
+
+    print('\n'.join(line_list), flush=True)
+
+
+def finish(stage):
+    if state is None:
+        return
+
+    with state_lock:
+        stage_state = get_stage_state(stage)
+        stage_state['finished'] = True
+        seconds = time.perf_counter() - stage_state['start_time']
+
+    if stage_state['total'] == 0:
+        return
+
+    failed = f', {stage_state["failed"]} failed' if stage_state['failed'] else ''
+    print(f'[PROGRESS] {stage}: done {stage_state["done"]} files in {format_duration(seconds)}, '
+          f'{stage_state["done"] / max(seconds, 0.001):.1f} files/s{failed}', flush=True)
@@ -0,0 +1,5 @@
+import sys
+from pathlib import Path
+
+# scripts are not a package, they import each other from scripts folder
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
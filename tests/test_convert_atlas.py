@@ -0,0 +1,77 @@
+from array import array
+
+import convert_atlas
+
+
+def get_array_dict(uv_list, polygon_material_list):
+    # one triangle per material, every corner has own feature
+    return {'texture': (2, array('f', [value for uv in uv_list for value in uv])),
+            'polygon_feature_indices': (1, array('i', range(len(uv_list)))),
+            'polygon_loop_totals': (1, array('i', [3] * len(polygon_material_list))),
+            'polygon_material_indices': (1, array('i', polygon_material_list))}
+
+
+def test_get_uv_bounds():
+    array_dict = get_array_dict([(0.0, 0.0), (1.0, 0.0), (1.0, 1.0),
+                                 (0.25, 0.5), (-1.0, 0.75), (0.5, 2.0),
+                                 (0.1, 0.2), (0.3, 0.4), (0.2, 0.3)], [0, 1, 0])
+
+    bounds_list = convert_atlas.get_uv_bounds(array_dict, 3)
+
+    assert bounds_list[0] == [0.0, 0.0, 1.0, 1.0]
+    assert bounds_list[1] == [-1.0, 0.5, 0.5, 2.0]
+    # material without polygons
+    assert bounds_list[2][0] > bounds_list[2][2]
+
+
+def test_pack_textures_without_overlap():
+    page_size = 256
+    padding = 4
+    texture_list = [{'name': f'TEXTURE_{index}', 'width': width, 'height': height}
+                    for index, (width, height) in enumerate([(128, 128), (64, 64), (64, 32), (120, 120), (32, 128),
+                                                             (16, 16), (100, 50)])]
+
+    place_dict = convert_atlas.pack_textures(texture_list, page_size, padding)
+
+    assert set(place_dict) == {texture['name'] for texture in texture_list}
+    rectangle_list = []
+    for texture in texture_list:
+        page, x, y = place_dict[texture['name']]
+        # texture with padding is inside of page
+        assert x - padding >= 0 and y - padding >= 0
+        assert x + texture['width'] + padding <= page_size and y + texture['height'] + padding <= page_size
+        rectangle_list.append((page, x - padding, y - padding, x + texture['width'] + padding, y + texture['height'] + padding))
+
+    for index, (page, left, top, right, bottom) in enumerate(rectangle_list):
+        for other_page, other_left, other_top, other_right, other_bottom in rectangle_list[index + 1:]:
+            if page == other_page:
+                assert right <= other_left or other_right <= left or bottom <= other_top or other_bottom <= top
+
+
+def test_pack_textures_next_page():
+    texture_list = [{'name': f'TEXTURE_{index}', 'width': 100, 'height': 100} for index in range(5)]
+
+    place_dict = convert_atlas.pack_textures(texture_list, 256, 4)
+
+    # 4 textures with padding fit in one page
+    assert sorted(page for page, _, _ in place_dict.values()) == [0, 0, 0, 0, 1]
+
+
+def test_is_atlas_material():
+    material_dict = {'name': 'WALL', 'matGroup': 'STONE', 'noCollDet': False, 'texScale': [1.0, 1.0]}
+    texture = {'name': 'WALL', 'path': 'WALL.TGA', 'width': 128, 'height': 128, 'alpha': False, 'format': 'DXT1'}
+    bounds = [0.0, 0.0, 1.0, 1.0]
+
+    assert convert_atlas.is_atlas_material(material_dict, bounds, texture, 512)
+    # tiling
+    assert not convert_atlas.is_atlas_material(material_dict, [0.0, 0.0, 2.0, 1.0], texture, 512)
+    assert not convert_atlas.is_atlas_material(dict(material_dict, texScale=[2.0, 2.0]), bounds, texture, 512)
+    # special materials, alpha and animation
+    assert not convert_atlas.is_atlas_material(dict(material_dict, matGroup='WATER'), bounds, texture, 512)
+    assert not convert_atlas.is_atlas_material(dict(material_dict, name='P:PORTAL'), bounds, texture, 512)
+    assert not convert_atlas.is_atlas_material(dict(material_dict, texAniFPS=10.0), bounds, texture, 512)
+    assert not convert_atlas.is_atlas_material(material_dict, bounds, dict(texture, alpha=True), 512)
+    # too big or not readable
+    assert not convert_atlas.is_atlas_material(material_dict, bounds, texture, 64)
+    assert not convert_atlas.is_atlas_material(material_dict, bounds, dict(texture, path='WALL.DDS', format='DXT4'), 512)
+    assert not convert_atlas.is_atlas_material(material_dict, bounds, None, 512)
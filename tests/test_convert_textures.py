@@ -0,0 +1,70 @@
+import struct
+
+import pytest
+
+import convert_textures
+
+
+def test_group_duplicates(tmp_path):
+    file_data_dict = {'VDF_Textures/WALL-C.TEX': b'wall', 'VDF_Textures_Addon/WALL-C.TEX': b'wall',
+                      'VDF_Textures/ROCK-C.TEX': b'rock', 'Mod/WALL_NEW-C.TEX': b'wall',
+                      'Mod/ROCK-C.TEX': b'rock 2'}
+    tex_file_path_list = []
+    for relative_path, data in file_data_dict.items():
+        tex_file_path = tmp_path / relative_path
+        tex_file_path.parent.mkdir(exist_ok=True, parents=True)
+        tex_file_path.write_bytes(data)
+        tex_file_path_list.append(tex_file_path)
+
+    duplicate_dict = convert_textures.group_duplicates(tex_file_path_list)
+
+    # first file in list is converted, other files with same content are its duplicates
+    assert duplicate_dict == {tmp_path / 'VDF_Textures/WALL-C.TEX': [tmp_path / 'VDF_Textures_Addon/WALL-C.TEX',
+                                                                     tmp_path / 'Mod/WALL_NEW-C.TEX'],
+                              tmp_path / 'VDF_Textures/ROCK-C.TEX': [],
+                              tmp_path / 'Mod/ROCK-C.TEX': []}
+
+
+def get_dxt1_block(color0, color1, index_list):
+    index_bits = sum(index << (2 * pixel) for pixel, index in enumerate(index_list))
+    return struct.pack('<HHI', color0, color1, index_bits)
+
+
+def get_dxt5_block(alpha0, alpha1, index_list):
+    index_bits = sum(index << (3 * pixel) for pixel, index in enumerate(index_list))
+    return bytes([alpha0, alpha1]) + index_bits.to_bytes(6, 'little') + bytes(8)
+
+
+def test_dxt1_has_alpha():
+    # block scan need numpy, without it convert_textures decode mipmap instead
+    pytest.importorskip('numpy')
+    opaque_block = get_dxt1_block(0xFFFF, 0x0000, [3] * 16)
+    # with color0 <= color1 index 3 is transparent
+    three_color_block = get_dxt1_block(0x0000, 0xFFFF, [0, 1, 2] * 5 + [2])
+    transparent_block = get_dxt1_block(0x0000, 0xFFFF, [0] * 15 + [3])
+
+    assert convert_textures.dxt_has_alpha(opaque_block + three_color_block, b'DXT1') is False
+    assert convert_textures.dxt_has_alpha(opaque_block + transparent_block, b'DXT1') is True
+
+
+def test_dxt3_has_alpha():
+    # block scan need numpy, without it convert_textures decode mipmap instead
+    pytest.importorskip('numpy')
+    opaque_block = b'\xff' * 8 + bytes(8)
+    transparent_block = b'\xff' * 7 + b'\x0f' + bytes(8)
+
+    assert convert_textures.dxt_has_alpha(opaque_block * 2, b'DXT3') is False
+    assert convert_textures.dxt_has_alpha(opaque_block + transparent_block, b'DXT3') is True
+
+
+def test_dxt5_has_alpha():
+    # block scan need numpy, without it convert_textures decode mipmap instead
+    pytest.importorskip('numpy')
+    assert convert_textures.dxt_has_alpha(get_dxt5_block(255, 0, [0] * 16), b'DXT5') is False
+    # 6 values mode, index 7 is 255
+    assert convert_textures.dxt_has_alpha(get_dxt5_block(0, 255, [1] * 8 + [7] * 8), b'DXT5') is False
+    assert convert_textures.dxt_has_alpha(get_dxt5_block(255, 255, [2] * 16), b'DXT5') is False
+    # one pixel between alpha0 and alpha1
+    assert convert_textures.dxt_has_alpha(get_dxt5_block(255, 0, [0] * 15 + [2]), b'DXT5') is True
+    # 6 values mode, index 6 is 0
+    assert convert_textures.dxt_has_alpha(get_dxt5_block(0, 255, [1] * 15 + [6]), b'DXT5') is True
@@ -0,0 +1,41 @@
+from pathlib import Path
+
+import extract_all
+
+
+def test_match_entry():
+    # extension
+    assert extract_all.match_entry('_WORK/DATA/WORLDS/NEWWORLD.ZEN', '.zen')
+    assert not extract_all.match_entry('_WORK/DATA/WORLDS/NEWWORLD.ZEN.BAK', '.ZEN')
+    # glob for path in archive or for name of file
+    assert extract_all.match_entry('_WORK/DATA/WORLDS/NEWWORLD.ZEN', '*/WORLDS/*')
+    assert extract_all.match_entry('_WORK/DATA/ANIMS/HUM_BODY.MDM', 'hum_*')
+    assert not extract_all.match_entry('_WORK/DATA/ANIMS/ORC_BODY.MDM', 'HUM_*')
+
+
+def test_is_entry_included():
+    filters = extract_all.get_filters({}, include=['.ZEN', '.MRM'], exclude=['*TEST*'])
+
+    assert extract_all.is_entry_included('_WORK/DATA/WORLDS/NEWWORLD.ZEN', filters)
+    assert not extract_all.is_entry_included('_WORK/DATA/WORLDS/TEST_WORLD.ZEN', filters)
+    assert not extract_all.is_entry_included('_WORK/DATA/TEXTURES/WALL-C.TEX', filters)
+    # empty include - all files
+    assert extract_all.is_entry_included('_WORK/DATA/TEXTURES/WALL-C.TEX', extract_all.get_filters({}))
+    assert extract_all.is_entry_included('_WORK/DATA/TEXTURES/WALL-C.TEX', None)
+
+
+def test_get_filters_command_line_replace_config():
+    config = {'extract_include': ['.TEX'], 'extract_exclude': ['*TEST*'], 'extract_archives': ['Textures.vdf']}
+
+    filters = extract_all.get_filters(config, include=['.ZEN'])
+
+    assert filters == {'include': ['.ZEN'], 'exclude': ['*TEST*'], 'archives': ['Textures.vdf'], 'exclude_archives': []}
+
+
+def test_is_archive_included():
+    filters = extract_all.get_filters({}, archives=['Anims', '*.mod'], exclude_archives=['Anims_Addon.mod'])
+
+    assert extract_all.is_archive_included(Path('Data/Anims.vdf'), filters)
+    assert extract_all.is_archive_included(Path('Data/Archolos.mod'), filters)
+    assert not extract_all.is_archive_included(Path('Data/Anims_Addon.mod'), filters)
+    assert not extract_all.is_archive_included(Path('Data/Textures.vdf'), filters)
@@ -0,0 +1,117 @@
+import threading
+import time
+from array import array
+
+import helpers
+
+
+def write_sized_files(folder_path, size_list):
+    file_path_list = []
+    for index, size in enumerate(size_list):
+        file_path = folder_path / f'FILE_{index}.json'
+        file_path.write_bytes(b'x' * size)
+        file_path_list.append(file_path)
+
+    return file_path_list
+
+
+def test_split_shards_balance_size(tmp_path):
+    file_path_list = write_sized_files(tmp_path, [100, 60, 50, 40, 10])
+
+    shard_list = helpers.split_shards(file_path_list, 2)
+
+    assert sorted(path for shard in shard_list for path in shard) == sorted(file_path_list)
+    assert sorted(sum(path.stat().st_size for path in shard) for shard in shard_list) == [120, 140]
+    # biggest file first
+    assert shard_list[0][0] == file_path_list[0]
+
+
+def test_split_shards_without_empty_shards(tmp_path):
+    file_path_list = write_sized_files(tmp_path, [10, 20])
+
+    assert len(helpers.split_shards(file_path_list, 4)) == 2
+    assert helpers.split_shards([], 4) == []
+
+
+def test_geometry_round_trip(tmp_path):
+    array_dict = {'positions': (3, array('f', [0.0, 1.5, -2.0, 3.25, 4.0, 5.0])),
+                  'polygon_material_indices': (1, array('i', [0, 7, -1])),
+                  'empty': (2, array('f'))}
+    geometry_file_path = tmp_path / 'WORLD.ZEN.bin'
+
+    header = helpers.write_geometry(geometry_file_path, array_dict)
+    read_array_dict = helpers.read_geometry(geometry_file_path, header)
+
+    assert header['file'] == 'WORLD.ZEN.bin'
+    assert header['arrays']['positions'] == {'type': 'float32', 'offset': 0, 'count': 2, 'width': 3}
+    assert header['arrays']['polygon_material_indices']['type'] == 'int32'
+    assert read_array_dict == array_dict
+
+
+def test_run_stage_graph_order():
+    lock = threading.Lock()
+    event_list = []
+
+    def add_stage(name, dependency_list, seconds=0.0):
+        def function():
+            with lock:
+                event_list.append(('start', name))
+            time.sleep(seconds)
+            with lock:
+                event_list.append(('end', name))
+
+        return {'name': name, 'dependencies': dependency_list, 'function': function,
+                'finish': lambda: event_list.append(('finish', name))}
+
+    stage_list = [add_stage('MDM', ['MDH', 'TEX']), add_stage('TEX', [], 0.1), add_stage('MDH', [], 0.05),
+                  add_stage('MDM_BLENDER', ['MDM'])]
+
+    failed_set = helpers.run_stage_graph(stage_list)
+
+    assert failed_set == set()
+    assert event_list.index(('start', 'MDM')) > event_list.index(('end', 'MDH'))
+    assert event_list.index(('start', 'MDM')) > event_list.index(('end', 'TEX'))
+    assert event_list.index(('start', 'MDM_BLENDER')) > event_list.index(('end', 'MDM'))
+    # independent stages run at same time
+    assert event_list.index(('start', 'MDH')) < event_list.index(('end', 'TEX'))
+    assert sorted(name for event, name in event_list if event == 'finish') == ['MDH', 'MDM', 'MDM_BLENDER', 'TEX']
+
+
+def test_run_stage_graph_cancel():
+    call_list = []
+
+    def fail():
+        raise RuntimeError('broken file')
+
+    stage_list = [{'name': 'ZEN', 'dependencies': [], 'function': fail,
+                   'cancel': lambda: call_list.append('cancel ZEN'), 'finish': lambda: call_list.append('finish ZEN')},
+                  {'name': 'ZEN_BLENDER', 'dependencies': ['ZEN'], 'function': lambda: call_list.append('run ZEN_BLENDER'),
+                   'cancel': lambda: call_list.append('cancel ZEN_BLENDER'),
+                   'finish': lambda: call_list.append('finish ZEN_BLENDER')},
+                  {'name': 'TEX', 'dependencies': [], 'function': lambda: call_list.append('run TEX')}]
+
+    failed_set = helpers.run_stage_graph(stage_list)
+
+    # stage after failed stage is skipped, not run
+    assert failed_set == {'ZEN', 'ZEN_BLENDER'}
+    assert 'run ZEN_BLENDER' not in call_list
+    assert 'run TEX' in call_list
+    assert call_list.index('cancel ZEN') < call_list.index('finish ZEN')
+    assert call_list.index('cancel ZEN_BLENDER') < call_list.index('finish ZEN_BLENDER')
+
+
+def test_feed_end_after_close_and_cancel():
+    feed = helpers.create_feed(4)
+    helpers.put_feed(feed, 'A.json')
+    helpers.put_feed(feed, 'B.json')
+    helpers.close_feed(feed)
+
+    assert list(helpers.read_feed(feed)) == ['A.json', 'B.json']
+
+    feed = helpers.create_feed(1)
+    helpers.put_feed(feed, 'A.json')
+    helpers.cancel_feed(feed)
+    # full queue don't block producer after cancel
+    helpers.put_feed(feed, 'B.json')
+
+    assert list(helpers.read_feed(feed)) == []